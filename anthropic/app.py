@@ -1,12 +1,43 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import json, os, hashlib, secrets
-from datetime import datetime, timedelta
-import random, math
+import sys
+
+if __name__ == '__main__':
+    # `python app.py` serves the importable `app` module, so the app and its services
+    # are set up once, there. Process-pool workers re-import the launch script by
+    # path; without __file__ they have nothing to re-run.
+    del __file__
+    from app import main
+    sys.exit(main())
+
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+import json, os, hashlib, secrets, csv, io
+from datetime import date, datetime, timedelta
 import logging
+import time
+from functools import cached_property
+
+import numpy as np
 
 # Import our professional utilities
+from utils.log_queue import configure_logging
 from utils.threshold_checker import ThresholdChecker
 from utils.notification_service import NotificationService
+from utils.alert_coalescer import AlertCoalescer
+from utils.cohort import CohortRiskScorer
+from utils.threshold_stream import ThresholdStreamHub
+from utils.user_store import UserStore
+from utils.cache import TTLCache, memoize_daily
+from utils.conditional import make_etag, source_version
+from utils.fragment_cache import FragmentCache, FragmentCacheExtension
+from utils.history import HistoryColumns, generate_history
+from utils.synthetic import stable_seed, rng, synthetic_kpis, synthetic_limb_angles
+from utils.rollup import DailyRollup
+from utils.history_store import HistoryStore
+from utils.sample_ring import SampleRings
+from utils.sensor_gateway import LIMBS as SENSOR_LIMBS
+from utils.downsample import point_budget, downsample_indices, take
+from utils.correlation import StreamingCorrelation, analyze_symmetry
+from utils.cross_correlation import SKELETON_17, peak_lag_analysis
 
 # Configure logging
 logging.basicConfig(
@@ -15,27 +46,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# utils.* loggers write through a background queue (non-blocking on hot paths)
+configure_logging(logging.INFO)
+
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes result objects exposing to_dict()"""
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = AppJSONProvider(app)
 app.secret_key = secrets.token_hex(32)
 
+# Live threshold stream: producer poll interval and SSE keep-alive (seconds).
+# Each open stream holds a server thread; past the per-worker cap clients poll
+# instead. Keep the cap below the worker's thread count (0 disables streaming).
+app.config.setdefault('THRESHOLD_STREAM_INTERVAL', 1.0)
+app.config.setdefault('THRESHOLD_STREAM_HEARTBEAT', 15.0)
+app.config.setdefault('THRESHOLD_STREAM_MAX_SUBSCRIBERS', 32)
+
+# Rendered fragments of the heavy analytics pages ({% cache %} blocks), per worker
+app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 32 * 2**20)
+app.config.setdefault('FRAGMENT_CACHE_MAX_ENTRY_BYTES', 2**20)
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_MAX_BYTES'],
+                                             app.config['FRAGMENT_CACHE_MAX_ENTRY_BYTES'])
+
 # Initialize professional services
 threshold_checker = ThresholdChecker()
 notification_service = NotificationService()
+# Refreshing /threshold_monitor re-reports the same RED limbs; repeats only bump a counter
+alert_coalescer = AlertCoalescer(notification_service)
+
+# Ward-wide risk for clinicians: scored across a process pool, cached briefly
+app.config.setdefault('COHORT_RISK_TTL', 30.0)
+app.config.setdefault('COHORT_WORKERS', None)
+cohort_scorer = CohortRiskScorer(workers=app.config['COHORT_WORKERS'], ttl=app.config['COHORT_RISK_TTL'])
 
 logger.info("FallVision Application Started")
 
 USERS_FILE = 'users.json'
+USERS_DB = 'users.db'
 
-# ── Auth helpers ──────────────────────────────────────────────────────────────
-def load_users():
-    if not os.path.exists(USERS_FILE):
-        return {}
-    with open(USERS_FILE) as f:
-        return json.load(f)
+user_store = UserStore(USERS_DB)
+user_store.migrate_from_json(USERS_FILE)
+
+HISTORY_DIR = 'history_store'
+history_store = HistoryStore(HISTORY_DIR)
 
-def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+# Live sensor samples: written by the gateway process (python -m utils.sensor_gateway),
+# read here from shared memory-mapped rings without locks
+SAMPLE_RING_DIR = 'sample_rings'
+sample_rings = SampleRings(SAMPLE_RING_DIR)
+LIVE_SAMPLE_MAX_AGE = 5     # seconds before a ring counts as stale
+
+# ── Auth helpers ──────────────────────────────────────────────────────────────
 
 def hash_password(pw):
     return hashlib.sha256(pw.encode()).hexdigest()
@@ -52,58 +120,147 @@ def login_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
-# ── Mock data generator ───────────────────────────────────────────────────────
-def seed(uid):
-    random.seed(hash(uid) % 10000)
+# ── Conditional GET ───────────────────────────────────────────────────────────
+# Responses that only change with a known data epoch get an ETag built from
+# (code/template version, user, epoch, query) before the view runs; a matching
+# If-None-Match is answered with 304 without generating or rendering anything.
+RESPONSE_SOURCES = (os.path.join(app.root_path, 'templates'),
+                    os.path.join(app.root_path, 'utils'), __file__)
+RESPONSE_VERSION = source_version(*RESPONSE_SOURCES)
+
+REVALIDATE = 'private, no-cache'            # per-user data: always revalidate
+STATIC_PAGE = 'private, max-age=3600'       # per-user chrome, content never changes
+
+def response_version():
+    # Templates reload without a restart in debug mode
+    if app.debug or app.config.get('TEMPLATES_AUTO_RELOAD'):
+        return source_version(*RESPONSE_SOURCES)
+    return RESPONSE_VERSION
+
+def day_epoch(uid):
+    return date.today().toordinal()
+
+def hour_epoch(uid):
+    return datetime.now().strftime('%Y-%m-%d %H')
 
-def gen_angle(base, noise=12):
-    return round(base + random.uniform(-noise, noise), 1)
+def minute_epoch(uid):
+    return int(time.time() // 60)
+
+def conditional(epoch=None, cache_control=REVALIDATE):
+    """
+    Answer If-None-Match with 304 when the response cannot have changed
+    
+    Args:
+        epoch: uid -> hashable that changes whenever the view's data does
+               (None for pages that only depend on the user)
+        cache_control: Cache-Control header for 200 and 304 responses
+    """
+    from functools import wraps
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            u = current_user() or {}
+            etag = make_etag(response_version(), request.endpoint, u.get('email'), u.get('name'),
+                             u.get('role'), epoch(u.get('email')) if epoch else None,
+                             request.query_string, tuple(sorted(kwargs.items())))
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
 
+# ── Mock data generator ───────────────────────────────────────────────────────
+# Generators use private RNGs with process-stable seeds, so concurrent requests
+# never share random state. Their outputs are cached per (user, kind, day) and
+# must be treated as read-only. Readings re-seeded every second or minute call
+# synthetic_* directly: they are cheap, and caching them would evict the day's
+# expensive entries.
+generator_cache = TTLCache(maxsize=4096, ttl=3600)
+
+@memoize_daily(generator_cache, 'kpis')
 def gen_kpis(uid):
-    seed(uid)
-    mobility   = random.randint(62, 94)
-    posture    = random.randint(58, 97)
-    fall_risk  = random.randint(8, 45)
-    brain_corr = round(random.uniform(0.61, 0.96), 2)
-    return dict(mobility=mobility, posture=posture, fall_risk=fall_risk, brain_corr=brain_corr)
+    return synthetic_kpis(uid)
 
+@memoize_daily(generator_cache, 'limb_angles')
 def gen_limb_angles(uid, limb):
-    seed(uid + limb)
-    bases = {'right_arm':85,'left_arm':82,'right_leg':168,'left_leg':165}
-    base = bases.get(limb, 90)
-    return [gen_angle(base) for _ in range(8)]
+    return synthetic_limb_angles(uid, limb)
+
+HISTORY_MAX_DAYS = 3650
+
+def sync_history(uid):
+    """
+    Make sure the history store holds every closed day for a patient
+    New patients get HISTORY_MAX_DAYS of synthetic history; later days are appended.
+    """
+    today = np.datetime64(date.today(), 'D')
+    last = history_store.last_date(uid)
+    if last is None:
+        history_store.append(uid, generate_history(stable_seed(uid), HISTORY_MAX_DAYS), skip_existing=True)
+    elif last + 1 < today:
+        missing = int((today - last - 1).astype(np.int64))
+        history_store.append(uid, generate_history(stable_seed(uid + str(last)), missing), skip_existing=True)
 
+def gen_history_columns(uid, days=30):
+    """Last `days` closed days of the patient's history (memory-mapped, read-only)"""
+    sync_history(uid)
+    return history_store.tail(uid, days, end=date.today())
+
+def live_limb_series(uid, n=8):
+    """Newest n sensor angles per limb (newest first), or None without fresh samples"""
+    ring = sample_rings.reader(uid)
+    if ring is None:
+        return None
+    samples = ring.last(n)
+    if not len(samples) or samples['timestamp'][-1] < time.time() - LIVE_SAMPLE_MAX_AGE:
+        return None
+    angles = np.round(samples['angles'][::-1].astype(np.float64), 1)
+    return {limb: angles[:, i].tolist() for i, limb in enumerate(SENSOR_LIMBS)}
+
+def live_limb_angles(uid, limb, n=8):
+    """Newest n sensor angles for a limb (newest first), or None without fresh samples"""
+    if limb not in SENSOR_LIMBS:
+        return None
+    return (live_limb_series(uid, n) or {}).get(limb)
+
+def limb_angles(uid, limb):
+    """Recent angles for a limb: live sensor samples if streaming, else synthetic"""
+    return live_limb_angles(uid, limb) or gen_limb_angles(uid, limb)
+
+@memoize_daily(generator_cache, 'history')
 def gen_history(uid, days=30):
-    seed(uid)
-    records = []
-    base_date = datetime.now() - timedelta(days=days)
-    for i in range(days):
-        d = base_date + timedelta(days=i)
-        records.append({
-            'date': d.strftime('%Y-%m-%d'),
-            'mobility': random.randint(55, 95),
-            'posture': random.randint(50, 98),
-            'fall_risk': random.randint(5, 55),
-            'steps': random.randint(1800, 9400),
-            'brain_corr': round(random.uniform(0.55, 0.97), 2),
-            'right_arm': gen_angle(85),
-            'left_arm': gen_angle(82),
-            'right_leg': gen_angle(168),
-            'left_leg': gen_angle(165),
-        })
-    return records
+    return gen_history_columns(uid, days).to_records()
 
+CHART_METRICS = ('mobility', 'posture', 'fall_risk', 'brain_corr',
+                 'right_arm', 'left_arm', 'right_leg', 'left_leg')
+
+@memoize_daily(generator_cache, 'chart_series')
+def chart_series(uid, days, budget):
+    """History chart series for the last `days` days (see history_chart)"""
+    return history_chart(gen_history_columns(uid, days), budget)
+
+def requested_budget():
+    """Chart point budget from ?points= or ?width= (chart width in px)"""
+    return point_budget(request.args.get('points', type=int), request.args.get('width', type=int))
+
+@memoize_daily(generator_cache, 'alerts')
 def gen_alerts(uid):
-    seed(uid + 'alerts')
+    rnd = rng(uid + 'alerts')
     severity = ['Low','Medium','High']
     alerts = []
     for i in range(5):
-        s = random.choice(severity)
+        s = rnd.choice(severity)
         alerts.append({
             'id': i+1,
             'severity': s,
-            'time': (datetime.now() - timedelta(hours=random.randint(1,72))).strftime('%b %d, %H:%M'),
-            'message': random.choice([
+            'time': (datetime.now() - timedelta(hours=rnd.randint(1,72))).strftime('%b %d, %H:%M'),
+            'message': rnd.choice([
                 'Unusual gait pattern detected during morning walk',
                 'Postural sway exceeded safe threshold',
                 'Rapid deceleration event logged — possible near-fall',
@@ -114,6 +271,34 @@ def gen_alerts(uid):
         })
     return alerts
 
+# ── Daily rollups ─────────────────────────────────────────────────────────────
+# Per-patient daily aggregates, loaded from history once and then kept current
+# by live samples; trend pages read these rows instead of reprocessing history.
+ROLLUP_DAYS = 400
+LOW_RISK_BELOW = 30
+
+patient_rollups = TTLCache(maxsize=512)
+
+def patient_rollup(uid, days=ROLLUP_DAYS):
+    """Patient's rollup, covering at least the last `days` closed days"""
+    rollup = patient_rollups.get_or_compute(
+        uid, lambda: DailyRollup(HistoryColumns.METRICS, 'fall_risk', LOW_RISK_BELOW))
+    # No-op unless a new day (or an older range) is missing
+    rollup.load(gen_history_columns(uid, max(days, ROLLUP_DAYS)))
+    return rollup
+
+def history_chart(history, budget):
+    """
+    Chart series from daily history, downsampled to at most ~budget points
+    Fall-risk spikes are kept via min/max bucketing; the rest use LTTB.
+    """
+    columns = {name: history[name] for name in CHART_METRICS}
+    indices = downsample_indices(columns, budget, peak_metrics=('fall_risk',))
+    roll7 = history.rolling_mean('mobility', 7)
+    columns['mobility_roll7'] = [None if v != v else round(v, 1) for v in roll7]
+    columns['date'] = history.date_strings()
+    return take(columns, indices)
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 @app.route('/')
 def landing():
@@ -127,9 +312,9 @@ def login():
     if request.method == 'POST':
         email = request.form['email'].strip().lower()
         pw    = request.form['password']
-        users = load_users()
-        if email in users and users[email]['password'] == hash_password(pw):
-            session['user'] = {'email': email, **{k:v for k,v in users[email].items() if k!='password'}}
+        user = user_store.get(email)
+        if user and user['password'] == hash_password(pw):
+            session['user'] = {'email': email, **{k:v for k,v in user.items() if k!='password'}}
             return redirect(url_for('dashboard'))
         error = 'Invalid email or password.'
     return render_template('login.html', error=error)
@@ -142,14 +327,13 @@ def signup():
         email = request.form['email'].strip().lower()
         pw    = request.form['password']
         role  = request.form.get('role','Patient')
-        users = load_users()
-        if email in users:
+        if user_store.exists(email):
             error = 'An account with this email already exists.'
         elif len(pw) < 6:
             error = 'Password must be at least 6 characters.'
+        elif not user_store.create(email, name, hash_password(pw), role):
+            error = 'An account with this email already exists.'
         else:
-            users[email] = {'name':name,'email':email,'role':role,'password':hash_password(pw)}
-            save_users(users)
             session['user'] = {'email':email,'name':name,'role':role}
             return redirect(url_for('dashboard'))
     return render_template('signup.html', error=error)
@@ -161,27 +345,51 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@conditional(day_epoch)
 def dashboard():
     u = current_user()
     kpis = gen_kpis(u['email'])
-    history = gen_history(u['email'])
-    return render_template('dashboard.html', user=u, kpis=kpis, history=history)
+    chart = chart_series(u['email'], 30, requested_budget())
+    recent = gen_history_columns(u['email'], 30).tail(14).to_lists(('brain_corr',))
+    week = patient_rollup(u['email']).summary('day', 7, end=date.today())
+    return render_template('dashboard.html', user=u, kpis=kpis, chart=chart, recent=recent, week=week)
 
 @app.route('/detection')
 @login_required
 def detection():
     u = current_user()
     limb = request.args.get('limb','right_arm')
-    angles = gen_limb_angles(u['email'], limb)
+    angles = limb_angles(u['email'], limb)
     kpis = gen_kpis(u['email'])
     return render_template('detection.html', user=u, limb=limb, angles=angles, kpis=kpis)
 
+def requested_days(default):
+    """History range from ?days=, clamped to 1..HISTORY_MAX_DAYS"""
+    return min(max(request.args.get('days', default, type=int), 1), HISTORY_MAX_DAYS)
+
 @app.route('/records')
 @login_required
+@conditional(day_epoch)
 def records():
     u = current_user()
-    history = gen_history(u['email'])
-    return render_template('records.html', user=u, history=history)
+    days = requested_days(30)
+    history = gen_history(u['email'], days)
+    chart = chart_series(u['email'], days, requested_budget())
+    return render_template('records.html', user=u, days=days, history=history, chart=chart)
+
+@app.route('/records/export.csv')
+@login_required
+def records_export():
+    u = current_user()
+    data = gen_history_columns(u['email'], requested_days(30)).to_lists()
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Date','Mobility','Posture','FallRisk','BrainCorr','Steps','RArm','LArm','RLeg','LLeg'])
+    writer.writerows(zip(data['date'], data['mobility'], data['posture'], data['fall_risk'],
+                         data['brain_corr'], data['steps'], data['right_arm'], data['left_arm'],
+                         data['right_leg'], data['left_leg']))
+    return Response(out.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=fallvision_records.csv'})
 
 @app.route('/emergency')
 @login_required
@@ -195,44 +403,83 @@ def emergency():
 @login_required
 def trends():
     u = current_user()
-    history = gen_history(u['email'], 60)
-    streak = 0
-    for r in reversed(history):
-        if r['fall_risk'] < 30:
-            streak += 1
-        else:
-            break
-    return render_template('trends.html', user=u, history=history, streak=streak)
+    days = requested_days(60)
+    rollup = patient_rollup(u['email'], days)
+    daily = rollup.means(days, end=date.today())    # closed days only
+    mobility = daily['mobility']
+    mobility_first = round(float(np.nanmean(mobility[:10])), 1)
+    mobility_last = round(float(np.nanmean(mobility[-10:])), 1)
+    series = history_chart(daily, requested_budget())
+    weekday_mobility = daily.weekday_means('mobility')
+    streak = rollup.streak
+    return render_template('trends.html', user=u, days=days, series=series, streak=streak,
+                           mobility_first=mobility_first, mobility_last=mobility_last,
+                           weekday_mobility=weekday_mobility)
 
 # ── API ───────────────────────────────────────────────────────────────────────
 @app.route('/faq')
 @login_required
+@conditional(cache_control=STATIC_PAGE)
 def faq():
     return render_template('faq.html', user=current_user())
 
 @app.route('/support')
 @login_required
+@conditional(cache_control=STATIC_PAGE)
 def support():
     return render_template('support.html', user=current_user())
 
 @app.route('/resources')
 @login_required
+@conditional(cache_control=STATIC_PAGE)
 def resources():
     return render_template('resources.html', user=current_user())
 
+def limb_angles_epoch(uid):
+    """Changes every second (synthetic angles) and with every published sensor sample"""
+    ring = sample_rings.reader(uid)
+    return int(time.time()), ring.head if ring is not None else 0
+
 @app.route('/api/limb_angles')
 @login_required
+@conditional(limb_angles_epoch)
 def api_limb_angles():
     u = current_user()
     limb = request.args.get('limb','right_arm')
-    return jsonify(angles=gen_limb_angles(u['email']+str(datetime.now().second), limb))
+    angles = live_limb_angles(u['email'], limb) or synthetic_limb_angles(u['email'] + str(datetime.now().second), limb)
+    return jsonify(angles=angles)
+
+@app.route('/api/limb_samples')
+@login_required
+def api_limb_samples():
+    """
+    Raw sensor samples from the patient's ring buffer, oldest first
+    Query: since (POSIX seconds, exclusive; default: newest `limit`), limit (default 500)
+    """
+    u = current_user()
+    limit = min(max(request.args.get('limit', 500, type=int), 1), sample_rings.capacity)
+    since = request.args.get('since', type=float)
+    ring = sample_rings.reader(u['email'])
+    if ring is None:
+        samples = np.empty(0, dtype=[('timestamp', '<f8'), ('angles', '<f4', (len(SENSOR_LIMBS),))])
+    elif since is None:
+        samples = ring.last(limit)
+    else:
+        samples = ring.since(since, limit)
+    angles = np.round(samples['angles'].astype(np.float64), 1)
+    return jsonify({
+        'success': True,
+        'limbs': list(SENSOR_LIMBS),
+        'timestamps': samples['timestamp'].tolist(),
+        **{limb: angles[:, i].tolist() for i, limb in enumerate(SENSOR_LIMBS)},
+    })
 
 @app.route('/api/live_kpis')
 @login_required
+@conditional(minute_epoch)
 def api_live_kpis():
     u = current_user()
-    seed(u['email'] + str(datetime.now().minute))
-    return jsonify(gen_kpis(u['email'] + str(datetime.now().minute)))
+    return jsonify(synthetic_kpis(u['email'] + str(datetime.now().minute)))
 
 # ══════════════════════════════════════════════════════════════════════════════
 # NEW PROFESSIONAL FEATURES
@@ -272,13 +519,13 @@ def threshold_monitor():
             kpis['posture']
         )
         
-        # Send alerts if critical
+        # Queue alerts if critical (delivered by the notification dispatcher)
         critical_alerts = [a for a in threshold_report['alerts'] if a['alert_level'] == 'RED']
         if critical_alerts:
             # In production, get guardian emails from user profile
             guardian_emails = ['guardian@example.com']  # Placeholder
             for alert in critical_alerts:
-                notification_service.send_threshold_alert(
+                alert_coalescer.send_threshold_alert(
                     u['email'], 
                     guardian_emails, 
                     alert
@@ -311,7 +558,7 @@ def brain_heatmap():
         u = current_user()
         
         # Generate 24-hour heatmap data
-        seed(u['email'])
+        rnd = rng(u['email'])
         heatmap_data = []
         
         for hour in range(24):
@@ -332,7 +579,7 @@ def brain_heatmap():
                 base_activity = 0.90
             
             # Add some variance
-            activity = base_activity + random.uniform(-0.08, 0.08)
+            activity = base_activity + rnd.uniform(-0.08, 0.08)
             activity = max(0.5, min(1.0, activity))
             
             heatmap_data.append({
@@ -364,15 +611,82 @@ def brain_heatmap():
             user=u,
             heatmap_data=heatmap_data,
             stats=stats,
-            kpis=gen_kpis(u['email'])
+            kpis=gen_kpis(u['email']),
+            fragment_epoch=hour_epoch(u['email'])
         )
     
     except Exception as e:
         logger.error(f"Error in brain_heatmap: {e}")
         return render_template('error.html', error="Unable to load brain heatmap"), 500
 
+# ── Live limb coordination ────────────────────────────────────────────────────
+COORDINATION_LIMBS = ('right_arm', 'left_arm', 'right_leg', 'left_leg')
+COORDINATION_WINDOWS = {'1m': 60, '10m': 600, '1h': 3600}
+COORDINATION_DEFAULT_WINDOW = '10m'
+
+# One streaming correlation engine per patient, fed by live threshold snapshots
+coordination_engines = TTLCache(maxsize=1024)
+
+def new_coordination_engine(uid):
+    """Engine seeded with the patient's recent synthetic angle series"""
+    engine = StreamingCorrelation(COORDINATION_LIMBS, COORDINATION_WINDOWS)
+    series = [gen_limb_angles(uid, limb) for limb in COORDINATION_LIMBS]
+    now = datetime.now().timestamp()
+    engine.update_many(list(zip(*series)), [now - len(series[0]) + i for i in range(len(series[0]))])
+    return engine
+
+def coordination_engine(uid):
+    return coordination_engines.get_or_compute(uid, lambda: new_coordination_engine(uid))
+
+def coordination_matrix_pct(uid, window):
+    """Current correlation matrix in percent (rounded, 100 on the diagonal)"""
+    return (coordination_engine(uid).matrix(window) * 100).round(1).tolist()
+
+# Synthetic gait model: joint -> (phase offset in cycles, frequency multiple, amplitude in degrees)
+GAIT_PHASES = {
+    'nose': (0.0, 2, 2), 'left_eye': (0.0, 2, 2), 'right_eye': (0.0, 2, 2),
+    'left_ear': (0.0, 2, 2), 'right_ear': (0.0, 2, 2),
+    'left_shoulder': (0.5, 1, 6), 'right_shoulder': (0.0, 1, 6),
+    'left_elbow': (0.53, 1, 12), 'right_elbow': (0.03, 1, 12),
+    'left_wrist': (0.56, 1, 15), 'right_wrist': (0.06, 1, 15),
+    'left_hip': (0.0, 1, 20), 'right_hip': (0.5, 1, 20),
+    'left_knee': (0.05, 1, 30), 'right_knee': (0.55, 1, 30),
+    'left_ankle': (0.1, 1, 18), 'right_ankle': (0.6, 1, 18),
+    # Four-limb view used by the rest of the app
+    'left_arm': (0.5, 1, 12), 'right_arm': (0.0, 1, 12),
+    'left_leg': (0.0, 1, 25), 'right_leg': (0.5, 1, 25),
+}
+JOINT_SETS = {'skeleton17': SKELETON_17, 'limbs': COORDINATION_LIMBS}
+
+def gen_joint_signals(uid, joints, seconds, hz):
+    """Synthetic joint angle signals (joints x samples) for a walking patient"""
+    rnd = np.random.default_rng(stable_seed(uid + 'gait'))
+    cadence = rnd.uniform(0.85, 1.05)                   # strides per second
+    right_delay = rnd.uniform(0.0, 0.08)                # patient-specific asymmetry (cycles)
+    t = np.arange(int(seconds * hz)) / hz
+    signals = np.empty((len(joints), len(t)))
+    for i, joint in enumerate(joints):
+        phase, multiple, amplitude = GAIT_PHASES[joint]
+        if joint.startswith('right'):
+            phase += right_delay
+        signals[i] = amplitude * np.sin(2 * np.pi * (multiple * cadence * t - phase))
+        signals[i] += rnd.normal(0, amplitude * 0.3, len(t))
+    return signals
+
+@memoize_daily(generator_cache, 'coordination_lags')
+def coordination_lags(uid, joint_set, seconds, hz, max_lag_seconds):
+    """Peak lagged cross-correlation for every joint pair in a window"""
+    joints = JOINT_SETS[joint_set]
+    signals = gen_joint_signals(uid, joints, seconds, hz)
+    return peak_lag_analysis(signals, joints, hz, max_lag_seconds)
+
+def coordination_epoch(uid):
+    """Daily inputs plus the last sample fed to the live correlation engine"""
+    return date.today().toordinal(), coordination_engine(uid).last_timestamp
+
 @app.route('/coordination_matrix')
 @login_required
+@conditional(coordination_epoch)
 def coordination_matrix():
     """
     Limb coordination matrix - shows inter-limb relationships
@@ -382,67 +696,25 @@ def coordination_matrix():
         u = current_user()
         
         # Get angle series for all limbs
-        limbs = ['right_arm', 'left_arm', 'right_leg', 'left_leg']
+        limbs = list(COORDINATION_LIMBS)
         angle_series = {}
         
         for limb in limbs:
             angle_series[limb] = gen_limb_angles(u['email'], limb)
         
-        # Calculate correlation matrix
-        def simple_correlation(series1, series2):
-            """Calculate correlation coefficient"""
-            n = len(series1)
-            sum_x = sum(series1)
-            sum_y = sum(series2)
-            sum_xy = sum(x*y for x, y in zip(series1, series2))
-            sum_x2 = sum(x**2 for x in series1)
-            sum_y2 = sum(y**2 for y in series2)
-            
-            numerator = n * sum_xy - sum_x * sum_y
-            denominator = math.sqrt((n * sum_x2 - sum_x**2) * (n * sum_y2 - sum_y**2))
-            
-            return numerator / denominator if denominator != 0 else 0
-        
-        correlation_matrix = []
-        for i, limb1 in enumerate(limbs):
-            row = []
-            for j, limb2 in enumerate(limbs):
-                if i == j:
-                    corr = 100  # Perfect self-correlation
-                else:
-                    corr = simple_correlation(angle_series[limb1], angle_series[limb2]) * 100
-                    corr = round(corr, 1)
-                row.append(corr)
-            correlation_matrix.append(row)
-        
-        # Calculate symmetry scores
-        right_left_arm = correlation_matrix[0][1]  # right_arm vs left_arm
-        right_left_leg = correlation_matrix[2][3]  # right_leg vs left_leg
-        
-        symmetry_analysis = {
-            'arm_symmetry': round(right_left_arm, 1),
-            'leg_symmetry': round(right_left_leg, 1),
-            'overall_symmetry': round((right_left_arm + right_left_leg) / 2, 1),
-            'status': 'Excellent' if right_left_arm > 85 and right_left_leg > 85 else
-                     'Good' if right_left_arm > 75 and right_left_leg > 75 else
-                     'Fair' if right_left_arm > 65 and right_left_leg > 65 else
-                     'Poor'
-        }
+        # Live correlation matrix from the streaming engine
+        window = request.args.get('window', COORDINATION_DEFAULT_WINDOW)
+        if window not in COORDINATION_WINDOWS:
+            window = COORDINATION_DEFAULT_WINDOW
+        correlation_matrix = coordination_matrix_pct(u['email'], window)
         
-        # Identify abnormal patterns
-        abnormal_patterns = []
-        if right_left_arm < 70:
-            abnormal_patterns.append({
-                'type': 'Arm Asymmetry',
-                'description': f'Left-right arm correlation is low ({right_left_arm}%). This may indicate unilateral weakness.',
-                'severity': 'warning'
-            })
-        if right_left_leg < 70:
-            abnormal_patterns.append({
-                'type': 'Leg Asymmetry',
-                'description': f'Left-right leg correlation is low ({right_left_leg}%). Gait analysis recommended.',
-                'severity': 'warning'
-            })
+        # Symmetry scores and abnormal patterns
+        analysis = analyze_symmetry(limbs, correlation_matrix)
+        symmetry_analysis = analysis['symmetry_analysis']
+        abnormal_patterns = analysis['abnormal_patterns']
+        
+        # Phase offsets between limbs (10-minute window at 100 Hz)
+        lag_analysis = coordination_lags(u['email'], 'limbs', 600, 100, 2.0)
         
         logger.info(f"Coordination matrix generated for {u['email']}")
         
@@ -454,7 +726,9 @@ def coordination_matrix():
             symmetry_analysis=symmetry_analysis,
             abnormal_patterns=abnormal_patterns,
             angle_series=angle_series,
-            kpis=gen_kpis(u['email'])
+            lag_analysis=lag_analysis,
+            kpis=gen_kpis(u['email']),
+            fragment_epoch=day_epoch(u['email'])
         )
     
     except Exception as e:
@@ -473,7 +747,7 @@ def neural_fatigue():
         kpis = gen_kpis(u['email'])
         
         # Calculate fatigue score
-        seed(u['email'])
+        rnd = rng(u['email'])
         
         # Simulate hourly fatigue data for today
         current_hour = datetime.now().hour
@@ -492,7 +766,7 @@ def neural_fatigue():
                 base_fatigue += 25
             
             # Add variance
-            fatigue = base_fatigue + random.uniform(-5, 5)
+            fatigue = base_fatigue + rnd.uniform(-5, 5)
             fatigue = max(0, min(100, fatigue))
             
             hourly_fatigue.append({
@@ -541,15 +815,155 @@ def neural_fatigue():
             avg_fatigue=round(avg_fatigue, 1),
             peak_fatigue=peak_fatigue,
             recommendations=recommendations,
-            kpis=kpis
+            kpis=kpis,
+            fragment_epoch=hour_epoch(u['email'])
         )
     
     except Exception as e:
         logger.error(f"Error in neural_fatigue: {e}")
         return render_template('error.html', error="Unable to load neural fatigue monitor"), 500
 
+# ── Clinician cohort risk ─────────────────────────────────────────────────────
+COHORT_ROLES = ('Clinician',)
+COHORT_PAGE_SIZE = 100
+COHORT_MAX_PATIENTS = 20000
+
+def is_clinician(u):
+    return u.get('role') in COHORT_ROLES
+
+def cohort_order():
+    order = request.args.get('order', 'desc')
+    return order if order in ('asc', 'desc') else 'desc'
+
+@app.route('/cohort')
+@login_required
+def cohort():
+    """
+    Ward overview: every registered patient ranked by composite fall risk
+    Query: order=desc|asc (by total risk), page (1-based, COHORT_PAGE_SIZE rows)
+    """
+    u = current_user()
+    if not is_clinician(u):
+        return render_template('error.html', user=u, error="The cohort view is available to clinicians only"), 403
+    
+    try:
+        result = cohort_scorer.score(user_store.emails('Patient'))
+        order = cohort_order()
+        rows = cohort_scorer.ranked(result, order)
+        pages = max(1, -(-len(rows) // COHORT_PAGE_SIZE))
+        page = min(max(request.args.get('page', 1, type=int), 1), pages)
+        
+        return render_template(
+            'cohort.html',
+            user=u,
+            rows=rows[(page - 1) * COHORT_PAGE_SIZE:page * COHORT_PAGE_SIZE],
+            first=(page - 1) * COHORT_PAGE_SIZE,
+            total=len(rows),
+            levels=result['levels'],
+            order=order,
+            page=page,
+            pages=pages,
+            computed_at=datetime.fromtimestamp(result['computed_at']).strftime('%H:%M:%S'),
+            elapsed_ms=result['elapsed_ms'],
+            refresh_seconds=int(cohort_scorer.cache.ttl),
+            kpis=gen_kpis(u['email'])
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in cohort: {e}")
+        return render_template('error.html', error="Unable to load cohort risk"), 500
+
+@app.route('/api/cohort_risk', methods=['GET', 'POST'])
+@login_required
+def api_cohort_risk():
+    """
+    Composite fall risk for a cohort, ranked by total risk
+    GET scores every registered patient; POST scores a ward list: {"patients": [emails]}
+    Query: order=desc|asc, limit (default 100), offset (default 0)
+    """
+    u = current_user()
+    if not is_clinician(u):
+        return jsonify({'success': False, 'error': 'Clinician role required'}), 403
+    
+    if request.method == 'POST':
+        patients = (request.get_json(silent=True) or {}).get('patients')
+        if not isinstance(patients, list) or not all(isinstance(p, str) for p in patients):
+            return jsonify({'success': False, 'error': 'patients must be a list of emails'}), 400
+    else:
+        patients = user_store.emails('Patient')
+    if len(patients) > COHORT_MAX_PATIENTS:
+        return jsonify({'success': False, 'error': f'At most {COHORT_MAX_PATIENTS} patients per request'}), 400
+    
+    try:
+        result = cohort_scorer.score(patients)
+        order = cohort_order()
+        limit = min(max(request.args.get('limit', COHORT_PAGE_SIZE, type=int), 1), COHORT_MAX_PATIENTS)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        rows = cohort_scorer.ranked(result, order)
+        return jsonify({
+            'success': True,
+            'count': len(rows),
+            'levels': result['levels'],
+            'order': order,
+            'offset': offset,
+            'patients': rows[offset:offset + limit],
+            'computed_at': datetime.fromtimestamp(result['computed_at']).isoformat(),
+            'elapsed_ms': result['elapsed_ms']
+        })
+    
+    except Exception as e:
+        logger.error(f"API cohort_risk error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ── Enhanced API Routes ───────────────────────────────────────────────────────
 
+def synthetic_limb_series(email, now):
+    """Synthetic angle series for every limb at the given instant (changes once per second)"""
+    return {limb: synthetic_limb_angles(email + str(now.second), limb) for limb in COORDINATION_LIMBS}
+
+def threshold_snapshot(email, now=None, series=None):
+    """
+    Current limb angles and threshold report for a user
+    
+    Args:
+        now: Instant of the snapshot (default: now)
+        series: synthetic_limb_series() for that instant, if already computed
+    """
+    now = now or datetime.now()
+    series = series or synthetic_limb_series(email, now)
+    angles = {limb: series[limb][0] for limb in COORDINATION_LIMBS}
+    
+    # Check thresholds
+    report = threshold_checker.check_all_limbs(angles)
+    
+    # Feed the live coordination engine (angles change once per second)
+    second = now.replace(microsecond=0).timestamp()
+    engine = coordination_engine(email)
+    if engine.last_timestamp is None or second > engine.last_timestamp:
+        engine.update([angles[limb] for limb in COORDINATION_LIMBS], second)
+        patient_rollup(email).add(now.date(), angles)
+    
+    return {
+        'success': True,
+        'angles': angles,
+        'report': report,
+        'timestamp': now.isoformat()
+    }
+
+def threshold_fingerprint(snapshot):
+    """Parts of a threshold snapshot that count as a change for the stream"""
+    return (
+        tuple(sorted(snapshot['angles'].items())),
+        tuple(r['alert_level'] for r in snapshot['report']['results'])
+    )
+
+threshold_stream = ThresholdStreamHub(
+    threshold_snapshot,
+    threshold_fingerprint,
+    interval=app.config['THRESHOLD_STREAM_INTERVAL'],
+    max_subscribers=app.config['THRESHOLD_STREAM_MAX_SUBSCRIBERS']
+)
+
 @app.route('/api/threshold_check')
 @login_required
 def api_threshold_check():
@@ -559,29 +973,154 @@ def api_threshold_check():
     """
     try:
         u = current_user()
-        
-        # Get current angles
-        angles = {
-            'right_arm': gen_limb_angles(u['email'] + str(datetime.now().second), 'right_arm')[0],
-            'left_arm': gen_limb_angles(u['email'] + str(datetime.now().second), 'left_arm')[0],
-            'right_leg': gen_limb_angles(u['email'] + str(datetime.now().second), 'right_leg')[0],
-            'left_leg': gen_limb_angles(u['email'] + str(datetime.now().second), 'left_leg')[0]
-        }
-        
-        # Check thresholds
-        report = threshold_checker.check_all_limbs(angles)
-        
+        return jsonify(threshold_snapshot(u['email']))
+    
+    except Exception as e:
+        logger.error(f"API threshold_check error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ── Batched live widgets ──────────────────────────────────────────────────────
+# Live screens poll several widgets at once; /api/snapshot answers them in one
+# request, all computed from one LiveSnapshot (one clock reading, one synthetic
+# angle series, one sensor ring read) instead of one request per widget.
+
+class LiveSnapshot:
+    """One patient's live data at one instant; parts are computed on first use"""
+
+    def __init__(self, email):
+        self.email = email
+        self.now = datetime.now()
+
+    @cached_property
+    def synthetic(self):
+        return synthetic_limb_series(self.email, self.now)
+
+    @cached_property
+    def live(self):
+        return live_limb_series(self.email) or {}
+
+    def limb_angles(self, limb):
+        """Same angles as /api/limb_angles: sensor samples if streaming, else synthetic"""
+        return self.live.get(limb) or self.synthetic[limb]
+
+# Widget name -> (snapshot, limbs) -> payload; each matches its standalone endpoint
+SNAPSHOT_WIDGETS = {
+    'live_kpis': lambda snap, limbs: synthetic_kpis(snap.email + str(snap.now.minute)),
+    'limb_angles': lambda snap, limbs: {'angles': {limb: snap.limb_angles(limb) for limb in limbs}},
+    'threshold_check': lambda snap, limbs: threshold_snapshot(snap.email, snap.now, snap.synthetic),
+}
+
+def requested_list(name, default):
+    """Comma-separated query parameter as a list (default when absent or empty)"""
+    return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()] or list(default)
+
+@app.route('/api/snapshot')
+@login_required
+def api_snapshot():
+    """
+    Several live widgets in one response, computed from one shared snapshot
+    Query: widgets=live_kpis,limb_angles,threshold_check (default: all),
+           limbs=right_arm,... (limb_angles only; default: all four)
+    """
+    u = current_user()
+    widgets = requested_list('widgets', SNAPSHOT_WIDGETS)
+    limbs = requested_list('limbs', COORDINATION_LIMBS)
+    unknown = [w for w in widgets if w not in SNAPSHOT_WIDGETS]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown widget: {', '.join(unknown)}"}), 400
+    unknown = [limb for limb in limbs if limb not in COORDINATION_LIMBS]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown limb: {', '.join(unknown)}"}), 400
+    
+    try:
+        snap = LiveSnapshot(u['email'])
         return jsonify({
             'success': True,
-            'angles': angles,
-            'report': report,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': snap.now.isoformat(),
+            'widgets': {name: SNAPSHOT_WIDGETS[name](snap, limbs) for name in dict.fromkeys(widgets)},
         })
     
     except Exception as e:
-        logger.error(f"API threshold_check error: {e}")
+        logger.error(f"API snapshot error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/coordination')
+@login_required
+def api_coordination():
+    """
+    Live coordination matrix, symmetry scores and asymmetry alerts
+    Query: window=1m|10m|1h
+    """
+    u = current_user()
+    window = request.args.get('window', COORDINATION_DEFAULT_WINDOW)
+    if window not in COORDINATION_WINDOWS:
+        return jsonify({'success': False, 'error': f'Unknown window: {window}'}), 400
+    
+    matrix = coordination_matrix_pct(u['email'], window)
+    return jsonify({
+        'success': True,
+        'window': window,
+        'limbs': list(COORDINATION_LIMBS),
+        'samples': coordination_engine(u['email']).sample_count(window),
+        'correlation_matrix': matrix,
+        **analyze_symmetry(list(COORDINATION_LIMBS), matrix),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/coordination_lags')
+@login_required
+def api_coordination_lags():
+    """
+    Lagged cross-correlation across a joint set
+    Query: joints=skeleton17|limbs, seconds (window, default 600), hz (default 100),
+           max_lag (seconds, default 2)
+    """
+    u = current_user()
+    joint_set = request.args.get('joints', 'skeleton17')
+    if joint_set not in JOINT_SETS:
+        return jsonify({'success': False, 'error': f'Unknown joint set: {joint_set}'}), 400
+    seconds = min(max(request.args.get('seconds', 600, type=int), 10), 3600)
+    hz = min(max(request.args.get('hz', 100, type=int), 10), 200)
+    max_lag = min(max(request.args.get('max_lag', 2.0, type=float), 0.1), 5.0)
+    
+    analysis = coordination_lags(u['email'], joint_set, seconds, hz, max_lag)
+    return jsonify({'success': True, 'window_seconds': seconds, **analysis})
+
+@app.route('/api/rollups')
+@login_required
+def api_rollups():
+    """
+    Daily, weekly or monthly mean/min/max/count per metric from the patient's rollup
+    Query: period=day|week|month, days (range, default 90)
+    """
+    u = current_user()
+    period = request.args.get('period', 'day')
+    if period not in ('day', 'week', 'month'):
+        return jsonify({'success': False, 'error': f'Unknown period: {period}'}), 400
+    days = requested_days(90)
+    rollup = patient_rollup(u['email'], days)
+    return jsonify({'success': True, 'streak': rollup.streak, **rollup.summary(period, days)})
+
+@app.route('/api/threshold_stream')
+@login_required
+def api_threshold_stream():
+    """
+    Server-Sent Events stream of threshold reports
+    Pushes a report only when angles or alert levels change; answers 503
+    when this worker already holds its maximum of open streams
+    """
+    u = current_user()
+    stream = threshold_stream.stream(u['email'], heartbeat=app.config['THRESHOLD_STREAM_HEARTBEAT'])
+    if stream is None:
+        response = jsonify({'success': False, 'error': 'Live stream busy, poll /api/snapshot instead'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    return Response(
+        stream,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/send_sos', methods=['POST'])
 @login_required
 def api_send_sos():
@@ -599,7 +1138,7 @@ def api_send_sos():
         # In production, get guardian emails from user profile
         guardian_emails = ['guardian@example.com']  # Placeholder
         
-        # Send SOS
+        # Queue SOS; delivery happens on the dispatcher's workers
         result = notification_service.send_sos_alert(
             u['email'],
             guardian_emails,
@@ -611,14 +1150,40 @@ def api_send_sos():
         
         return jsonify({
             'success': True,
-            'message': 'SOS alert sent successfully',
+            'message': 'SOS alert queued for delivery',
+            'notification_id': result['notification_id'],
             'notification': result
-        })
+        }), 202
     
     except Exception as e:
         logger.error(f"API send_sos error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/notification/<notification_id>')
+@login_required
+def api_notification(notification_id):
+    """
+    Notification with its delivery state ('queued', 'delivered', 'failed')
+    """
+    try:
+        u = current_user()
+        notification = notification_service.get_notification(notification_id)
+        if notification is None or notification.get('patient') != u['email']:
+            return jsonify({'success': False, 'error': 'Notification not found'}), 404
+        return jsonify({'success': True, 'notification': notification})
+    
+    except Exception as e:
+        logger.error(f"API notification error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/notification_latency')
+@login_required
+def api_notification_latency():
+    """
+    Per-lane notification queue depth and end-to-end delivery latency
+    """
+    return jsonify({'success': True, 'lanes': notification_service.delivery_latency()})
+
 @app.route('/api/acknowledge_alert/<notification_id>', methods=['POST'])
 @login_required
 def api_acknowledge_alert(notification_id):
@@ -649,6 +1214,7 @@ def internal_error(error):
     logger.error(f"Internal error: {error}")
     return render_template('error.html', error="Internal server error"), 500
 
-if __name__ == '__main__':
+def main():
+    """Development server (`python app.py`)"""
     logger.info("Starting FallVision server on port 5000...")
     app.run(debug=True, port=5000)
\ No newline at end of file
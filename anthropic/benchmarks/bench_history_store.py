@@ -0,0 +1,68 @@
+"""
+History Store Benchmark
+Range-read latency across many patients and the file descriptors HistoryStore keeps open
+
+Usage (from the anthropic/ directory):
+    python benchmarks/bench_history_store.py [--patients 500] [--days 365] [--max-maps 512]
+
+Exits non-zero if the open descriptors grow past the store's map budget.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.history import generate_history
+from utils.history_store import HistoryStore
+
+
+def open_fds() -> int:
+    """Descriptors open in this process"""
+    return len(os.listdir('/dev/fd'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--max-maps', type=int, default=512)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp(prefix='history_store_')
+    try:
+        store = HistoryStore(directory, max_maps=args.max_maps)
+        patients = [f'patient{i}@example.com' for i in range(args.patients)]
+        for i, uid in enumerate(patients):
+            store.append(uid, generate_history(i, args.days))
+
+        baseline = open_fds()
+        peak = baseline
+        started = time.perf_counter()
+        for _ in range(2):
+            for uid in patients:
+                store.tail(uid, 30)
+                peak = max(peak, open_fds())
+        elapsed = time.perf_counter() - started
+        reads = 2 * len(patients)
+
+        held = peak - baseline
+        print(f"{args.patients:,} patients x {args.days} days, {reads:,} reads: "
+              f"{elapsed / reads * 1e6:.1f} us/read")
+        print(f"descriptors held by maps: {held} (budget {args.max_maps}, "
+              f"{store.maps_per_patient} per patient)")
+        ok = held <= args.max_maps
+        print('PASS' if ok else 'FAIL')
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
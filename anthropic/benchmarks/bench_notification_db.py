@@ -0,0 +1,94 @@
+"""
+Notification DB Benchmark
+Alert write throughput and cross-process visibility with several workers on one NotificationDB
+
+Usage (from the anthropic/ directory):
+    python benchmarks/bench_notification_db.py [--workers 8] [--alerts 5000]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.notification_db import NotificationDB
+from utils.notification_service import NotificationService
+
+
+def worker(db_path: str, worker_id: int, alerts: int, start, results):
+    """One 'gunicorn worker': send alerts as fast as possible, then wait for the commits"""
+    logging.disable(logging.CRITICAL)
+    service = NotificationService(db_path=db_path, workers=2)
+    start.wait()
+    t0 = time.perf_counter()
+    for i in range(alerts):
+        service.send_threshold_alert(
+            f"patient{worker_id}-{i % 50}@example.com", ['guardian@example.com'],
+            {'limb': 'right_arm', 'alert_level': 'RED', 'message': 'bench'}
+        )
+    enqueued = time.perf_counter() - t0
+    service.flush()
+    results.put((worker_id, enqueued, time.perf_counter() - t0))
+    service.close()
+
+
+def visibility(db_path: str, rounds: int = 200) -> float:
+    """Median seconds until an acknowledgement made by one service is seen by another"""
+    logging.disable(logging.CRITICAL)
+    writer = NotificationService(db_path=db_path, workers=1)
+    reader = NotificationService(db_path=db_path, workers=1)
+    samples = []
+    for _ in range(rounds):
+        notification_id = writer.send_threshold_alert('vis@example.com', [], {'alert_level': 'RED'})['notification_id']
+        writer.flush()
+        writer.acknowledge_alert(notification_id, 'guardian@example.com')
+        t0 = time.perf_counter()
+        while (reader.get_notification(notification_id) or {}).get('status') != 'acknowledged':
+            time.sleep(0.0002)
+        samples.append(time.perf_counter() - t0)
+    writer.close()
+    reader.close()
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--alerts', type=int, default=5000, help='alerts per worker')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'notifications.db')
+        NotificationDB(db_path)
+        ctx = multiprocessing.get_context('spawn')
+        start, results = ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(db_path, w, args.alerts, start, results))
+                 for w in range(args.workers)]
+        for p in procs:
+            p.start()
+        time.sleep(2.0)     # let every worker import and open the database
+        t0 = time.perf_counter()
+        start.set()
+        rows = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+
+        total = args.workers * args.alerts
+        stored = NotificationDB(db_path).count()
+        enqueue_us = max(r[1] for r in rows) / args.alerts * 1e6
+        print(f"{args.workers} workers x {args.alerts:,} alerts -> {stored:,} rows stored "
+              f"({'ok' if stored == total else 'MISSING ' + str(total - stored)})")
+        print(f"committed {total / elapsed:,.0f} alert writes/s across processes "
+              f"(request-side enqueue {enqueue_us:.0f} us/alert)")
+        print(f"acknowledgement visible in another service after {visibility(db_path) * 1e3:.2f} ms (median)")
+
+
+if __name__ == '__main__':
+    main()
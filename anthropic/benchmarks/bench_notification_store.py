@@ -0,0 +1,122 @@
+"""
+Notification Store Benchmark
+Query latency of the indexed NotificationService against the old linear scans
+
+Usage (from the anthropic/ directory):
+    python benchmarks/bench_notification_store.py [--count 1000000] [--patients 1000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.notification_service import NotificationService
+
+
+def build_service(count: int, patients: int, tmp: str) -> NotificationService:
+    """Fill a service's in-memory history and indexes with synthetic notifications"""
+    service = NotificationService(os.path.join(tmp, 'notifications.json'), max_history=count)
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=30)
+    step = timedelta(days=30) / count
+    levels = ['RED', 'ORANGE', 'YELLOW']
+    for i in range(count):
+        service._remember({
+            'id': f"ALERT-{i:08d}",
+            'type': 'threshold_alert' if i % 50 else 'sos_emergency',
+            'patient': f"patient{rng.randrange(patients)}@example.com",
+            'alert_level': rng.choice(levels),
+            'timestamp': (start + step * i).isoformat(),
+            'status': 'sent' if rng.random() < 0.2 else 'acknowledged',
+        })
+    return service
+
+
+# ── Old linear implementations, kept for comparison ──────────────────────────
+
+def linear_acknowledge(history, notification_id):
+    for notification in history:
+        if notification.get('id') == notification_id:
+            return notification
+    return None
+
+
+def linear_unacknowledged(history, patient):
+    return [
+        n for n in history
+        if n.get('patient') == patient
+        and n.get('status') == 'sent'
+        and n.get('type') == 'threshold_alert'
+    ]
+
+
+def linear_recent(history, patient, hours):
+    cutoff_time = datetime.now() - timedelta(hours=hours)
+    return [
+        n for n in history
+        if n.get('patient') == patient
+        and datetime.fromisoformat(n.get('timestamp', '2000-01-01')) > cutoff_time
+    ]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        service = build_service(args.count, args.patients, tmp)
+        print(f"Loaded {args.count:,} notifications for {args.patients:,} patients "
+              f"in {time.perf_counter() - t0:.1f}s\n")
+
+        history = list(service.notification_history)
+        patient = 'patient7@example.com'
+        target = history[-1]['id']
+
+        rows = [
+            ('acknowledge (lookup by id)',
+             lambda: linear_acknowledge(history, target),
+             lambda: service.index.get(target)),
+            ('get_unacknowledged_alerts',
+             lambda: linear_unacknowledged(history, patient),
+             lambda: service.get_unacknowledged_alerts(patient)),
+            ('alerts for patient, last 24h',
+             lambda: linear_recent(history, patient, 24),
+             lambda: service.index.for_patient(patient, datetime.now() - timedelta(hours=24))),
+            ('get_alert_summary (24h)',
+             lambda: linear_recent(history, patient, 24),
+             lambda: service.get_alert_summary(patient, hours=24)),
+        ]
+
+        print(f"{'query':<32}{'linear ms':>12}{'indexed ms':>12}{'speedup':>10}")
+        for name, linear, indexed in rows:
+            linear_ms = timed(linear, args.repeat)
+            indexed_ms = timed(indexed, args.repeat)
+            print(f"{name:<32}{linear_ms:>12.3f}{indexed_ms:>12.4f}"
+                  f"{linear_ms / max(indexed_ms, 1e-6):>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+"""
+Route Benchmark
+Latency, throughput and allocations of every app route and the core service methods, with regression baselines
+
+Each scenario runs in a fresh spawned process with its own working
+directory, so the app starts exactly as it would in production: the
+'default' scenario starts empty, the 'large' one starts from a big legacy
+users.json and notifications.json (migrated and imported at startup).
+Every route in app.url_map is driven through Flask's test client with a
+logged-in (Clinician) session, then ThresholdChecker and
+NotificationService methods are called directly.
+
+--save writes the results as a JSON baseline; --compare fails (exit 1)
+when any case's --metric is more than --tolerance slower than the
+baseline (and by more than --min-delta-ms, to ignore timer noise).
+
+Usage (from the anthropic/ directory):
+    python benchmarks/bench_routes.py [--scenario default|large|all] [--iterations 50]
+    python benchmarks/bench_routes.py --save benchmarks/baselines/routes.json
+    python benchmarks/bench_routes.py --compare benchmarks/baselines/routes.json [--tolerance 0.25]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+SCENARIOS = ('default', 'large')
+
+BENCH_USER = {'email': 'bench.clinician@example.com', 'name': 'Bench Clinician', 'role': 'Clinician'}
+BENCH_PASSWORD = 'bench-password'
+
+# Endpoints that cannot be timed as a request/response (reason shown in the report)
+SKIPPED = {
+    'static': 'no static assets in the app',
+    'logout': 'would end the benchmark session',
+    'api_threshold_stream': 'endless SSE stream (a ThresholdStreamHub producer)',
+}
+
+
+# ── Scenario data ────────────────────────────────────────────────────────────
+
+def write_large_files(users: int, notifications: int):
+    """Legacy users.json and notifications.json in the current directory"""
+    import hashlib
+    password = hashlib.sha256(b'password').hexdigest()
+    with open('users.json', 'w') as f:
+        json.dump({f"patient{i}@example.com": {'name': f"Patient {i}", 'role': 'Patient', 'password': password,
+                                               'joined': '2024-01-01'}
+                   for i in range(users)}, f)
+
+    now = datetime.now()
+    levels = ('RED', 'ORANGE', 'YELLOW')
+    history = []
+    for i in range(notifications):
+        patient = BENCH_USER['email'] if i % 10 == 0 else f"patient{i % 500}@example.com"
+        history.append({
+            'id': f"ALERT-legacy-{i}",
+            'type': 'sos_emergency' if i % 50 == 0 else 'threshold_alert',
+            'patient': patient,
+            'guardians': ['guardian@example.com'],
+            'alert_level': levels[i % 3],
+            'message': 'Legacy alert',
+            'timestamp': (now - timedelta(seconds=(notifications - i) * 5)).isoformat(),
+            'method': 'all',
+            'status': 'acknowledged' if i % 4 == 0 else 'sent',
+        })
+    with open('notifications.json', 'w') as f:
+        json.dump(history, f)
+
+
+# ── Measurement ──────────────────────────────────────────────────────────────
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+
+def measure(fn, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    """Time `fn` (which returns a status or None) and sample its allocations"""
+    statuses = set()
+    gc.collect()
+    for _ in range(warmup):
+        statuses.add(fn())
+
+    samples = []
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        statuses.add(fn())
+        samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - t0
+
+    # Allocations in a separate pass (tracemalloc slows everything down)
+    peaks, blocks = [], []
+    tracemalloc.start()
+    for _ in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot() if not blocks else None
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+        if before is not None:
+            blocks.append(sum(s.count_diff for s in tracemalloc.take_snapshot().compare_to(before, 'filename')
+                              if s.count_diff > 0))
+    tracemalloc.stop()
+
+    samples.sort()
+    peaks.sort()
+    ms = lambda s: round(s * 1000, 3) if s is not None else None
+    return {
+        'p50_ms': ms(percentile(samples, 50)),
+        'p95_ms': ms(percentile(samples, 95)),
+        'p99_ms': ms(percentile(samples, 99)),
+        'mean_ms': ms(sum(samples) / len(samples)),
+        'throughput_rps': round(iterations / elapsed, 1),
+        'alloc_peak_kb': round(percentile(peaks, 50) / 1024, 1) if peaks else None,
+        'retained_blocks': blocks[0] if blocks else None,
+        'statuses': sorted(s for s in statuses if s is not None),
+    }
+
+
+# ── Cases ────────────────────────────────────────────────────────────────────
+
+def route_cases(app_module):
+    """(name, endpoint, callable) for every benchmarked request"""
+    app = app_module.app
+    client = app.test_client()
+    anon = app.test_client()
+    with client.session_transaction() as s:
+        s['user'] = dict(BENCH_USER)
+
+    sos = client.post('/api/send_sos', json={'location': {'lat': 0, 'lon': 0}}).get_json()
+    notification_id = sos['notification_id']
+    ward = [f"patient{i}@example.com" for i in range(500)]
+    signups = iter(range(10 ** 9))
+
+    def req(method, path, c=client, **kwargs):
+        return lambda: getattr(c, method)(path, **kwargs).status_code
+
+    cases = [
+        ('get', '/', anon, {}),
+        ('get', '/login', anon, {}),
+        ('post', '/login', anon, {'data': {'email': BENCH_USER['email'], 'password': BENCH_PASSWORD}}),
+        ('get', '/signup', anon, {}),
+        ('get', '/dashboard', client, {}),
+        ('get', '/detection', client, {}),
+        ('get', '/records', client, {}),
+        ('get', '/records/export.csv', client, {}),
+        ('get', '/emergency', client, {}),
+        ('get', '/trends', client, {}),
+        ('get', '/trends?days=1825', client, {}),
+        ('get', '/faq', client, {}),
+        ('get', '/support', client, {}),
+        ('get', '/resources', client, {}),
+        ('get', '/api/limb_angles', client, {}),
+        ('get', '/api/limb_samples', client, {}),
+        ('get', '/api/live_kpis', client, {}),
+        ('get', '/threshold_monitor', client, {}),
+        ('get', '/brain_heatmap', client, {}),
+        ('get', '/coordination_matrix', client, {}),
+        ('get', '/neural_fatigue', client, {}),
+        ('get', '/cohort', client, {}),
+        ('get', '/api/cohort_risk', client, {}),
+        ('post', '/api/cohort_risk', client, {'json': {'patients': ward}}),
+        ('get', '/api/threshold_check', client, {}),
+        ('get', '/api/snapshot', client, {}),
+        ('get', '/api/coordination', client, {}),
+        ('get', '/api/coordination_lags', client, {}),
+        ('get', '/api/rollups', client, {}),
+        ('post', '/api/send_sos', client, {'json': {'location': {'lat': 0, 'lon': 0}}}),
+        ('get', '/api/notification/{notification_id}', client, {}),
+        ('get', '/api/notification_latency', client, {}),
+        ('post', '/api/acknowledge_alert/{notification_id}', client, {}),
+    ]
+
+    adapter = app.url_map.bind('localhost')
+    result = []
+    for method, template, c, kwargs in cases:
+        # Names keep the placeholder so baselines from different runs line up
+        path = template.format(notification_id=notification_id)
+        endpoint, _ = adapter.match(path.split('?')[0], method.upper())
+        name = template.replace('{notification_id}', '<notification_id>')
+        result.append((f"{method.upper()} {name}", endpoint, req(method, path, c, **kwargs)))
+
+    # Every signup creates a new account, so each call gets a fresh email
+    def signup():
+        return anon.post('/signup', data={'name': 'Bench', 'email': f"signup{next(signups)}@example.com",
+                                          'password': 'password', 'role': 'Patient'}).status_code
+    result.append(('POST /signup', 'signup', signup))
+    return result
+
+
+def method_cases(app_module):
+    """(name, callable) for ThresholdChecker and NotificationService methods"""
+    import numpy as np
+    checker = app_module.threshold_checker
+    service = app_module.notification_service
+    patient = BENCH_USER['email']
+    angles = {'right_arm': 87.0, 'left_arm': 60.0, 'right_leg': 168.0, 'left_leg': 120.0}
+    ward_angles = np.random.default_rng(7).normal(120, 40, (100, 8, 4))
+    alert = {'limb': 'left_arm', 'alert_level': 'RED', 'message': 'bench', 'angle': 60.0}
+    notification_id = service.send_threshold_alert(patient, ['guardian@example.com'], alert)['notification_id']
+    service.flush()
+
+    def call(fn, *args):
+        return lambda: (fn(*args), None)[1]
+
+    return [
+        ('ThresholdChecker.check_limb_angle', call(checker.check_limb_angle, 'left_arm', 60.0)),
+        ('ThresholdChecker.check_all_limbs', call(checker.check_all_limbs, angles)),
+        ('ThresholdChecker.check_brain_sync', call(checker.check_brain_sync, 0.7)),
+        ('ThresholdChecker.calculate_risk_score', call(checker.calculate_risk_score, angles, 0.72, 80)),
+        ('ThresholdChecker.check_limbs_batch[100x8]',
+         call(checker.check_limbs_batch, ward_angles, list(angles), 0.72, 80)),
+        ('NotificationService.send_threshold_alert',
+         call(service.send_threshold_alert, patient, ['guardian@example.com'], alert)),
+        ('NotificationService.send_sos_alert', call(service.send_sos_alert, patient, ['guardian@example.com'])),
+        ('NotificationService.get_unacknowledged_alerts', call(service.get_unacknowledged_alerts, patient)),
+        ('NotificationService.get_alert_summary', call(service.get_alert_summary, patient)),
+        ('NotificationService.get_notification', call(service.get_notification, notification_id)),
+        ('NotificationService.acknowledge_alert',
+         call(service.acknowledge_alert, notification_id, 'guardian@example.com')),
+    ]
+
+
+# ── Scenario runner (spawned process) ────────────────────────────────────────
+
+def run_scenario(name: str, options: dict, results):
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        if name == 'large':
+            write_large_files(options['users'], options['notifications'])
+
+        t0 = time.perf_counter()
+        import app as app_module
+        startup_ms = round((time.perf_counter() - t0) * 1000, 1)
+        app_module.user_store.create(BENCH_USER['email'], BENCH_USER['name'],
+                                     app_module.hash_password(BENCH_PASSWORD), BENCH_USER['role'])
+
+        cases = {}
+        routes = route_cases(app_module)
+        covered = {endpoint for _, endpoint, _ in routes}
+        uncovered = sorted(rule.endpoint for rule in app_module.app.url_map.iter_rules()
+                           if rule.endpoint not in covered and rule.endpoint not in SKIPPED)
+        for case, endpoint, fn in routes:
+            cases[case] = measure(fn, options['iterations'], options['warmup'], options['alloc_iterations'])
+        for case, fn in method_cases(app_module):
+            cases[case] = measure(fn, options['iterations'] * 10, options['warmup'], options['alloc_iterations'])
+
+        app_module.notification_service.close()
+        app_module.cohort_scorer.close()
+        os.chdir(APP_DIR)
+    results.put({'scenario': name, 'startup_ms': startup_ms, 'uncovered': uncovered, 'cases': cases})
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def best_of(rounds: list) -> dict:
+    """Merge repeated runs of a scenario, keeping each case's fastest figures (least disturbed by noise)"""
+    best = rounds[0]
+    for other in rounds[1:]:
+        best['startup_ms'] = min(best['startup_ms'], other['startup_ms'])
+        for case, m in best['cases'].items():
+            o = other['cases'][case]
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'alloc_peak_kb', 'retained_blocks'):
+                m[key] = min(m[key], o[key])
+            m['throughput_rps'] = max(m['throughput_rps'], o['throughput_rps'])
+            m['statuses'] = sorted(set(m['statuses']) | set(o['statuses']))
+    return best
+
+
+def print_scenario(result: dict):
+    print(f"\n== scenario '{result['scenario']}' (app startup {result['startup_ms']:,} ms)")
+    print(f"{'case':<52}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'peak KB':>10}{'blocks':>8}  status")
+    for case, m in result['cases'].items():
+        print(f"{case[:51]:<52}{m['p50_ms']:>9.2f}{m['p95_ms']:>9.2f}{m['p99_ms']:>9.2f}"
+              f"{m['throughput_rps']:>10,.0f}{m['alloc_peak_kb']:>10,.1f}{m['retained_blocks']:>8}"
+              f"  {','.join(map(str, m['statuses'])) or '-'}")
+    for endpoint, reason in SKIPPED.items():
+        print(f"  skipped {endpoint}: {reason}")
+
+
+def compare(results: dict, baseline: dict, metric: str, tolerance: float, min_delta_ms: float) -> list:
+    """Cases slower than baseline * (1 + tolerance) and by more than min_delta_ms"""
+    regressions = []
+    for scenario, result in results.items():
+        base_cases = baseline.get('scenarios', {}).get(scenario, {}).get('cases', {})
+        for case, m in result['cases'].items():
+            base = base_cases.get(case)
+            if base is None or base.get(metric) is None:
+                continue
+            limit = base[metric] * (1 + tolerance)
+            if m[metric] > limit and m[metric] - base[metric] > min_delta_ms:
+                regressions.append((scenario, case, base[metric], m[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--iterations', type=int, default=50, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--alloc-iterations', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='fresh processes per scenario; the best figures of each case are kept')
+    parser.add_argument('--users', type=int, default=10000, help="users.json size ('large')")
+    parser.add_argument('--notifications', type=int, default=100000, help="notifications.json size ('large')")
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='fail on regressions against a baseline')
+    parser.add_argument('--metric', choices=('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'), default='p50_ms',
+                        help='latency compared against the baseline (tails need more --iterations)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (0.25 = +25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    options = {k: getattr(args, k)
+               for k in ('iterations', 'warmup', 'alloc_iterations', 'rounds', 'users', 'notifications')}
+    scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for name in scenarios:
+        rounds = []
+        for _ in range(args.rounds):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_scenario, args=(name, options, queue))
+            proc.start()
+            rounds.append(queue.get())
+            proc.join()
+        results[name] = best_of(rounds)
+        print_scenario(results[name])
+
+    ok = True
+    uncovered = sorted({e for r in results.values() for e in r['uncovered']})
+    if uncovered:
+        print(f"\nroutes without a benchmark case: {', '.join(uncovered)}")
+        ok = False
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                       'python': platform.python_version(), 'machine': platform.platform(),
+                       'options': options, 'scenarios': results}, f, indent=2)
+        print(f"\nbaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('options', {}).get('iterations') != args.iterations:
+            print(f"note: baseline used {baseline.get('options', {}).get('iterations')} iterations")
+        regressions = compare(results, baseline, args.metric, args.tolerance, args.min_delta_ms)
+        print(f"\n{len(regressions)} regression(s) in {args.metric} beyond +{args.tolerance:.0%} "
+              f"(and +{args.min_delta_ms:g} ms) against {args.compare}")
+        for scenario, case, before, after in regressions:
+            print(f"  [{scenario}] {case}: {before:.2f} -> {after:.2f} ms ({after / before - 1:+.0%})")
+        ok = ok and not regressions
+
+    if args.compare or uncovered:
+        print('PASS' if ok else 'FAIL')
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,127 @@
+"""
+Threshold Result Benchmark
+Per-check time and retained memory of LimbCheckResult against the old result dicts
+
+Usage (from the anthropic/ directory):
+    python benchmarks/bench_threshold_results.py [--checks 1000000] [--alert-ratio 0.1]
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.threshold_checker import ThresholdChecker, limb_message
+
+
+# ── Old dict-building implementation, kept for comparison ────────────────────
+
+def legacy_alert_level(deviation_from_range: float):
+    if deviation_from_range >= 15:
+        return 'RED'
+    elif deviation_from_range >= 10:
+        return 'ORANGE'
+    elif deviation_from_range >= 5:
+        return 'YELLOW'
+    return None
+
+
+def legacy_check(checker: ThresholdChecker, limb: str, angle: float) -> dict:
+    thresholds = checker.baseline[limb]
+    min_safe, max_safe, optimal = thresholds['min'], thresholds['max'], thresholds['optimal']
+    deviation = abs(angle - optimal)
+    deviation_from_range = 0
+    if angle < min_safe:
+        deviation_from_range = min_safe - angle
+        direction = 'below'
+    elif angle > max_safe:
+        deviation_from_range = angle - max_safe
+        direction = 'above'
+    else:
+        direction = 'within'
+    alert_level = legacy_alert_level(deviation_from_range)
+    result = {
+        'limb': limb,
+        'angle': round(angle, 1),
+        'status': 'safe' if alert_level is None else 'alert',
+        'alert_level': alert_level,
+        'deviation': round(deviation, 1),
+        'deviation_from_range': round(deviation_from_range, 1),
+        'direction': direction,
+        'safe_range': f"{min_safe}-{max_safe}°",
+        'optimal': optimal,
+        'timestamp': datetime.now().isoformat(),
+        'message': limb_message(limb, angle, alert_level, direction, deviation_from_range),
+    }
+    if alert_level:
+        result['alert_config'] = checker.ALERT_LEVELS[alert_level]
+    return result
+
+
+def readings(count: int, alert_ratio: float):
+    """(limb, angle) pairs; roughly alert_ratio of them breach a threshold"""
+    rng = random.Random(7)
+    limbs = list(ThresholdChecker.SAFE_RANGES)
+    out = []
+    for _ in range(count):
+        limb = rng.choice(limbs)
+        r = ThresholdChecker.SAFE_RANGES[limb]
+        if rng.random() < alert_ratio:
+            angle = r['max'] + rng.uniform(5, 25)
+        else:
+            angle = rng.uniform(r['min'], r['max'])
+        out.append((limb, round(angle, 1)))
+    return out
+
+
+def measure(label: str, check, inputs):
+    """Time the checks and the memory still held by the results afterwards"""
+    gc.collect()
+    started = time.perf_counter()
+    results = [check(limb, angle) for limb, angle in inputs]
+    elapsed = time.perf_counter() - started
+    del results
+
+    gc.collect()
+    tracemalloc.start()
+    results = [check(limb, angle) for limb, angle in inputs]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Rendering cost when a result is actually serialized
+    started = time.perf_counter()
+    for result in results[:100000]:
+        result.to_dict() if hasattr(result, 'to_dict') else dict(result)
+    render = (time.perf_counter() - started) / min(len(results), 100000)
+
+    n = len(inputs)
+    print(f"{label:<18} {elapsed / n * 1e6:8.2f} us/check {retained / n:8.0f} B/check "
+          f"{render * 1e6:8.2f} us/serialize")
+    return elapsed, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--checks', type=int, default=1000000)
+    parser.add_argument('--alert-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    checker = ThresholdChecker()
+    inputs = readings(args.checks, args.alert_ratio)
+    print(f"{args.checks:,} checks, {args.alert_ratio:.0%} outside the safe range\n")
+
+    old_time, old_mem = measure('dict (before)', lambda l, a: legacy_check(checker, l, a), inputs)
+    new_time, new_mem = measure('slots (after)', checker.check_limb_angle, inputs)
+    print(f"\nspeedup {old_time / new_time:.1f}x, memory {old_mem / new_mem:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Notification Lane Load Test
+SOS delivery latency while threshold and summary traffic saturates the dispatcher
+
+Producer threads flood a NotificationService with RED and ORANGE threshold
+alerts and daily summaries faster than the (simulated, sleeping) transport
+can deliver them, while one thread raises an SOS every --sos-interval
+seconds. The same load is run once with every notification in one FIFO lane
+and no reserved worker (the old behaviour), then with priority lanes. The
+test passes when the lanes' SOS p99 stays under --target-ms.
+
+Usage (from the anthropic/ directory):
+    python benchmarks/load_notification_lanes.py [--duration 10] [--target-ms 100]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.notification_service import NotificationService
+
+
+class FifoService(NotificationService):
+    """Everything in one lane, as before priority lanes"""
+
+    @staticmethod
+    def _lane(notification):
+        return 'standard'
+
+
+def run(label: str, service_class, reserved: int, args) -> dict:
+    def transport(guardian, notifications):
+        time.sleep(args.transport_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = service_class(os.path.join(tmp, 'notifications.json'), transport=transport,
+                                workers=args.workers, reserved_workers=reserved,
+                                queue_size=1_000_000)
+        stop = threading.Event()
+
+        def flood(level):
+            i = 0
+            while not stop.is_set():
+                service.send_threshold_alert(f"patient{i % 500}@example.com",
+                                             [f"guardian{i % 200}@example.com"],
+                                             {'limb': 'right_arm', 'alert_level': level, 'message': 'load'})
+                i += 1
+                if i % 20 == 0:
+                    time.sleep(0.001)
+
+        def summaries():
+            i = 0
+            while not stop.is_set():
+                service.send_daily_summary(f"patient{i % 500}@example.com", [f"guardian{i % 200}@example.com"])
+                i += 1
+                time.sleep(0.002)
+
+        def sos():
+            i = 0
+            while not stop.is_set():
+                service.send_sos_alert(f"patient{i % 500}@example.com", ['family@example.com'])
+                i += 1
+                time.sleep(args.sos_interval)
+
+        threads = [threading.Thread(target=flood, args=('RED',)),
+                   threading.Thread(target=flood, args=('ORANGE',)),
+                   threading.Thread(target=summaries),
+                   threading.Thread(target=sos)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        report = service.delivery_latency()
+        service.dispatcher.close(timeout=0)
+
+    print(f"\n{label}")
+    print(f"{'lane':<10}{'submitted':>11}{'delivered':>11}{'queued':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for lane, row in report.items():
+        fmt = lambda v: f"{v:>10.1f}" if v is not None else f"{'-':>10}"
+        print(f"{lane:<10}{row['submitted']:>11,}{row['delivered']:>11,}{row['queued']:>9,}"
+              f"{fmt(row['p50_ms'])}{fmt(row['p99_ms'])}{fmt(row['max_ms'])}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--transport-ms', type=float, default=5,
+                        help='Simulated time per transport call')
+    parser.add_argument('--sos-interval', type=float, default=0.05)
+    parser.add_argument('--target-ms', type=float, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    fifo = run('single FIFO lane (before)', FifoService, 0, args)
+    lanes = run('priority lanes', NotificationService, 1, args)
+
+    sos_p99 = lanes['sos']['p99_ms']
+    saturated = lanes['standard']['queued'] + lanes['summary']['queued'] > 0
+    print(f"\nSOS p99 {fifo['standard']['p99_ms']} ms (FIFO, all traffic) -> {sos_p99} ms "
+          f"(lanes), target {args.target_ms:g} ms, lower lanes {'saturated' if saturated else 'NOT saturated'}")
+    ok = sos_p99 is not None and sos_p99 <= args.target_ms and saturated
+    print('PASS' if ok else 'FAIL')
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
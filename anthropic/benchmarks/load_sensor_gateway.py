@@ -0,0 +1,171 @@
+"""
+Sensor Gateway Load Test
+Runs a SensorGateway on one event loop and drives it with many simulated devices
+
+The gateway runs in this process, built as run_gateway builds it: frames are
+published to sample rings and RED alerts go through the AlertCoalescer to a
+NotificationService, both in a temporary directory. Simulated devices run in
+separate client processes so their CPU cost is not charged to the gateway's
+core. The test passes when every device connects, every frame sent is
+evaluated and the gateway's event-loop lag stays under --max-lag-ms.
+
+Usage (from the anthropic/ directory):
+    python benchmarks/load_sensor_gateway.py --devices 10000 --hz 50 --duration 30
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sensor_gateway import build_gateway, ring_budget, simulate_device
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def run_clients(worker, devices, args, results):
+    """Client process: open this worker's share of devices and stream frames"""
+    raise_fd_limit()
+
+    async def main():
+        ramp = devices / max(args.ramp, 0.001)
+        tasks = []
+        for i in range(devices):
+            patient = f"patient-{worker}-{i}@example.com"
+            tasks.append(asyncio.create_task(simulate_device(
+                args.host, args.port, patient, hz=args.hz, duration=args.duration,
+                packet_interval=args.packet_interval, seed=worker * 100000 + i
+            )))
+            if i % 100 == 99:
+                await asyncio.sleep(100 / ramp)
+        done = await asyncio.gather(*tasks, return_exceptions=True)
+        sent = sum(d for d in done if isinstance(d, int))
+        failed = sum(1 for d in done if not isinstance(d, int))
+        results.put((sent, failed))
+
+    asyncio.run(main())
+
+
+async def measure_lag(samples, interval=0.05):
+    """Record how late the loop wakes up from a fixed sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - start - interval) * 1000)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def serve(args, client_procs, results, workdir):
+    gateway = build_gateway(os.path.join(workdir, 'sample_rings'),
+                            os.path.join(workdir, 'notifications.json'),
+                            batch_interval=args.batch_interval)
+    await gateway.start(args.host, args.port, backlog=args.devices)
+
+    lag = []
+    lag_task = asyncio.create_task(measure_lag(lag))
+    for proc in client_procs:
+        proc.start()
+
+    peak = 0
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    while any(p.is_alive() for p in client_procs):
+        await asyncio.sleep(0.5)
+        peak = max(peak, gateway.stats['connections'])
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    lag_task.cancel()
+    await gateway.stop()
+    gateway.notifier.notifier.close()
+
+    sent = failed = 0
+    for _ in client_procs:
+        s, f = results.get()
+        sent += s
+        failed += f
+
+    stats = gateway.stats
+    lag_p99 = percentile(lag, 99)
+    print(f"devices            {args.devices:,} ({failed} failed, peak {peak:,} concurrent)")
+    print(f"frames sent        {sent:,}")
+    print(f"frames evaluated   {stats['frames_evaluated']:,} ({stats['frames_dropped']:,} dropped, "
+          f"{stats['frames_out_of_order']:,} out of order)")
+    print(f"alerts forwarded   {stats['alerts_forwarded']:,} ({gateway.notifier.stats})")
+    print(f"throughput         {stats['frames_evaluated'] / elapsed:,.0f} frames/s over {elapsed:.1f}s")
+    print(f"gateway CPU        {cpu / elapsed * 100:.0f}% of one core")
+    print(f"batches            {stats['batches']:,} (last {stats['last_batch_ms']:.1f} ms)")
+    print(f"loop lag           p50 {percentile(lag, 50):.1f} ms, p99 {lag_p99:.1f} ms")
+
+    ok = (failed == 0 and peak >= args.devices
+          and stats['frames_evaluated'] == sent and lag_p99 <= args.max_lag_ms)
+    print('PASS' if ok else 'FAIL')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--devices', type=int, default=10000)
+    parser.add_argument('--hz', type=float, default=50)
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Seconds each device streams for')
+    parser.add_argument('--packet-interval', type=float, default=0.2,
+                        help='Seconds between device writes')
+    parser.add_argument('--batch-interval', type=float, default=0.25)
+    parser.add_argument('--ramp', type=float, default=10,
+                        help='Seconds over which devices connect')
+    parser.add_argument('--clients', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='Client processes generating load')
+    parser.add_argument('--max-lag-ms', type=float, default=250)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    limit = raise_fd_limit()
+    if limit < args.devices + 100:
+        print(f"File descriptor limit {limit} is too low for {args.devices} devices", file=sys.stderr)
+        sys.exit(2)
+    if ring_budget() < args.devices:
+        print(f"Only {ring_budget()} sample rings fit the descriptor limit; the rest are "
+              f"reopened every batch (raise ulimit -Hn for a representative run)", file=sys.stderr)
+    # Devices must still be connected together once the ramp is over
+    if args.duration <= args.ramp:
+        args.duration = args.ramp + 5
+
+    results = multiprocessing.Queue()
+    shares = [args.devices // args.clients + (1 if i < args.devices % args.clients else 0)
+              for i in range(args.clients)]
+    client_procs = [multiprocessing.Process(target=run_clients, args=(i, n, args, results))
+                    for i, n in enumerate(shares)]
+
+    workdir = tempfile.mkdtemp(prefix='gateway_load_')
+    try:
+        ok = asyncio.run(serve(args, client_procs, results, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""
+Test Configuration
+Puts the app directory on sys.path so tests import `utils` and `app` as the app does
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
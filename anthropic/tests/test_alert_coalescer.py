@@ -0,0 +1,141 @@
+"""
+Alert Coalescer Tests
+Claiming a new alert, adopting another worker's open alert, escalation and guardian rate limits
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.alert_coalescer import AlertCoalescer
+from utils.notification_service import NotificationService
+from utils.threshold_checker import ThresholdChecker
+
+PATIENT = 'patient@example.com'
+GUARDIANS = ['guardian@example.com']
+
+
+@pytest.fixture
+def open_service(tmp_path):
+    """Opens NotificationServices on one shared database, like separate worker processes"""
+    services = []
+
+    def open_service():
+        service = NotificationService(str(tmp_path / 'notifications.json'),
+                                      transport=lambda guardian, notifications: None)
+        services.append(service)
+        return service
+
+    yield open_service
+    for service in services:
+        service.close()
+
+
+def red_alert(limb='right_arm'):
+    checker = ThresholdChecker()
+    return checker.check_limb_angle(limb, checker.baseline[limb]['max'] + 30).to_dict()
+
+
+def test_first_alert_sent_and_repeats_coalesced(open_service):
+    service = open_service()
+    coalescer = AlertCoalescer(service)
+    first = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+    repeats = [coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert()) for _ in range(3)]
+
+    assert first['coalesced'] is False
+    assert all(r['coalesced'] and r['notification_id'] == first['notification_id'] for r in repeats)
+    assert repeats[-1]['occurrences'] == 4
+    assert coalescer.stats['sent'] == 1 and coalescer.stats['coalesced'] == 3
+    # Another limb is another condition
+    assert coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert('left_leg'))['coalesced'] is False
+
+
+def test_concurrent_reports_claim_one_send(open_service):
+    service = open_service()
+    coalescer = AlertCoalescer(service)
+    reports = 16
+    barrier = threading.Barrier(reports)
+    results = []
+
+    def report():
+        barrier.wait()
+        results.append(coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert()))
+
+    threads = [threading.Thread(target=report) for _ in range(reports)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sent = [r for r in results if not r['coalesced']]
+    assert len(sent) == 1
+    assert coalescer.stats['sent'] == 1 and coalescer.stats['coalesced'] == reports - 1
+    # Repeats that arrived while the send was in flight are counted once it exists
+    assert service.get_notification(sent[0]['notification_id'])['occurrences'] == reports
+
+
+def test_adopts_alert_opened_by_another_worker(open_service):
+    first_worker = open_service()
+    opened = AlertCoalescer(first_worker).send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+    first_worker.flush()
+
+    second_worker = open_service()
+    coalescer = AlertCoalescer(second_worker)
+    adopted = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+
+    assert adopted['coalesced'] is True
+    assert adopted['notification_id'] == opened['notification_id']
+    assert adopted['occurrences'] == 2
+    assert coalescer.stats['sent'] == 0
+
+
+def test_acknowledged_alert_is_not_adopted(open_service):
+    first_worker = open_service()
+    opened = AlertCoalescer(first_worker).send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+    first_worker.acknowledge_alert(opened['notification_id'], GUARDIANS[0])
+    first_worker.flush()
+
+    result = AlertCoalescer(open_service()).send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+    assert result['coalesced'] is False
+    assert result['notification_id'] != opened['notification_id']
+
+
+def test_unacknowledged_alert_escalates(open_service):
+    service = open_service()
+    coalescer = AlertCoalescer(service, escalate_after=0.05, max_escalations=2)
+    opened = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+
+    assert coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())['escalation_id'] is None
+    time.sleep(0.06)
+    escalation_id = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())['escalation_id']
+    assert escalation_id is not None
+    escalation = service.get_notification(escalation_id)
+    assert escalation['details']['escalation'] == 1
+    assert escalation['details']['escalates'] == opened['notification_id']
+    assert escalation['message'].startswith('ESCALATION 1:')
+    # Not due again until another escalate_after has passed
+    assert coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())['escalation_id'] is None
+    assert coalescer.stats['escalated'] == 1
+
+
+def test_acknowledged_alert_stops_escalating(open_service):
+    service = open_service()
+    coalescer = AlertCoalescer(service, escalate_after=0.05)
+    opened = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())
+    service.acknowledge_alert(opened['notification_id'], GUARDIANS[0])
+
+    time.sleep(0.06)
+    assert coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert())['escalation_id'] is None
+    assert coalescer.stats['escalated'] == 0
+
+
+def test_guardian_rate_limit(open_service):
+    coalescer = AlertCoalescer(open_service(), guardian_burst=1, guardian_rate=1e-6)
+    first = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert('right_arm'))
+    second = coalescer.send_threshold_alert(PATIENT, GUARDIANS, red_alert('left_arm'))
+
+    assert first['rate_limited'] == []
+    assert second['rate_limited'] == GUARDIANS
+    assert second['queued_for'] == []
+    assert coalescer.stats['rate_limited'] == 1
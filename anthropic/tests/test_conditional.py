@@ -0,0 +1,107 @@
+"""
+Conditional GET Tests
+ETags on per-user responses and 304s that skip the view
+"""
+
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+from utils.conditional import make_etag, source_version
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """The app, with its databases and ring files in a temporary working directory"""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        yield importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+def login(app_module, email='patient@example.com', name='Pat', role='Patient'):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'email': email, 'name': name, 'role': role}
+    return client
+
+
+def test_make_etag_depends_on_every_part():
+    assert make_etag('v1', 'a@example.com', 3) == make_etag('v1', 'a@example.com', 3)
+    assert make_etag('v1', 'a@example.com', 3) != make_etag('v1', 'a@example.com', 4)
+    assert make_etag('v1', 'a@example.com', 3) != make_etag('v2', 'a@example.com', 3)
+
+
+def test_source_version_changes_when_a_file_does(tmp_path):
+    (tmp_path / 'page.html').write_text('one')
+    before = source_version(str(tmp_path))
+    assert source_version(str(tmp_path)) == before
+    (tmp_path / 'page.html').write_text('three')
+    assert source_version(str(tmp_path)) != before
+
+
+def test_matching_etag_gets_304_without_rendering(app_module, monkeypatch):
+    client = login(app_module)
+    first = client.get('/faq')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == app_module.STATIC_PAGE
+    assert 'Cookie' in first.headers['Vary']
+
+    rendered = []
+    monkeypatch.setattr(app_module, 'render_template', lambda *a, **k: rendered.append(a) or '')
+    again = client.get('/faq', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+    assert again.headers['Cache-Control'] == app_module.STATIC_PAGE
+    assert rendered == []
+
+    # Weak comparison, as browsers may send the tag back weakened
+    assert client.get('/faq', headers={'If-None-Match': 'W/' + etag}).status_code == 304
+
+
+def test_stale_etag_gets_full_response(app_module):
+    client = login(app_module)
+    response = client.get('/faq', headers={'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+    assert response.data
+
+
+def test_etag_is_per_user_and_query(app_module):
+    etag = login(app_module).get('/faq').headers['ETag']
+    other = login(app_module, email='other@example.com', name='Other')
+    assert other.get('/faq', headers={'If-None-Match': etag}).status_code == 200
+
+    client = login(app_module)
+    month = client.get('/records?days=30').headers['ETag']
+    assert client.get('/records?days=30', headers={'If-None-Match': month}).status_code == 304
+    assert client.get('/records?days=60', headers={'If-None-Match': month}).status_code == 200
+
+
+def test_new_sensor_sample_changes_etag(app_module):
+    from utils.sensor_gateway import FRAME_DTYPE
+
+    client = login(app_module, email='streaming@example.com')
+    before = client.get('/api/limb_angles?limb=right_arm').headers['ETag']
+    assert app_module.limb_angles_epoch('streaming@example.com')[1] == 0
+    writer = app_module.SampleRings(app_module.SAMPLE_RING_DIR, FRAME_DTYPE)
+    sample = np.zeros(1, dtype=FRAME_DTYPE)
+    sample['timestamp'] = 1.0
+    writer.writer('streaming@example.com').append(sample)
+
+    # The epoch also ticks every second; the ring head alone must move it
+    assert app_module.limb_angles_epoch('streaming@example.com')[1] == 1
+    response = client.get('/api/limb_angles?limb=right_arm', headers={'If-None-Match': before})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != before
+
+
+def test_login_redirect_has_no_etag(app_module):
+    response = app_module.app.test_client().get('/faq')
+    assert response.status_code == 302
+    assert 'ETag' not in response.headers
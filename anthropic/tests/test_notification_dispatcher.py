@@ -0,0 +1,112 @@
+"""
+Notification Dispatcher Tests
+Lane priority, the reserved SOS worker and retries
+"""
+
+import threading
+
+import pytest
+
+from utils.notification_dispatcher import LANES, NotificationDispatcher
+
+
+class BlockingTransport:
+    """Records deliveries; the first call blocks until released so work queues up behind it"""
+
+    def __init__(self):
+        self.calls = []
+        self.busy = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, guardian, notifications):
+        self.calls.append([n['id'] for n in notifications])
+        if not self.busy.is_set():
+            self.busy.set()
+            assert self.release.wait(5)
+
+
+@pytest.fixture
+def make_dispatcher():
+    dispatchers = []
+
+    def make_dispatcher(transport, on_result=lambda notification, state, attempts: None, **options):
+        options = {'workers': 1, 'reserved_workers': 0, 'batch_wait': 0.0, 'backoff': 0.001, **options}
+        dispatcher = NotificationDispatcher(transport, lambda records: None, on_result, **options)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make_dispatcher
+    for dispatcher in dispatchers:
+        dispatcher.close(1)
+
+
+def notification(notification_id):
+    return {'id': notification_id, 'guardians': ['guardian@example.com']}
+
+
+def test_highest_priority_lane_served_first(make_dispatcher):
+    transport = BlockingTransport()
+    dispatcher = make_dispatcher(transport)
+    dispatcher.submit(notification('busy'), 'summary')
+    assert transport.busy.wait(5)
+
+    # Queued lowest priority first while the only worker is busy
+    for lane in reversed(LANES):
+        assert dispatcher.submit(notification(lane), lane)
+    transport.release.set()
+    assert dispatcher.flush(5)
+
+    assert transport.calls == [['busy']] + [[lane] for lane in LANES]
+    assert dispatcher.stats['delivered'] == len(LANES) + 1
+
+
+def test_sos_does_not_wait_behind_busy_workers(make_dispatcher):
+    transport = BlockingTransport()
+    delivered = threading.Event()
+
+    def on_sos(guardian, notifications):
+        if notifications[0]['id'] == 'sos':
+            delivered.set()
+        transport(guardian, notifications)
+
+    dispatcher = make_dispatcher(on_sos, reserved_workers=1)
+    dispatcher.submit(notification('standard'), 'standard')
+    assert transport.busy.wait(5)
+
+    dispatcher.submit(notification('sos'), 'sos')
+    # The shared worker is still blocked; the reserved one delivers the SOS
+    assert delivered.wait(5)
+    transport.release.set()
+    assert dispatcher.flush(5)
+
+
+def test_new_work_batched_per_guardian(make_dispatcher):
+    transport = BlockingTransport()
+    dispatcher = make_dispatcher(transport)
+    dispatcher.submit(notification('busy'), 'standard')
+    assert transport.busy.wait(5)
+
+    for i in range(3):
+        dispatcher.submit(notification(f'n{i}'), 'standard')
+    transport.release.set()
+    assert dispatcher.flush(5)
+    assert transport.calls == [['busy'], ['n0', 'n1', 'n2']]
+
+
+def test_failed_delivery_retried_then_given_up(make_dispatcher):
+    attempts = []
+    results = []
+
+    def failing(guardian, notifications):
+        attempts.append(notifications[0]['id'])
+        raise ConnectionError('unreachable')
+
+    dispatcher = make_dispatcher(failing, max_attempts=3,
+                                 on_result=lambda n, state, tries: results.append((n['id'], state, tries)))
+    dispatcher.submit(notification('n'), 'critical')
+    assert dispatcher.flush(5)
+
+    assert attempts == ['n', 'n', 'n']
+    assert results == [('n', 'failed', 3)]
+    assert dispatcher.stats['retried'] == 2
+    assert dispatcher.lane_stats['critical']['failed'] == 1
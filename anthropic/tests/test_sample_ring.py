@@ -0,0 +1,117 @@
+"""
+Sample Ring Tests
+Wrap-around, since() and last() reads, timestamp ordering and the SampleRings map budget
+"""
+
+import numpy as np
+import pytest
+
+from utils.sample_ring import SampleRing, SampleRings
+
+DTYPE = np.dtype([('timestamp', '<f8'), ('angle', '<f4')])
+
+
+def samples(stamps):
+    out = np.zeros(len(stamps), dtype=DTYPE)
+    out['timestamp'] = stamps
+    out['angle'] = np.asarray(stamps) * 2
+    return out
+
+
+@pytest.fixture
+def ring(tmp_path):
+    return SampleRing.create(str(tmp_path / 'patient.ring'), 8, DTYPE)
+
+
+def fill(ring, count=21, chunk=3):
+    """Append timestamps 0..count-1 a few at a time, wrapping the ring"""
+    for start in range(0, count, chunk):
+        ring.append(samples(np.arange(start, min(start + chunk, count), dtype=float)))
+
+
+def test_wraps_and_keeps_newest(ring):
+    fill(ring)
+
+    assert ring.head == 21
+    assert len(ring) == ring.capacity
+    assert ring.last(100)['timestamp'].tolist() == list(range(13, 21))
+    assert ring.last(3)['timestamp'].tolist() == [18, 19, 20]
+    assert (ring.last(8)['angle'] == ring.last(8)['timestamp'] * 2).all()
+
+
+def test_append_larger_than_capacity(ring):
+    ring.append(samples(np.arange(30, dtype=float)))
+    assert ring.head == 8
+    assert ring.last(8)['timestamp'].tolist() == list(range(22, 30))
+
+
+@pytest.mark.parametrize('after, expected', [
+    (-1, list(range(13, 21))),      # older than the ring: everything it still holds
+    (12, list(range(13, 21))),
+    (15, [16, 17, 18, 19, 20]),
+    (15.5, [16, 17, 18, 19, 20]),
+    (20, []),
+])
+def test_since_across_the_wrap(ring, after, expected):
+    fill(ring)
+    assert ring.head % ring.capacity != 0
+    assert ring.since(after)['timestamp'].tolist() == expected
+
+
+def test_since_limit_keeps_newest(ring):
+    ring.append(samples(np.arange(1, 9, dtype=float)))
+    assert ring.since(2, limit=3)['timestamp'].tolist() == [6, 7, 8]
+
+
+def test_empty_ring_reads(ring):
+    assert len(ring) == 0
+    assert ring.last(5).size == 0
+    assert ring.since(0).size == 0
+
+
+def test_out_of_order_samples_dropped(ring):
+    assert ring.append(samples([1.0, 2.0, 4.0])) == 0
+    # 3 is older than the published 4; NaN cannot be ordered
+    assert ring.append(samples([3.0, 5.0, np.nan, 4.5, 6.0, 6.0])) == 3
+    assert ring.last(8)['timestamp'].tolist() == [1, 2, 4, 5, 6, 6]
+    assert ring.since(4)['timestamp'].tolist() == [5, 6, 6]
+
+
+def test_reader_sees_writer_samples(tmp_path):
+    writer = SampleRings(str(tmp_path), DTYPE, capacity=8)
+    reader = SampleRings(str(tmp_path))
+    assert reader.reader('a@example.com') is None
+
+    writer.writer('a@example.com').append(samples([1.0, 2.0]))
+    ring = reader.reader('a@example.com')
+    assert not ring.writable
+    assert ring.since(1)['timestamp'].tolist() == [2]
+    with pytest.raises(PermissionError):
+        ring.append(samples([3.0]))
+    writer.writer('a@example.com').append(samples([3.0]))
+    assert ring.since(1)['timestamp'].tolist() == [2, 3]
+
+
+def test_writer_reopened_after_eviction_continues(tmp_path):
+    rings = SampleRings(str(tmp_path), DTYPE, capacity=8, max_open=2)
+    rings.writer('a@example.com').append(samples([1.0, 2.0]))
+    for uid in ('b@example.com', 'c@example.com'):
+        rings.writer(uid).append(samples([1.0]))
+
+    assert len(rings._writers) == 2
+    ring = rings.writer('a@example.com')
+    assert ring.head == 2
+    ring.append(samples([3.0]))
+    assert ring.last(8)['timestamp'].tolist() == [1, 2, 3]
+
+
+def test_layout_change_recreates_ring(tmp_path):
+    path = str(tmp_path / 'patient.ring')
+    SampleRing.create(path, 8, DTYPE).append(samples([1.0]))
+    ring = SampleRing.create(path, 16, DTYPE)
+    assert ring.capacity == 16 and ring.head == 0
+
+
+def test_dtype_needs_leading_timestamp(tmp_path):
+    with pytest.raises(ValueError):
+        SampleRing.create(str(tmp_path / 'patient.ring'), 8, [('angle', '<f4'), ('timestamp', '<f8')])
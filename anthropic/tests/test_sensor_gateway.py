@@ -0,0 +1,65 @@
+"""
+Sensor Gateway Tests
+Micro-batches of buffered frames: ordering into the sample rings and RED transitions
+"""
+
+import numpy as np
+
+from utils.sample_ring import SampleRings
+from utils.sensor_gateway import FRAME_DTYPE, LIMBS, SensorGateway, encode_frames
+from utils.threshold_checker import ThresholdChecker
+
+SAFE = [ThresholdChecker.SAFE_RANGES[limb]['optimal'] for limb in LIMBS]
+
+
+def frames(stamps, angles=SAFE):
+    return encode_frames(stamps, np.tile(angles, (len(stamps), 1)))
+
+
+def test_late_frames_sorted_within_batch(tmp_path):
+    rings = SampleRings(str(tmp_path), FRAME_DTYPE)
+    gateway = SensorGateway(rings=rings)
+    gateway._buffer('a@example.com', frames([1.0, 3.0]))
+    gateway._buffer('b@example.com', frames([1.0, 2.0]))
+    gateway._buffer('a@example.com', frames([2.0, 4.0]))
+    gateway.process_batch()
+
+    assert rings.writer('a@example.com').since(0)['timestamp'].tolist() == [1, 2, 3, 4]
+    assert rings.writer('b@example.com').since(0)['timestamp'].tolist() == [1, 2]
+    assert gateway.latest['a@example.com']['timestamp'] == 4.0
+    assert gateway.stats['frames_out_of_order'] == 0
+
+
+def test_frames_older_than_ring_evaluated_not_stored(tmp_path):
+    rings = SampleRings(str(tmp_path), FRAME_DTYPE)
+    gateway = SensorGateway(rings=rings)
+    gateway._buffer('a@example.com', frames([5.0, 6.0]))
+    gateway.process_batch()
+    gateway._buffer('a@example.com', frames([4.0, 7.0]))
+    gateway.process_batch()
+
+    assert rings.writer('a@example.com').since(0)['timestamp'].tolist() == [5, 6, 7]
+    assert gateway.stats['frames_evaluated'] == 4
+    assert gateway.stats['frames_out_of_order'] == 1
+
+
+def test_alerts_only_when_limb_enters_red():
+    gateway = SensorGateway()
+    red = list(SAFE)
+    red[0] = ThresholdChecker.SAFE_RANGES[LIMBS[0]]['max'] + 30
+
+    gateway._buffer('a@example.com', frames([1.0, 2.0], red))
+    alerts = gateway.process_batch()
+    assert [(a['patient'], a['limb'], a['alert_level']) for a in alerts] == [('a@example.com', LIMBS[0], 'RED')]
+
+    gateway._buffer('a@example.com', frames([3.0], red))
+    assert gateway.process_batch() == []
+    # A batch is judged by its worst reading: a safe frame in between does not end the alert
+    gateway._buffer('a@example.com', frames([4.0]))
+    gateway._buffer('a@example.com', frames([5.0], red))
+    assert gateway.process_batch() == []
+
+    gateway._buffer('a@example.com', frames([6.0]))
+    gateway.process_batch()
+    gateway._buffer('a@example.com', frames([7.0], red))
+    assert len(gateway.process_batch()) == 1
@@ -0,0 +1,85 @@
+"""
+Threshold Checker Tests
+check_limbs_batch agrees with the scalar check_limb_angle and calculate_risk_score
+"""
+
+import numpy as np
+import pytest
+
+from utils.threshold_checker import ThresholdChecker
+
+
+@pytest.fixture
+def checker():
+    return ThresholdChecker()
+
+
+def readings(checker, seed=7):
+    """Angles, brain sync and posture around every band, with NaN and infinite readings mixed in"""
+    rng = np.random.default_rng(seed)
+    limbs = list(checker.baseline)
+    angles = rng.uniform(-60, 220, (16, 6, len(limbs)))
+    angles[0, 0, :] = np.nan
+    angles[1, 0, 0], angles[1, 0, 1] = np.inf, -np.inf
+    # Exactly on each alert boundary, above and below the range
+    for i, offset in enumerate((0, 5, 10, 15)):
+        r = checker.baseline[limbs[0]]
+        angles[2, i, 0] = r['max'] + offset
+        angles[3, i, 0] = r['min'] - offset
+    brain_sync = rng.uniform(0.3, 1.0, angles.shape[:2])
+    brain_sync[0, 1] = np.nan
+    posture = rng.uniform(0, 120, angles.shape[:2])
+    posture[0, 2] = np.nan
+    return limbs, angles, brain_sync, posture
+
+
+def test_batch_alert_codes_match_scalar(checker):
+    limbs, angles, _, _ = readings(checker)
+    batch = checker.check_limbs_batch(angles, limbs)
+    for p, s, l in np.ndindex(angles.shape):
+        scalar = checker.check_limb_angle(limbs[l], float(angles[p, s, l]))
+        assert checker.ALERT_CODES[batch['alert_codes'][p, s, l]] == scalar['alert_level'], \
+            (limbs[l], angles[p, s, l])
+
+
+def test_batch_alerts_match_scalar_results(checker):
+    limbs, angles, _, _ = readings(checker)
+    batch = checker.check_limbs_batch(angles, limbs)
+    assert batch['alert_count'] == len(batch['alerts'])
+    for alert in batch['alerts']:
+        angle = angles[alert['patient'], alert['sample'], limbs.index(alert['limb'])]
+        scalar = checker.check_limb_angle(alert['limb'], float(angle))
+        for key in ('alert_level', 'direction', 'deviation_from_range', 'message'):
+            assert alert[key] == scalar[key]
+
+
+def test_nan_angle_is_safe(checker):
+    limbs = list(checker.baseline)
+    batch = checker.check_limbs_batch(np.full((1, 1, len(limbs)), np.nan), limbs)
+    assert not batch['alert_codes'].any()
+    assert batch['alerts'] == []
+    assert checker.check_limb_angle(limbs[0], float('nan'))['status'] == 'safe'
+
+
+def test_batch_risk_matches_scalar(checker):
+    limbs, angles, brain_sync, posture = readings(checker)
+    batch = checker.check_limbs_batch(angles, limbs, brain_sync, posture)
+    for p, s in np.ndindex(angles.shape[:2]):
+        scalar = checker.calculate_risk_score(dict(zip(limbs, angles[p, s].tolist())),
+                                              float(brain_sync[p, s]), float(posture[p, s]))
+        assert round(float(batch['risk_score'][p, s]), 1) == scalar['total_risk']
+        assert batch['risk_level'][p, s] == scalar['risk_level']
+
+
+def test_risk_score_needs_both_inputs(checker):
+    limbs, angles, brain_sync, posture = readings(checker)
+    assert checker.check_limbs_batch(angles, limbs)['risk_score'] is None
+    with pytest.raises(ValueError):
+        checker.check_limbs_batch(angles, limbs, brain_sync=brain_sync)
+    with pytest.raises(ValueError):
+        checker.check_limbs_batch(angles, limbs, posture_scores=posture)
+
+
+def test_unknown_limb_rejected(checker):
+    with pytest.raises(ValueError):
+        checker.check_limbs_batch(np.zeros((1, 1, 1)), ['tail'])
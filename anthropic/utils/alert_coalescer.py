@@ -0,0 +1,264 @@
+"""
+Alert Coalescer Module
+Duplicate suppression, per-guardian rate limits and escalation for threshold alerts
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average, with bursts of up to `capacity`"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        """Spend one token if one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class _OpenAlert:
+    """An alert whose condition is still being reported (notification_id is None while its send is in flight)"""
+
+    __slots__ = ('notification_id', 'guardians', 'first_seen', 'last_seen', 'occurrences',
+                 'pending_repeats', 'escalations', 'escalation_id', 'persisted_at')
+
+    def __init__(self, notification_id: Optional[str], guardians: List[str], now: float):
+        self.notification_id = notification_id
+        self.guardians = guardians
+        self.first_seen = now
+        self.last_seen = now
+        self.occurrences = 1
+        self.pending_repeats = 0
+        self.escalations = 0
+        self.escalation_id = None
+        self.persisted_at = now
+
+
+class AlertCoalescer:
+    """
+    Front for NotificationService.send_threshold_alert
+
+    Alerts are keyed by (patient, limb, alert_level). The first alert for a
+    key is sent, unless another worker process already has one open, and
+    stays open while the same key is reported again within `window` seconds
+    of the previous report; those repeats only bump the open notification's
+    `occurrences` counter (persisted at most every `persist_interval`
+    seconds). If the condition is still being reported
+    `escalate_after` seconds after it opened, and nobody has acknowledged it,
+    an escalation notification is sent (up to `max_escalations`, spaced
+    `escalate_after` apart). New alerts spend a token from each guardian's
+    bucket; guardians with an empty bucket are left off that notification and
+    listed under `rate_limited`. Escalations are not rate limited.
+
+    The lock only covers in-memory bookkeeping; notification lookups and
+    sends run without it, and anything they decide is re-checked under the
+    lock before it is recorded.
+    """
+
+    def __init__(self, notifier, window: float = 300, guardian_rate: float = 1 / 60,
+                 guardian_burst: int = 5, escalate_after: float = 900, max_escalations: int = 3,
+                 persist_interval: float = 60, max_open: int = 100000):
+        """
+        Initialize the coalescer
+
+        Args:
+            notifier: NotificationService
+            window: Seconds without a repeat after which an alert closes
+            guardian_rate: New alerts per second each guardian may receive
+            guardian_burst: Alerts a guardian may receive back to back
+            escalate_after: Seconds an unacknowledged condition persists before escalating
+            max_escalations: Escalations per open alert
+            persist_interval: Minimum seconds between counter updates written to the log
+            max_open: Open alerts and guardian buckets kept in memory
+        """
+        self.notifier = notifier
+        self.window = window
+        self.guardian_rate = guardian_rate
+        self.guardian_burst = guardian_burst
+        self.escalate_after = escalate_after
+        self.max_escalations = max_escalations
+        self.persist_interval = persist_interval
+        self._open = TTLCache(maxsize=max_open, ttl=window)
+        self._buckets = TTLCache(maxsize=max_open)
+        self._lock = threading.Lock()
+        self.stats = {'sent': 0, 'coalesced': 0, 'escalated': 0, 'rate_limited': 0}
+
+    def _allowed(self, guardians: List[str], now: float):
+        """Split guardians into those with a token and those without"""
+        allowed, limited = [], []
+        for guardian in guardians:
+            bucket = self._buckets.get(guardian)
+            if bucket is None:
+                bucket = TokenBucket(self.guardian_rate, self.guardian_burst, now)
+                self._buckets.set(guardian, bucket)
+            (allowed if bucket.take(now) else limited).append(guardian)
+        return allowed, limited
+
+    def send_threshold_alert(self, patient_email: str, guardian_emails: List[str],
+                             alert_data: Dict, method: str = 'all') -> Dict:
+        """
+        Send a threshold alert unless the same condition already has an open one
+
+        Args:
+            patient_email: Patient's email
+            guardian_emails: List of guardian email addresses
+            alert_data: Alert details from ThresholdChecker
+            method: Notification method ('email', 'sms', 'push', 'all')
+
+        Returns:
+            Dict with the (new or open) notification id and whether it was coalesced
+        """
+        key = (patient_email, alert_data.get('limb'), alert_data.get('alert_level'))
+        now = time.monotonic()
+        with self._lock:
+            entry: Optional[_OpenAlert] = self._open.get(key)
+
+        if entry is None:
+            adopted = self._adopt(key, guardian_emails, now)
+            with self._lock:
+                # Another thread may have opened the key during the lookup
+                entry = self._open.get(key)
+                if entry is None and adopted is None:
+                    # Claim the key so concurrent reports coalesce onto this send
+                    entry = _OpenAlert(None, guardian_emails, now)
+                    self._open.set(key, entry)
+                    allowed, limited = self._allowed(guardian_emails, now)
+                    claimed = True
+                else:
+                    if entry is None:
+                        entry = adopted
+                        self._open.set(key, entry)
+                    claimed = False
+            if claimed:
+                return self._send_new(key, entry, patient_email, allowed, limited, alert_data, method)
+
+        with self._lock:
+            entry.occurrences += 1
+            entry.last_seen = now
+            self._open.set(key, entry)
+            self.stats['coalesced'] += 1
+            notification_id = entry.notification_id
+            if notification_id is None:
+                # Recorded by _send_new once the first notification exists
+                entry.pending_repeats += 1
+                persist = False
+            else:
+                persist = now - entry.persisted_at >= self.persist_interval
+                if persist:
+                    entry.persisted_at = now
+            occurrences = entry.occurrences
+            due = notification_id is not None and self._escalation_due(entry, now)
+
+        if notification_id is not None:
+            occurrences = self.notifier.record_repeat(notification_id, persist=persist) or occurrences
+        escalation = self._maybe_escalate(entry, patient_email, alert_data, method, now) if due else None
+        return {
+            'success': True,
+            'notification_id': notification_id,
+            'coalesced': True,
+            'occurrences': occurrences,
+            'escalation_id': escalation,
+        }
+
+    def _adopt(self, key, guardian_emails: List[str], now: float) -> Optional[_OpenAlert]:
+        """Entry for an open alert another worker process raised for the key, if any (caller stores it)"""
+        patient_email, limb, alert_level = key
+        cutoff = datetime.now() - timedelta(seconds=self.window)
+        notification = self.notifier.find_open_alert(patient_email, limb, alert_level, cutoff)
+        if notification is None:
+            return None
+        entry = _OpenAlert(notification['id'], guardian_emails, now)
+        try:
+            age = (datetime.now() - datetime.fromisoformat(notification['timestamp'])).total_seconds()
+            entry.first_seen = now - max(age, 0)
+        except (KeyError, TypeError, ValueError):
+            pass
+        entry.occurrences = notification.get('occurrences', 1)
+        return entry
+
+    def _send_new(self, key, entry: _OpenAlert, patient_email: str, allowed: List[str],
+                  limited: List[str], alert_data: Dict, method: str) -> Dict:
+        """Send the first notification for a claimed key"""
+        if limited:
+            logger.warning(f"Rate limited alert for {patient_email} to {len(limited)} guardian(s)")
+        try:
+            result = self.notifier.send_threshold_alert(patient_email, allowed, alert_data, method,
+                                                        rate_limited=limited)
+        except Exception:
+            # Release the claim so the next report tries again
+            with self._lock:
+                if self._open.get(key) is entry:
+                    self._open.pop(key)
+            raise
+        with self._lock:
+            entry.notification_id = result['notification_id']
+            pending, entry.pending_repeats = entry.pending_repeats, 0
+            self.stats['sent'] += 1
+            if limited:
+                self.stats['rate_limited'] += 1
+        for _ in range(pending):
+            self.notifier.record_repeat(result['notification_id'], persist=False)
+        return dict(result, coalesced=False, occurrences=1, rate_limited=limited)
+
+    def _escalation_due(self, entry: _OpenAlert, now: float) -> bool:
+        """Whether the next escalation's time has come (caller holds the lock)"""
+        return (entry.escalations < self.max_escalations
+                and now - entry.first_seen >= self.escalate_after * (entry.escalations + 1))
+
+    def _maybe_escalate(self, entry: _OpenAlert, patient_email: str, alert_data: Dict,
+                        method: str, now: float) -> Optional[str]:
+        """Send the next escalation if it is still due and the alert is unacknowledged"""
+        with self._lock:
+            level = entry.escalations
+            watched = [i for i in (entry.notification_id, entry.escalation_id) if i is not None]
+        for notification_id in watched:
+            notification = self.notifier.get_notification(notification_id)
+            if notification is None or notification.get('status') == 'acknowledged':
+                # Acknowledged (or evicted): the caregiver knows, stop escalating
+                with self._lock:
+                    entry.escalations = self.max_escalations
+                return None
+
+        with self._lock:
+            # Another thread may have escalated (or seen an acknowledgement) meanwhile
+            if entry.escalations != level or not self._escalation_due(entry, now):
+                return None
+            entry.escalations += 1
+            level = entry.escalations
+            minutes = (now - entry.first_seen) / 60
+            escalated = dict(alert_data)
+            escalated.update({
+                'escalation': level,
+                'escalates': entry.notification_id,
+                'occurrences': entry.occurrences,
+                'message': f"ESCALATION {level}: {alert_data.get('message', 'Alert triggered')} "
+                           f"(unacknowledged, persisting {minutes:.0f} min)",
+            })
+            guardians = entry.guardians
+
+        result = self.notifier.send_threshold_alert(patient_email, guardians, escalated, method)
+        with self._lock:
+            entry.escalation_id = result['notification_id']
+            self.stats['escalated'] += 1
+        logger.warning(f"Escalated {escalated['escalates']} for {patient_email} "
+                       f"(level {level}, {escalated['occurrences']} reports)")
+        return result['notification_id']
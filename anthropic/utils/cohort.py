@@ -0,0 +1,149 @@
+"""
+Cohort Module
+Fall-risk scores for a whole patient list, computed in chunks across a process pool
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .cache import TTLCache
+from .synthetic import LIMB_BASES, synthetic_kpis, synthetic_limb_angles
+from .threshold_checker import ThresholdChecker, events
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = ('High', 'Moderate', 'Low')
+
+# Fields of calculate_risk_score kept per patient (recommendations stay on the patient's own page)
+ROW_FIELDS = ('total_risk', 'risk_level', 'risk_color', 'breakdown', 'limb_alerts', 'brain_status')
+
+_checker: Optional[ThresholdChecker] = None
+
+
+def score_chunk(patients: Sequence[str]) -> List[Dict]:
+    """
+    Risk rows for a chunk of patients (runs in a pool worker or inline)
+
+    Inputs are the same per-patient readings /threshold_monitor uses:
+    the newest angle of every limb plus the day's brain sync and posture.
+    Their per-check threshold events are muted: a ward of patients would
+    flood the log, whether this runs in a worker or inside a request.
+    """
+    global _checker
+    if _checker is None:
+        _checker = ThresholdChecker()
+    rows = []
+    with events.muted():
+        for patient in patients:
+            angles = {limb: synthetic_limb_angles(patient, limb)[0] for limb in LIMB_BASES}
+            kpis = synthetic_kpis(patient)
+            risk = _checker.calculate_risk_score(angles, kpis['brain_corr'], kpis['posture'])
+            row = {'patient': patient, **{field: risk[field] for field in ROW_FIELDS}}
+            row['angles'] = angles
+            row['brain_sync'] = kpis['brain_corr']
+            row['posture'] = kpis['posture']
+            rows.append(row)
+    return rows
+
+
+class CohortRiskScorer:
+    """
+    Scores patient lists in parallel and caches each list's result briefly
+
+    Work is split into chunks of `chunk_size` patients and mapped over a
+    process pool (started on first use and kept warm), so the per-patient
+    Python work runs on every core. With a single worker, or a list no
+    larger than one chunk, scoring runs inline and skips the IPC.
+
+    Results are cached per patient list for `ttl` seconds; two requests
+    missing the same list at once may both compute it.
+    """
+
+    def __init__(self, workers: int = None, chunk_size: int = 250, ttl: float = 30.0,
+                 cache_size: int = 64):
+        """
+        Initialize the scorer
+
+        Args:
+            workers: Pool processes (default: CPU count)
+            chunk_size: Patients per unit of work sent to a worker
+            ttl: Seconds a scored list stays cached
+            cache_size: Patient lists kept in the cache
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Workers fork from a clean server process that has imported only this
+                # module: never the threaded app process, and never __main__ (which a
+                # spawned worker would re-run, app setup included)
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+                self._pool = ProcessPoolExecutor(self.workers, context)
+            return self._pool
+
+    def compute(self, patients: Sequence[str]) -> List[Dict]:
+        """Risk rows for every patient, in input order (uncached)"""
+        patients = list(patients)
+        if self.workers <= 1 or len(patients) <= self.chunk_size:
+            return score_chunk(patients)
+        chunks = [patients[i:i + self.chunk_size] for i in range(0, len(patients), self.chunk_size)]
+        rows = []
+        for chunk_rows in self._executor().map(score_chunk, chunks):
+            rows.extend(chunk_rows)
+        return rows
+
+    def score(self, patients: Sequence[str]) -> Dict:
+        """
+        Cohort risk for a patient list, ranked highest risk first
+
+        Args:
+            patients: Patient emails (duplicates are scored once)
+
+        Returns:
+            Dict with 'patients' (rows sorted by total_risk, descending),
+            'levels' (patients per risk level), 'computed_at' and 'elapsed_ms'
+        """
+        key = tuple(dict.fromkeys(patients))
+        return self.cache.get_or_compute(key, lambda: self._score(key))
+
+    def _score(self, patients: Sequence[str]) -> Dict:
+        t0 = time.perf_counter()
+        rows = self.compute(patients)
+        rows.sort(key=lambda r: r['total_risk'], reverse=True)
+        levels = dict.fromkeys(RISK_LEVELS, 0)
+        for row in rows:
+            levels[row['risk_level']] += 1
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        logger.info(f"Cohort of {len(rows)} patients scored in {elapsed_ms} ms "
+                    f"({math.ceil(len(rows) / self.chunk_size)} chunks, {self.workers} workers)")
+        return {'patients': rows, 'levels': levels, 'computed_at': time.time(), 'elapsed_ms': elapsed_ms}
+
+    @staticmethod
+    def ranked(result: Dict, order: str = 'desc') -> List[Dict]:
+        """Rows of a score() result by total risk ('desc': highest first, 'asc': lowest first)"""
+        rows = result['patients']
+        return rows if order == 'desc' else rows[::-1]
+
+    def warm(self):
+        """Start the pool processes ahead of the first request"""
+        if self.workers > 1:
+            list(self._executor().map(score_chunk, [[]] * self.workers))
+
+    def close(self):
+        """Shut the pool down"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,48 @@
+"""
+Conditional Module
+Cheap validators (ETags) for responses that only change on a known schedule
+"""
+
+import hashlib
+import os
+from typing import Hashable
+
+
+def source_version(*paths: str) -> str:
+    """
+    Version of the code and templates that shape a response
+
+    Derived from the relative path, size and mtime of every file under the
+    given paths, so it is identical in every worker process serving the
+    same deployment and changes whenever a file is edited or replaced.
+
+    Args:
+        paths: Files or directories
+
+    Returns:
+        Short hex digest
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for root in paths:
+        if os.path.isfile(root):
+            files = [root]
+        else:
+            files = sorted(os.path.join(d, f) for d, _, names in os.walk(root) for f in names
+                           if not f.endswith(('.pyc', '.pyo')))
+        for path in files:
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def make_etag(*parts: Hashable) -> str:
+    """
+    Opaque entity tag for a response identified by `parts`
+
+    Args:
+        parts: Everything the response depends on (version, user, data epoch, query)
+
+    Returns:
+        32 hex characters (without quotes)
+    """
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
@@ -0,0 +1,204 @@
+"""
+Correlation Module
+Streaming Pearson correlation over sliding time windows
+"""
+
+import threading
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+# Default sliding windows (seconds)
+DEFAULT_WINDOWS = {'1m': 60, '10m': 600, '1h': 3600}
+
+
+class _WindowMoments:
+    """Welford mean / co-moment matrix for the samples inside one window"""
+
+    def __init__(self, size: int, seconds: float):
+        self.seconds = seconds
+        self.n = 0
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+        self.start = 0          # absolute index of the oldest sample in the window
+        self.removals = 0       # removals since the last exact recompute
+
+    def add(self, x: np.ndarray):
+        self.n += 1
+        dx = x - self.mean
+        self.mean += dx / self.n
+        self.comoment += np.outer(dx, x - self.mean)
+
+    def remove(self, x: np.ndarray):
+        if self.n <= 1:
+            self.n = 0
+            self.mean[:] = 0
+            self.comoment[:] = 0
+            return
+        old_mean = self.mean.copy()
+        self.n -= 1
+        self.mean -= (x - self.mean) / self.n
+        self.comoment -= np.outer(x - self.mean, x - old_mean)
+        self.removals += 1
+
+    def reset(self, values: np.ndarray):
+        self.n = len(values)
+        if self.n:
+            self.mean = values.mean(axis=0)
+            centered = values - self.mean
+            self.comoment = centered.T @ centered
+        else:
+            self.mean[:] = 0
+            self.comoment[:] = 0
+        self.removals = 0
+
+    def correlation(self) -> np.ndarray:
+        variance = np.diag(self.comoment)
+        denom = np.sqrt(np.outer(variance, variance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.where(denom > 0, self.comoment / denom, 0.0)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+
+class StreamingCorrelation:
+    """
+    Incremental Pearson correlation matrix for several signals
+
+    Every sample updates the mean vector and co-moment matrix of each
+    sliding window in O(1) per signal pair (Welford updates for samples
+    entering, reverse updates for samples leaving). Samples live once in a
+    shared time-ordered buffer; each window only tracks where it starts.
+    """
+
+    def __init__(self, names: Sequence[str], windows: Dict[str, float] = None,
+                 recompute_every: int = 10000, initial_capacity: int = 1024):
+        """
+        Initialize the engine
+
+        Args:
+            names: Signal names (matrix row/column order)
+            windows: Window name -> length in seconds
+            recompute_every: Removals after which a window is recomputed
+                             exactly to cancel floating-point drift
+            initial_capacity: Starting sample buffer size
+        """
+        self.names = list(names)
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.recompute_every = recompute_every
+        size = len(self.names)
+        self._moments = {w: _WindowMoments(size, s) for w, s in self.windows.items()}
+        self._times = np.empty(initial_capacity)
+        self._values = np.empty((initial_capacity, size))
+        self._base = 0          # absolute index of buffer position 0
+        self._count = 0         # samples currently in the buffer
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_timestamp(self) -> float:
+        return float(self._times[self._count - 1]) if self._count else None
+
+    def _append(self, timestamp: float, x: np.ndarray):
+        if self._count == len(self._times):
+            # Drop samples that no window needs any more before growing
+            oldest = min(m.start for m in self._moments.values()) - self._base
+            if oldest > 0:
+                keep = slice(oldest, self._count)
+                self._times[:self._count - oldest] = self._times[keep]
+                self._values[:self._count - oldest] = self._values[keep]
+                self._count -= oldest
+                self._base += oldest
+            if self._count == len(self._times):
+                self._times = np.resize(self._times, 2 * len(self._times))
+                self._values = np.resize(self._values, (2 * len(self._values), len(self.names)))
+        self._times[self._count] = timestamp
+        self._values[self._count] = x
+        self._count += 1
+
+    def update(self, values: Sequence[float], timestamp: float = None):
+        """
+        Add one sample (one value per signal)
+
+        Args:
+            values: Signal values in `names` order
+            timestamp: POSIX time of the sample (defaults to now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        x = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            self._append(timestamp, x)
+            for moments in self._moments.values():
+                moments.add(x)
+                cutoff = timestamp - moments.seconds
+                while moments.start - self._base < self._count - 1 and \
+                        self._times[moments.start - self._base] <= cutoff:
+                    moments.remove(self._values[moments.start - self._base])
+                    moments.start += 1
+                if moments.removals >= self.recompute_every:
+                    first = moments.start - self._base
+                    moments.reset(self._values[first:self._count])
+
+    def update_many(self, values, timestamps):
+        """Add a block of samples, shape (samples, signals), in time order"""
+        for x, ts in zip(np.asarray(values, dtype=np.float64), timestamps):
+            self.update(x, float(ts))
+
+    def matrix(self, window: str) -> np.ndarray:
+        """Current correlation matrix for a window (signals x signals)"""
+        with self._lock:
+            return self._moments[window].correlation()
+
+    def sample_count(self, window: str) -> int:
+        """Samples currently inside a window"""
+        return self._moments[window].n
+
+    def pair(self, window: str, a: str, b: str) -> float:
+        """Current correlation between two named signals"""
+        return float(self.matrix(window)[self.names.index(a), self.names.index(b)])
+
+
+def analyze_symmetry(names: List[str], matrix_pct) -> Dict:
+    """
+    Left/right symmetry scores and asymmetry alerts from a limb matrix
+
+    Args:
+        names: Limb names in matrix order (must include both arms and legs)
+        matrix_pct: Correlation matrix in percent
+
+    Returns:
+        Dict with 'symmetry_analysis' and 'abnormal_patterns'
+    """
+    index = {name: i for i, name in enumerate(names)}
+    right_left_arm = round(float(matrix_pct[index['right_arm']][index['left_arm']]), 1)
+    right_left_leg = round(float(matrix_pct[index['right_leg']][index['left_leg']]), 1)
+
+    symmetry_analysis = {
+        'arm_symmetry': right_left_arm,
+        'leg_symmetry': right_left_leg,
+        'overall_symmetry': round((right_left_arm + right_left_leg) / 2, 1),
+        'status': 'Excellent' if right_left_arm > 85 and right_left_leg > 85 else
+                 'Good' if right_left_arm > 75 and right_left_leg > 75 else
+                 'Fair' if right_left_arm > 65 and right_left_leg > 65 else
+                 'Poor'
+    }
+
+    abnormal_patterns = []
+    if right_left_arm < 70:
+        abnormal_patterns.append({
+            'type': 'Arm Asymmetry',
+            'description': f'Left-right arm correlation is low ({right_left_arm}%). This may indicate unilateral weakness.',
+            'severity': 'warning'
+        })
+    if right_left_leg < 70:
+        abnormal_patterns.append({
+            'type': 'Leg Asymmetry',
+            'description': f'Left-right leg correlation is low ({right_left_leg}%). Gait analysis recommended.',
+            'severity': 'warning'
+        })
+
+    return {'symmetry_analysis': symmetry_analysis, 'abnormal_patterns': abnormal_patterns}
@@ -0,0 +1,137 @@
+"""
+Cross-Correlation Module
+FFT-based lagged cross-correlation for every pair of N joint signals
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+# COCO 17-keypoint skeleton
+SKELETON_17 = (
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+)
+
+
+def _fast_length(n: int) -> int:
+    """Smallest 2^a * 3^b >= n (sizes numpy's pocketfft handles quickly)"""
+    best = 1 << (n - 1).bit_length()
+    p3 = 1
+    while p3 < best:
+        p2 = p3
+        while p2 < n:
+            p2 *= 2
+        best = min(best, p2)
+        p3 *= 3
+    return best
+
+
+def lagged_cross_correlation(signals, max_lag: int, segment: int = 4096) -> np.ndarray:
+    """
+    Normalized cross-correlation of every signal pair for lags -max_lag..max_lag
+
+    The series is cut into segments of `segment` samples. Each segment of
+    signal i is correlated (via one batched FFT) with the same segment of
+    signal j extended by max_lag samples on both sides, so the sum over
+    segments is exact for every lag in range. Cross-spectra for all pairs
+    are accumulated with one batched matrix product per frequency.
+
+    Args:
+        signals: Array of shape (joints, samples)
+        max_lag: Largest lag in samples (both directions)
+        segment: Segment length in samples
+
+    Returns:
+        Array of shape (joints, joints, 2 * max_lag + 1) where
+        [i, j, max_lag + k] is the Pearson correlation of x_i[t] with x_j[t + k]
+    """
+    x = np.asarray(signals, dtype=np.float64)
+    n_joints, n = x.shape
+    max_lag = int(min(max_lag, n - 1))
+
+    # z-score so the raw sums become correlations; float32 halves FFT cost
+    std = x.std(axis=1, keepdims=True)
+    std[std == 0] = 1.0
+    z = ((x - x.mean(axis=1, keepdims=True)) / std).astype(np.float32)
+
+    segment = int(min(segment, n))
+    n_segments = -(-n // segment)
+    span = segment + 2 * max_lag
+    nfft = _fast_length(span)
+
+    # Zero-pad so every extended segment is in bounds
+    source = np.zeros((n_joints, max_lag + n_segments * segment + max_lag), dtype=np.float32)
+    source[:, max_lag:max_lag + n] = z
+
+    # Short segments (i side) and lag-extended segments (j side), as strided views
+    step = source.strides[1] * segment
+    short = np.lib.stride_tricks.as_strided(
+        source[:, max_lag:], (n_joints, n_segments, segment), (source.strides[0], step, source.strides[1]))
+    extended = np.lib.stride_tricks.as_strided(
+        source, (n_joints, n_segments, span), (source.strides[0], step, source.strides[1]))
+
+    short_f = np.fft.rfft(short, n=nfft, axis=-1)          # (joints, segments, freqs)
+    extended_f = np.fft.rfft(extended, n=nfft, axis=-1)
+
+    # Cross-spectrum summed over segments: (freqs, joints, joints)
+    cross = np.matmul(np.conj(short_f.transpose(2, 0, 1)), extended_f.transpose(2, 1, 0))
+
+    # Only the upper triangle needs an inverse FFT: xcorr[j, i, k] = xcorr[i, j, -k]
+    rows, cols = np.triu_indices(n_joints)
+    upper = np.fft.irfft(cross[:, rows, cols].T, n=nfft, axis=-1)[:, :2 * max_lag + 1]
+
+    # upper[..., m] pairs x_i[t] with x_j[t + m - max_lag]
+    lags = np.arange(-max_lag, max_lag + 1)
+    upper = upper.astype(np.float64) / (n - np.abs(lags))
+    result = np.empty((n_joints, n_joints, 2 * max_lag + 1))
+    result[rows, cols] = upper
+    result[cols, rows] = upper[:, ::-1]
+    return result
+
+
+def peak_lag_analysis(signals, names: Sequence[str], sample_rate: float,
+                      max_lag_seconds: float = 2.0, segment: int = 4096,
+                      tolerance: float = 0.05) -> Dict:
+    """
+    Peak correlation and the lag at which it occurs for every joint pair
+
+    Periodic movement (gait) repeats its peak once per stride, so the lag
+    reported is the local maximum closest to zero whose correlation is
+    within `tolerance` of the highest one.
+
+    Args:
+        signals: Array of shape (joints, samples)
+        names: Joint names in row order
+        sample_rate: Samples per second
+        max_lag_seconds: Largest phase offset searched (both directions)
+        segment: FFT segment length in samples
+        tolerance: Correlation margin for preferring a shorter lag
+
+    Returns:
+        Dict with joint names, NxN 'peak_correlation', NxN 'peak_lag_seconds'
+        (positive = column joint lags the row joint) and 'zero_lag_correlation'
+    """
+    max_lag = int(round(max_lag_seconds * sample_rate))
+    xcorr = lagged_cross_correlation(signals, max_lag, segment=segment)
+
+    # Local maxima (ends count) close to the global peak, nearest to zero lag wins
+    padded = np.pad(xcorr, ((0, 0), (0, 0), (1, 1)), constant_values=-np.inf)
+    local_max = (xcorr >= padded[..., :-2]) & (xcorr >= padded[..., 2:])
+    candidates = local_max & (xcorr >= xcorr.max(axis=-1, keepdims=True) - tolerance)
+    distance = np.abs(np.arange(-max_lag, max_lag + 1))
+    best = np.argmin(np.where(candidates, distance, np.iinfo(np.int64).max), axis=-1)
+    peak = np.take_along_axis(xcorr, best[..., None], axis=-1)[..., 0]
+    lag_seconds = (best - max_lag) / sample_rate
+
+    return {
+        'joints': list(names),
+        'sample_rate': sample_rate,
+        'max_lag_seconds': max_lag / sample_rate,
+        'peak_correlation': np.round(peak, 3).tolist(),
+        'peak_lag_seconds': np.round(lag_seconds, 3).tolist(),
+        'zero_lag_correlation': np.round(xcorr[..., max_lag], 3).tolist(),
+    }
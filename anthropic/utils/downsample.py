@@ -0,0 +1,125 @@
+"""
+Downsample Module
+Reduces long chart series to a point budget while keeping their visual shape
+"""
+
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+
+# Bounds for the per-chart point budget
+MIN_POINTS = 50
+MAX_POINTS = 2000
+DEFAULT_POINTS = 400
+
+
+def point_budget(points: int = None, width: int = None) -> int:
+    """
+    Number of points to send for a chart
+
+    Args:
+        points: Explicit budget requested by the client (optional)
+        width: Chart width in pixels; one point per 2px is plenty (optional)
+    """
+    if points is None:
+        points = width // 2 if width else DEFAULT_POINTS
+    return int(min(max(points, MIN_POINTS), MAX_POINTS))
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection over an evenly spaced series
+
+    Args:
+        y: Series values
+        threshold: Number of points to keep (>= 3)
+
+    Returns:
+        Sorted indices of the points to keep, always including both ends
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = stop if i + 2 < len(edges) else n - 1
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        bx = x[start:stop]
+        by = y[start:stop]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    Keep the minimum and maximum of each bucket (2 points per bucket)
+
+    Cheaper than LTTB and guarantees every local extreme survives.
+    """
+    n = len(y)
+    if buckets * 2 >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    lows = np.minimum.reduceat(y, edges[:-1])[bucket_of]
+    highs = np.maximum.reduceat(y, edges[:-1])[bucket_of]
+
+    def first_per_bucket(mask):
+        idx = np.flatnonzero(mask)
+        return idx[np.r_[True, np.diff(bucket_of[idx]) != 0]]
+
+    keep = np.union1d(first_per_bucket(y == lows), first_per_bucket(y == highs))
+    return np.union1d(keep, [0, n - 1])
+
+
+def downsample_indices(columns: Dict[str, np.ndarray], budget: int,
+                       peak_metrics: Iterable[str] = ()) -> np.ndarray:
+    """
+    Shared x positions for several series plotted on one axis
+
+    Each series gets an equal share of the budget; the union of the
+    selections is used for all of them. Peak metrics are reduced with
+    min/max bucketing instead of LTTB so every spike survives.
+    """
+    lengths = {len(col) for col in columns.values()}
+    if not lengths:
+        return np.arange(0)
+    n = lengths.pop()
+    if n <= budget:
+        return np.arange(n)
+
+    peak_metrics = set(peak_metrics)
+    share = max(3, budget // max(1, len(columns)))
+    keep = [
+        minmax_indices(col, max(1, share // 2)) if name in peak_metrics else lttb_indices(col, share)
+        for name, col in columns.items()
+    ]
+    return np.unique(np.concatenate(keep))
+
+
+def take(series: Dict[str, Sequence], indices: np.ndarray) -> Dict[str, list]:
+    """Select the given positions from every series, returning plain lists"""
+    taken = {}
+    for name, values in series.items():
+        if isinstance(values, np.ndarray):
+            taken[name] = values[indices].tolist()
+        else:
+            taken[name] = [values[i] for i in indices]
+    return taken
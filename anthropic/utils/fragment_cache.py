@@ -0,0 +1,143 @@
+"""
+Fragment Cache Module
+Byte-bounded LRU cache for rendered template fragments and the Jinja {% cache %} tag
+"""
+
+import itertools
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from .conditional import make_etag
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    """
+    Least-recently-used store of rendered HTML, bounded by size in bytes
+
+    Entries are evicted oldest-first once their total size passes
+    `max_bytes`; a single fragment larger than `max_entry_bytes` is never
+    stored (it is rendered every time instead of flushing the cache).
+    Keys carry their own epoch, so there is no expiry: fragments of a past
+    epoch are simply never asked for again and age out.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 2**20, max_entry_bytes: int = 2**20):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Total size of cached fragments before LRU eviction
+            max_entry_bytes: Largest fragment worth caching
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @staticmethod
+    def sizeof(value: str) -> int:
+        """Memory held by a fragment (the str object itself)"""
+        return sys.getsizeof(value)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return a cached fragment, or None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: str) -> bool:
+        """
+        Store a fragment, evicting the least recently used ones to make room
+
+        Returns:
+            False if the fragment is too large to cache
+        """
+        size = self.sizeof(value)
+        if size > self.max_entry_bytes:
+            return False
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        """Remove every fragment"""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        """Entry count, size and hit/miss/eviction counters"""
+        with self._lock:
+            return {'entries': len(self._data), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class FragmentCacheExtension(Extension):
+    """
+    `{% cache 'name', key... %} ... {% endcache %}` for Jinja templates
+
+    The body is rendered once per distinct key and served from
+    `environment.fragment_cache` afterwards; nothing inside the block is
+    evaluated on a hit. The key parts (typically the user and a data epoch)
+    are hashed by value, so they may be any repr-able objects.
+
+    Each tag is also keyed by its template, line and compilation, so editing
+    a template (with auto-reload) never serves fragments of the old source.
+    Without a `fragment_cache` on the environment, blocks render uncached.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+        self._compilations = itertools.count()
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        site = nodes.Const(f"{parser.name}:{lineno}:{next(self._compilations)}")
+        return nodes.CallBlock(self.call_method('_cache_support', [site, nodes.List(args)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, site, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = (site, make_etag(*parts))
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(key, fragment)
+        return fragment
@@ -0,0 +1,117 @@
+"""
+History Module
+Columnar daily history: one NumPy array per metric
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from .synthetic import LIMB_BASES
+
+
+class HistoryColumns:
+    """
+    Column-oriented daily history for one patient
+
+    Each metric is a 1-D array of the same length, ordered by date. Use
+    to_records() only where a template needs one dict per day.
+    """
+
+    METRICS = ('mobility', 'posture', 'fall_risk', 'steps', 'brain_corr',
+               'right_arm', 'left_arm', 'right_leg', 'left_leg')
+
+    def __init__(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        """
+        Args:
+            dates: datetime64[D] array, one entry per day
+            columns: Metric name -> array of len(dates)
+        """
+        self.dates = dates
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        return self.columns[metric]
+
+    def slice(self, start: int = None, stop: int = None) -> 'HistoryColumns':
+        """View of a contiguous range of days (no copy)"""
+        window = slice(start, stop)
+        return HistoryColumns(self.dates[window],
+                              {name: col[window] for name, col in self.columns.items()})
+
+    def tail(self, days: int) -> 'HistoryColumns':
+        """View of the last N days"""
+        return self.slice(max(0, len(self) - days))
+
+    def date_strings(self) -> List[str]:
+        """Dates formatted as YYYY-MM-DD"""
+        return np.datetime_as_string(self.dates, unit='D').tolist()
+
+    def to_lists(self, metrics=None) -> Dict[str, list]:
+        """Plain Python lists per column (plus 'date'), ready for JSON"""
+        metrics = metrics or self.METRICS
+        data = {'date': self.date_strings()}
+        for name in metrics:
+            data[name] = self.columns[name].tolist()
+        return data
+
+    def to_records(self) -> List[Dict]:
+        """One dict per day, in the shape the templates expect"""
+        data = self.to_lists()
+        keys = list(data)
+        return [dict(zip(keys, row)) for row in zip(*data.values())]
+
+    def rolling_mean(self, metric: str, window: int) -> np.ndarray:
+        """Trailing mean over `window` days; NaN until a full window exists"""
+        values = self.columns[metric].astype(np.float64)
+        out = np.full(len(values), np.nan)
+        if len(values) >= window:
+            sums = np.cumsum(np.r_[0.0, values])
+            out[window - 1:] = (sums[window:] - sums[:-window]) / window
+        return out
+
+    def weekday_means(self, metric: str) -> List[float]:
+        """Mean of a metric per weekday, Monday first (0.0 for missing days; NaN is skipped)"""
+        values = self.columns[metric].astype(np.float64)
+        present = ~np.isnan(values)
+        # 1970-01-01 was a Thursday, so shift by 3 to make Monday 0
+        weekdays = (self.dates[present].astype(np.int64) + 3) % 7
+        values = values[present]
+        sums = np.bincount(weekdays, weights=values, minlength=7)
+        counts = np.bincount(weekdays, minlength=7)
+        means = np.divide(sums, counts, out=np.zeros(7), where=counts > 0)
+        return np.round(means, 1).tolist()
+
+
+def generate_history(seed: int, days: int, end: date = None) -> HistoryColumns:
+    """
+    Generate synthetic daily history in one vectorized call
+
+    Args:
+        seed: RNG seed (use a stable per-user value)
+        days: Number of days
+        end: Day after the last generated day (defaults to today)
+
+    Returns:
+        HistoryColumns covering [end - days, end)
+    """
+    rnd = np.random.default_rng(seed)
+    end = end or date.today()
+    start = np.datetime64(end - timedelta(days=days), 'D')
+    dates = start + np.arange(days)
+
+    columns = {
+        'mobility': rnd.integers(55, 96, days),
+        'posture': rnd.integers(50, 99, days),
+        'fall_risk': rnd.integers(5, 56, days),
+        'steps': rnd.integers(1800, 9401, days),
+        'brain_corr': np.round(rnd.uniform(0.55, 0.97, days), 2),
+    }
+    for limb, base in LIMB_BASES.items():
+        columns[limb] = np.round(base + rnd.uniform(-12, 12, days), 1)
+
+    return HistoryColumns(dates, columns)
@@ -0,0 +1,218 @@
+"""
+History Store Module
+Per-patient columnar daily history on disk, read through memory maps
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict
+
+import numpy as np
+
+from .cache import TTLCache
+from .history import HistoryColumns
+
+logger = logging.getLogger(__name__)
+
+
+# On-disk dtype per metric (little-endian, fixed width)
+SCHEMA = {
+    'mobility': '<i2',
+    'posture': '<i2',
+    'fall_risk': '<i2',
+    'steps': '<i4',
+    'brain_corr': '<f8',
+    'right_arm': '<f8',
+    'left_arm': '<f8',
+    'right_leg': '<f8',
+    'left_leg': '<f8',
+}
+
+# Sidecar time index: one date per row, strictly increasing
+INDEX_FILE = 'date.idx'
+INDEX_DTYPE = np.dtype('<M8[D]')
+
+# Per-patient advisory lock serialising writers across processes
+LOCK_FILE = '.lock'
+
+
+class HistoryStore:
+    """
+    One directory per patient holding one raw column file per metric
+
+    Rows are appended to the end of every column file, then the date
+    index is extended; the index length is the committed row count, so a
+    reader never sees a half-written row. Readers memory-map the files and
+    binary-search the index, so a range query only touches the pages it
+    returns. Appends hold an exclusive flock on the patient's lock file, so
+    writers in different worker processes never interleave; readers take no
+    lock.
+    """
+
+    def __init__(self, directory: str = 'history_store', schema: Dict[str, str] = None,
+                 max_maps: int = 512):
+        """
+        Initialize the store
+
+        Args:
+            directory: Root directory (created if missing)
+            schema: Metric name -> NumPy dtype string
+            max_maps: Memory maps kept open across all patients; every map
+                holds a file descriptor, and a patient needs one per column
+                plus the index
+        """
+        self.directory = directory
+        self.schema = {name: np.dtype(dtype) for name, dtype in (schema or SCHEMA).items()}
+        self.maps_per_patient = len(self.schema) + 1
+        self._maps = TTLCache(maxsize=max(1, max_maps // self.maps_per_patient))
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"HistoryStore initialized ({directory})")
+
+    def _patient_dir(self, uid: str) -> str:
+        # Hash the id so any email is a safe directory name
+        return os.path.join(self.directory, hashlib.sha256(uid.encode()).hexdigest()[:24])
+
+    def _schema_doc(self) -> Dict[str, str]:
+        return {name: dtype.str for name, dtype in self.schema.items()}
+
+    def exists(self, uid: str) -> bool:
+        """Whether any rows have been stored for the patient"""
+        return self.row_count(uid) > 0
+
+    def row_count(self, uid: str) -> int:
+        """Committed rows for a patient"""
+        try:
+            size = os.path.getsize(os.path.join(self._patient_dir(uid), INDEX_FILE))
+        except FileNotFoundError:
+            return 0
+        return size // INDEX_DTYPE.itemsize
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _locked(self, path: str):
+        """Exclusive lock on a patient directory, held across threads and processes"""
+        os.makedirs(path, exist_ok=True)
+        # Each open() is its own lock holder, so this also serialises threads
+        fd = os.open(os.path.join(path, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _open_for_append(self, path: str) -> int:
+        """Check the schema and drop any uncommitted tail (caller holds the patient lock)"""
+        schema_file = os.path.join(path, 'schema.json')
+        if os.path.exists(schema_file):
+            with open(schema_file) as f:
+                if json.load(f) != self._schema_doc():
+                    raise ValueError(f'Schema mismatch in {path}')
+        else:
+            # Write then rename, so a crash never leaves a truncated schema
+            tmp = f'{schema_file}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._schema_doc(), f)
+            os.replace(tmp, schema_file)
+
+        index_file = os.path.join(path, INDEX_FILE)
+        rows = os.path.getsize(index_file) // INDEX_DTYPE.itemsize if os.path.exists(index_file) else 0
+        if rows and os.path.getsize(index_file) != rows * INDEX_DTYPE.itemsize:
+            with open(index_file, 'r+b') as f:
+                f.truncate(rows * INDEX_DTYPE.itemsize)
+        for name, dtype in self.schema.items():
+            column = os.path.join(path, name + '.col')
+            if os.path.exists(column) and os.path.getsize(column) > rows * dtype.itemsize:
+                # Columns written by an append that never reached the index
+                with open(column, 'r+b') as f:
+                    f.truncate(rows * dtype.itemsize)
+        return rows
+
+    def append(self, uid: str, history: HistoryColumns, skip_existing: bool = False):
+        """
+        Append daily rows for a patient
+
+        Args:
+            uid: Patient id
+            history: Rows to add; every date must be later than the last stored one
+            skip_existing: Drop rows at or before the last stored date instead of raising
+        """
+        if not len(history):
+            return
+        dates = np.asarray(history.dates, dtype=INDEX_DTYPE)
+        if np.any(dates[1:] <= dates[:-1]):
+            raise ValueError('History dates must be strictly increasing')
+        path = self._patient_dir(uid)
+
+        with self._locked(path):
+            # Row count and last date are read under the lock, after any other writer committed
+            rows = self._open_for_append(path)
+            if rows:
+                last = np.fromfile(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE,
+                                   count=1, offset=(rows - 1) * INDEX_DTYPE.itemsize)[0]
+                if dates[0] <= last:
+                    if not skip_existing:
+                        raise ValueError(f'Rows must start after {last}')
+                    keep = int(np.searchsorted(dates, last, side='right'))
+                    history = history.slice(keep)
+                    dates = dates[keep:]
+                    if not len(dates):
+                        return
+
+            for name, dtype in self.schema.items():
+                with open(os.path.join(path, name + '.col'), 'ab') as f:
+                    f.write(np.asarray(history[name]).astype(dtype).tobytes())
+            # The index goes last: it commits the rows
+            with open(os.path.join(path, INDEX_FILE), 'ab') as f:
+                f.write(dates.tobytes())
+
+        logger.debug(f"Appended {len(dates)} history rows for {uid}")
+
+    # ── Reading ──────────────────────────────────────────────────────────────
+
+    def _mapped(self, uid: str):
+        """(rows, dates, columns) memory maps for a patient, remapped after appends"""
+        rows = self.row_count(uid)
+        cached = self._maps.get(uid)
+        if cached is not None and cached[0] == rows:
+            return cached
+        path = self._patient_dir(uid)
+        if rows == 0:
+            mapped = (0, np.empty(0, dtype=INDEX_DTYPE),
+                      {name: np.empty(0, dtype=dtype) for name, dtype in self.schema.items()})
+        else:
+            mapped = (rows,
+                      np.memmap(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE, mode='r', shape=(rows,)),
+                      {name: np.memmap(os.path.join(path, name + '.col'), dtype=dtype, mode='r', shape=(rows,))
+                       for name, dtype in self.schema.items()})
+        self._maps.set(uid, mapped)
+        return mapped
+
+    def read(self, uid: str, start=None, end=None) -> HistoryColumns:
+        """
+        Rows with start <= date < end (either bound optional)
+
+        Returns:
+            HistoryColumns of read-only memory-mapped views
+        """
+        _, dates, columns = self._mapped(uid)
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'D')))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, 'D')))
+        return HistoryColumns(dates[lo:hi], {name: col[lo:hi] for name, col in columns.items()})
+
+    def tail(self, uid: str, days: int, end=None) -> HistoryColumns:
+        """The `days` calendar days before `end` (default: after the last row)"""
+        _, dates, _ = self._mapped(uid)
+        if not len(dates):
+            return self.read(uid)
+        stop = np.datetime64(end, 'D') if end is not None else dates[-1] + 1
+        return self.read(uid, stop - days, stop)
+
+    def last_date(self, uid: str):
+        """Date of the last stored row, or None"""
+        _, dates, _ = self._mapped(uid)
+        return dates[-1] if len(dates) else None
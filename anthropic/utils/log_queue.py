@@ -0,0 +1,172 @@
+"""
+Log Queue Module
+Background log writing for the utils package and rate-sampled structured events
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+_handler: Optional['DroppingQueueHandler'] = None
+_lock = threading.Lock()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks and never formats on the calling thread
+
+    Records are queued as they are; the listener thread does all formatting
+    and I/O. Callers must therefore not mutate objects passed as log args.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level: int = logging.INFO, logger_name: str = 'utils',
+                      handlers: Iterable[logging.Handler] = None,
+                      queue_size: int = 10000, fmt: str = DEFAULT_FORMAT) -> QueueListener:
+    """
+    Route a logger tree through a bounded queue to a background writer
+
+    Safe to call more than once; later calls return the running listener.
+
+    Args:
+        level: Level for the logger tree
+        logger_name: Root of the tree (every utils.* module logger by default)
+        handlers: Handlers the listener writes to (default: stderr)
+        queue_size: Records buffered before new ones are dropped
+        fmt: Format for the default handler
+
+    Returns:
+        The started QueueListener
+    """
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return _listener
+        if handlers is None:
+            stream = logging.StreamHandler()
+            stream.setFormatter(logging.Formatter(fmt))
+            handlers = [stream]
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        _handler = DroppingQueueHandler(log_queue)
+        target = logging.getLogger(logger_name)
+        target.setLevel(level)
+        target.addHandler(_handler)
+        target.propagate = False
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+
+class _Event:
+    """Log message rendered as 'name key=value ...' only when formatted"""
+
+    __slots__ = ('name', 'fields')
+
+    def __init__(self, name: str, fields: Dict):
+        self.name = name
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return ' '.join([self.name] + [f"{k}={v}" for k, v in self.fields.items()])
+
+
+class SampledLog:
+    """
+    Structured per-event logging with rate sampling
+
+    Events flagged as important are always logged at WARNING with every
+    field. Other events are logged at INFO at most `per_second` times per
+    second per event name; each emitted record carries `suppressed`, the
+    number of events skipped since the previous one. Skipped events cost a
+    clock read and a dict update (counts are approximate under concurrency).
+    Fields are also attached to the record as `event` / `fields` for
+    structured handlers. Events raised inside muted() on a thread are
+    dropped, important or not.
+    """
+
+    def __init__(self, logger: logging.Logger, per_second: float = 1.0):
+        """
+        Args:
+            logger: Logger to write to
+            per_second: Routine events emitted per second per event name
+        """
+        self.logger = logger
+        self.interval = 1.0 / per_second if per_second > 0 else float('inf')
+        self._next: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def muted(self):
+        """Drop the current thread's events for the duration of the block (nestable)"""
+        self._local.muted = getattr(self._local, 'muted', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.muted -= 1
+
+    def event(self, name: str, important: bool = False, **fields):
+        """
+        Log one event
+
+        Args:
+            name: Event name (sampling key)
+            important: Log at WARNING, unsampled
+            **fields: Structured fields (immutable values)
+        """
+        if getattr(self._local, 'muted', 0):
+            return
+        if important:
+            if self.logger.isEnabledFor(logging.WARNING):
+                self.logger.warning('%s', _Event(name, fields),
+                                    extra={'event': name, 'fields': fields})
+            return
+
+        now = time.monotonic()
+        if now < self._next.get(name, 0.0):
+            self._suppressed[name] = self._suppressed.get(name, 0) + 1
+            return
+        self._next[name] = now + self.interval
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        fields['suppressed'] = self._suppressed.pop(name, 0)
+        self.logger.info('%s', _Event(name, fields), extra={'event': name, 'fields': fields})
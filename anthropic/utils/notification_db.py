@@ -0,0 +1,182 @@
+"""
+Notification DB Module
+SQLite notification store and change feed shared by every worker process
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDB:
+    """
+    Notifications and their change events in one SQLite database (WAL mode)
+
+    `notifications` holds the current state of every notification, one JSON
+    body per row. `events` is an append-only change feed: every write adds
+    one event in the same transaction, so a process keeps its in-memory
+    history current by reading the events after the last one it applied,
+    instead of reloading the history. Old events are pruned; a reader that
+    falls behind the retained feed reloads from `notifications`.
+
+    Safe to share between threads and between worker processes: every
+    thread gets its own connection.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS notifications (
+            seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+            id        TEXT NOT NULL UNIQUE,
+            patient   TEXT,
+            type      TEXT,
+            status    TEXT,
+            timestamp TEXT,
+            body      TEXT NOT NULL
+        )
+        """,
+        'CREATE INDEX IF NOT EXISTS notifications_patient ON notifications (patient, timestamp)',
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            record TEXT NOT NULL
+        )
+        """,
+    )
+
+    # Per-op statement applying an event to the notifications table
+    _APPLY = {
+        'ack': ("UPDATE notifications SET status = 'acknowledged', body = json_set(body, "
+                "'$.status', 'acknowledged', '$.acknowledged_by', ?, '$.acknowledged_at', ?) WHERE id = ?",
+                lambda r: (r['by'], r['at'], r['id'])),
+        'delivery': ("UPDATE notifications SET body = json_set(body, '$.delivery', ?, "
+                     "'$.delivery_attempts', ?, '$.delivery_updated_at', ?) WHERE id = ?",
+                     lambda r: (r['state'], r['attempts'], r['at'], r['id'])),
+        'repeat': ("UPDATE notifications SET body = json_set(body, '$.occurrences', "
+                   "coalesce(json_extract(body, '$.occurrences'), 1) + ?, '$.last_seen', ?) WHERE id = ?",
+                   lambda r: (r['count'], r['at'], r['id'])),
+    }
+
+    def __init__(self, db_path: str = 'notifications.db', event_retention: int = 100000):
+        """
+        Initialize the database, creating the schema if needed
+
+        Args:
+            db_path: SQLite database file
+            event_retention: Change events kept for other processes to catch up from
+        """
+        self.db_path = db_path
+        self.event_retention = event_retention
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connect()
+        with conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+        logger.info(f"NotificationDB initialized ({db_path})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+
+    def write(self, records: List[Dict], origin: str):
+        """
+        Apply a batch of records ('add', 'ack', 'delivery', 'repeat') in one transaction
+
+        Args:
+            records: Records in the order they were made
+            origin: Writer token stored on the events (lets a process skip its own)
+        """
+        conn = self._connect()
+        with conn:
+            for record in records:
+                op = record.get('op')
+                if op == 'add':
+                    n = record['notification']
+                    conn.execute(
+                        'INSERT OR IGNORE INTO notifications (id, patient, type, status, timestamp, body) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (n['id'], n.get('patient'), n.get('type'), n.get('status'),
+                         n.get('timestamp'), json.dumps(n))
+                    )
+                elif op in self._APPLY:
+                    sql, params = self._APPLY[op]
+                    conn.execute(sql, params(record))
+            conn.executemany('INSERT INTO events (origin, record) VALUES (?, ?)',
+                             [(origin, json.dumps(record)) for record in records])
+        self._writes += len(records)
+        if self._writes >= self.event_retention // 10:
+            self._writes = 0
+            self.prune_events()
+
+    def prune_events(self):
+        """Drop events beyond the retention window"""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM events WHERE seq <= (SELECT MAX(seq) FROM events) - ?',
+                         (self.event_retention,))
+
+    # ── Reading ──────────────────────────────────────────────────────────────
+
+    def snapshot(self, limit: int) -> Tuple[int, List[Dict]]:
+        """
+        The newest `limit` notifications (oldest first) and the last event they include
+
+        Both come from one read transaction, so applying events after the
+        returned sequence number neither misses nor repeats a change.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            last_event = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+            rows = conn.execute('SELECT body FROM notifications ORDER BY seq DESC LIMIT ?',
+                                (limit,)).fetchall()
+        return last_event, [json.loads(body) for body, in reversed(rows)]
+
+    def events_since(self, seq: int, limit: int = 10000) -> List[Tuple[int, str, Dict]]:
+        """(seq, origin, record) of events after `seq`, oldest first"""
+        rows = self._connect().execute(
+            'SELECT seq, origin, record FROM events WHERE seq > ? ORDER BY seq LIMIT ?', (seq, limit)
+        ).fetchall()
+        return [(s, origin, json.loads(record)) for s, origin, record in rows]
+
+    def get(self, notification_id: str) -> Optional[Dict]:
+        """A notification by id, including ones no process still holds in memory"""
+        row = self._connect().execute('SELECT body FROM notifications WHERE id = ?',
+                                      (notification_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self) -> int:
+        """Number of stored notifications"""
+        return self._connect().execute('SELECT COUNT(*) FROM notifications').fetchone()[0]
+
+    def import_notifications(self, notifications: Iterable[Dict]) -> int:
+        """
+        One-shot bulk import (legacy history); existing ids are kept
+
+        Returns:
+            Number of notifications inserted
+        """
+        conn = self._connect()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO notifications (id, patient, type, status, timestamp, body) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(n.get('id'), n.get('patient'), n.get('type'), n.get('status'),
+                  n.get('timestamp'), json.dumps(n)) for n in notifications if n.get('id')]
+            )
+            return conn.total_changes - before
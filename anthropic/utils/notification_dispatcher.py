@@ -0,0 +1,353 @@
+"""
+Notification Dispatcher Module
+Background delivery of notifications to guardians with priority lanes, batching and retries
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Delivery lanes, highest priority first
+LANES = ('sos', 'critical', 'standard', 'summary')
+
+# Sentinel that stops the log writer
+_STOP = object()
+
+# transport(guardian, notifications) raises to signal a failed delivery
+Transport = Callable[[str, List[Dict]], None]
+
+
+class NotificationDispatcher:
+    """
+    Prioritized delivery queues drained by a pool of worker threads
+
+    Each notification is queued in one lane (see LANES). A free worker
+    serves the highest-priority lane with work, and `reserved_workers` of
+    the pool only ever serve the 'sos' lane, so an SOS never waits behind a
+    transport call for lower-priority traffic. A worker takes the lane's
+    next notification, waits up to the lane's batch wait for more (at most
+    `batch_size`, never for 'sos' or 'critical'), groups the batch by
+    guardian and makes one transport call per guardian. A guardian whose
+    call raises is retried with exponential backoff and jitter, up to
+    `max_attempts`, ahead of new work in the same lane. Once every guardian
+    of a notification has been settled, `on_result(notification, state,
+    attempts)` is called with state 'delivered' or 'failed', and the time
+    since it was submitted is recorded for the lane's latency percentiles.
+
+    Log records go through a separate unbounded queue to a single writer
+    thread, which hands them to `persist(records)` in submission order.
+    """
+
+    # Seconds a worker waits to fill a batch, per lane (others use batch_wait)
+    LANE_BATCH_WAIT = {'sos': 0.0, 'critical': 0.0}
+
+    def __init__(self, transport: Transport, persist: Callable[[List[Dict]], None],
+                 on_result: Callable[[Dict, str, int], None], workers: int = 4,
+                 reserved_workers: int = 1, queue_size: int = 10000, batch_size: int = 50,
+                 batch_wait: float = 0.02, max_attempts: int = 5, backoff: float = 0.5,
+                 max_backoff: float = 30.0, latency_window: int = 10000):
+        """
+        Start the worker pool and the log writer
+
+        Args:
+            transport: Delivers a list of notifications to one guardian
+            persist: Writes a batch of log records
+            on_result: Called once per notification when delivery is settled
+            workers: Delivery threads serving every lane
+            reserved_workers: Additional delivery threads serving only 'sos'
+            queue_size: Notifications waiting per lane before submit() refuses more
+            batch_size: Notifications taken per worker batch
+            batch_wait: Seconds a worker waits to fill a batch (standard and summary lanes)
+            max_attempts: Transport calls per guardian before giving up
+            backoff: Delay before the first retry (doubles per attempt)
+            max_backoff: Upper bound on the retry delay
+            latency_window: Recent deliveries per lane kept for latency percentiles
+        """
+        self.transport = transport
+        self.persist = persist
+        self.on_result = on_result
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = {lane: self.LANE_BATCH_WAIT.get(lane, batch_wait) for lane in LANES}
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        # Lane items are (guardian, notifications, attempt); guardian is None for new work
+        self._lanes: Dict[str, Deque] = {lane: deque() for lane in LANES}
+        self._records: queue.Queue = queue.Queue()
+        self._retries: List = []            # heap of (due, seq, lane, guardian, notifications, attempt)
+        self._seq = itertools.count()
+        self._pending: Dict[str, List] = {}  # id -> [guardians left, attempts, failed, lane, submitted]
+        self._latency: Dict[str, Deque[float]] = {lane: deque(maxlen=latency_window) for lane in LANES}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self.stats = {'submitted': 0, 'delivered': 0, 'failed': 0, 'retried': 0, 'batches': 0}
+        self.lane_stats = {lane: {'submitted': 0, 'delivered': 0, 'failed': 0} for lane in LANES}
+
+        self._workers = [threading.Thread(target=self._work, args=(LANES,),
+                                          name=f'notify-worker-{i}', daemon=True)
+                         for i in range(workers)]
+        self._workers += [threading.Thread(target=self._work, args=(('sos',),),
+                                           name=f'notify-sos-{i}', daemon=True)
+                          for i in range(reserved_workers)]
+        self._writer = threading.Thread(target=self._write, name='notify-writer', daemon=True)
+        for thread in self._workers + [self._writer]:
+            thread.start()
+
+    # ── Producers ────────────────────────────────────────────────────────────
+
+    def submit(self, notification: Dict, lane: str = 'standard') -> bool:
+        """
+        Queue a notification for delivery without blocking
+
+        Returns:
+            False if the lane is full or the dispatcher is closed
+        """
+        with self._lock:
+            if self._closed or len(self._lanes[lane]) >= self.queue_size:
+                return False
+            self._track(notification, lane)
+            self._lanes[lane].append((None, notification, 1))
+            # Every waiter: one filling a lower lane's batch would not take this
+            self._wake.notify_all()
+        return True
+
+    def deliver_now(self, notification: Dict, lane: str = 'standard'):
+        """Deliver on the calling thread (fallback when a lane is full)"""
+        with self._lock:
+            self._track(notification, lane)
+        self._deliver_batch(lane, [notification])
+
+    def record(self, record: Dict):
+        """Queue a log record for the writer thread"""
+        self._records.put(record)
+
+    # ── Delivery ─────────────────────────────────────────────────────────────
+
+    def _track(self, notification: Dict, lane: str):
+        """Start tracking a notification (caller holds the lock)"""
+        self._pending[notification['id']] = [len(notification.get('guardians') or ()), 0, False,
+                                             lane, time.perf_counter()]
+        self.stats['submitted'] += 1
+        self.lane_stats[lane]['submitted'] += 1
+
+    def _next_task(self, lanes) -> Optional[tuple]:
+        """
+        Block until one of `lanes` has work
+
+        Returns:
+            (lane, guardian, notifications, attempt) with guardian None for a
+            batch of new notifications, or None once the dispatcher is closed
+        """
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._retries and self._retries[0][0] <= now:
+                    _, _, lane, guardian, notifications, attempt = heapq.heappop(self._retries)
+                    self._lanes[lane].appendleft((guardian, notifications, attempt))
+                    self._wake.notify_all()
+
+                for lane in lanes:
+                    work = self._lanes[lane]
+                    if work:
+                        guardian, notification, attempt = work.popleft()
+                        if guardian is not None:
+                            return lane, guardian, notification, attempt
+                        return lane, None, self._fill_batch(lane, [notification]), 1
+
+                if self._closed:
+                    return None
+                timeout = self._retries[0][0] - now if self._retries else None
+                self._wake.wait(timeout)
+
+    def _fill_batch(self, lane: str, batch: List[Dict]) -> List[Dict]:
+        """Add queued new notifications of the lane to a batch (caller holds the lock)"""
+        work = self._lanes[lane]
+        deadline = time.monotonic() + self.batch_wait[lane]
+        while True:
+            while work and work[0][0] is None and len(batch) < self.batch_size:
+                batch.append(work.popleft()[1])
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0 or self._closed:
+                return batch
+            self._wake.wait(remaining)
+
+    def _work(self, lanes):
+        while True:
+            task = self._next_task(lanes)
+            if task is None:
+                return
+            lane, guardian, notifications, attempt = task
+            try:
+                if guardian is not None:
+                    self._send(lane, guardian, notifications, attempt)
+                else:
+                    self._deliver_batch(lane, notifications)
+            except Exception as e:
+                logger.error(f"Notification worker error: {e}")
+
+    def _deliver_batch(self, lane: str, notifications: List[Dict]):
+        """One transport call per guardian for a batch of notifications"""
+        self.stats['batches'] += 1
+        by_guardian: Dict[str, List[Dict]] = {}
+        for notification in notifications:
+            guardians = notification.get('guardians') or ()
+            if not guardians:
+                self._settle(notification, 0, False)
+            for guardian in guardians:
+                by_guardian.setdefault(guardian, []).append(notification)
+        for guardian, batch in by_guardian.items():
+            self._send(lane, guardian, batch, 1)
+
+    def _send(self, lane: str, guardian: str, notifications: List[Dict], attempt: int):
+        try:
+            self.transport(guardian, notifications)
+        except Exception as e:
+            if attempt >= self.max_attempts:
+                logger.error(f"Giving up on {len(notifications)} notification(s) to "
+                             f"{guardian} after {attempt} attempts: {e}")
+                for notification in notifications:
+                    self._settle(notification, attempt, True)
+                return
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(f"Delivery to {guardian} failed ({e}); retry {attempt} in {delay:.1f}s")
+            with self._lock:
+                self.stats['retried'] += 1
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), lane,
+                                               guardian, notifications, attempt + 1))
+                self._wake.notify_all()
+            return
+        for notification in notifications:
+            self._settle(notification, attempt, False)
+
+    def _settle(self, notification: Dict, attempts: int, failed: bool):
+        """Count one guardian as done; report the notification once all are"""
+        with self._lock:
+            entry = self._pending.get(notification['id'])
+            if entry is None:
+                return
+            entry[0] -= 1
+            entry[1] = max(entry[1], attempts)
+            entry[2] = entry[2] or failed
+            if entry[0] > 0:
+                return
+            del self._pending[notification['id']]
+            state = 'failed' if entry[2] else 'delivered'
+            lane = entry[3]
+            self._latency[lane].append(time.perf_counter() - entry[4])
+            self.stats[state] += 1
+            self.lane_stats[lane][state] += 1
+        try:
+            self.on_result(notification, state, entry[1])
+        except Exception as e:
+            logger.error(f"Notification result handler failed: {e}")
+        with self._idle:
+            self._idle.notify_all()
+
+    # ── Instrumentation ──────────────────────────────────────────────────────
+
+    def latency_report(self) -> Dict[str, Dict]:
+        """
+        Per-lane queue depth and submit-to-settled latency over recent deliveries
+
+        Returns:
+            {lane: {'queued', 'submitted', 'delivered', 'failed', 'samples',
+                    'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+        """
+        with self._lock:
+            samples = {lane: sorted(self._latency[lane]) for lane in LANES}
+            report = {lane: dict(self.lane_stats[lane], queued=len(self._lanes[lane]))
+                      for lane in LANES}
+        for lane, values in samples.items():
+            report[lane]['samples'] = len(values)
+            for name, pct in (('p50_ms', 50), ('p95_ms', 95), ('p99_ms', 99)):
+                report[lane][name] = (round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1e3, 3)
+                                      if values else None)
+            report[lane]['max_ms'] = round(values[-1] * 1e3, 3) if values else None
+        return report
+
+    # ── Log writer ───────────────────────────────────────────────────────────
+
+    def _write(self):
+        while True:
+            record = self._records.get()
+            if record is _STOP:
+                self._records.task_done()
+                return
+            batch = [record]
+            stop = False
+            while len(batch) < 1000:
+                try:
+                    record = self._records.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                batch.append(record)
+            try:
+                self.persist(batch)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(batch)} notification record(s): {e}")
+            for _ in range(len(batch) + stop):
+                self._records.task_done()
+            if stop:
+                return
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    @property
+    def pending(self) -> int:
+        """Notifications queued or awaiting a retry"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every submitted notification is settled and every record written
+
+        Returns:
+            False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        self._records.join()
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """
+        Drain the queues (up to `timeout` for deliveries) and stop the threads
+
+        Notifications still queued after the timeout are dropped from the
+        queues; they stay 'queued' in the log.
+        """
+        if self._closed:
+            return
+        drained = self.flush(timeout)
+        with self._lock:
+            if not drained:
+                logger.warning(f"Closing dispatcher with {len(self._pending)} notification(s) undelivered")
+                for work in self._lanes.values():
+                    work.clear()
+                self._retries.clear()
+            self._closed = True
+            self._wake.notify_all()
+        self._records.put(_STOP)
+        self._writer.join(timeout)
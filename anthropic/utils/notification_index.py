@@ -0,0 +1,117 @@
+"""
+Notification Index Module
+Secondary indexes over notification history for fast lookups
+"""
+
+import bisect
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class NotificationIndex:
+    """
+    In-memory secondary indexes kept next to the notification history
+
+    - by id:      notification id -> notification dict
+    - by patient: patient email -> notifications sorted by timestamp, with a
+                  parallel list of POSIX timestamps for bisecting
+    - by status:  status -> set of notification ids
+    """
+
+    # Used when a notification has no (or an unparsable) timestamp
+    DEFAULT_TIMESTAMP = datetime(2000, 1, 1).timestamp()
+
+    def __init__(self, notifications: Iterable[Dict] = ()):
+        self.by_id: Dict[str, Dict] = {}
+        self._patient_times: Dict[str, List[float]] = {}
+        self._patient_items: Dict[str, List[Dict]] = {}
+        self.by_status: Dict[str, Set[str]] = {}
+        for notification in notifications:
+            self.add(notification)
+
+    @classmethod
+    def timestamp_of(cls, notification: Dict) -> float:
+        """POSIX timestamp of a notification's ISO 'timestamp' field"""
+        try:
+            return datetime.fromisoformat(notification['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return cls.DEFAULT_TIMESTAMP
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, notification_id: str) -> bool:
+        return notification_id in self.by_id
+
+    def add(self, notification: Dict):
+        """Index a newly stored notification"""
+        notification_id = notification.get('id')
+        # Keep the first notification for legacy duplicate ids
+        self.by_id.setdefault(notification_id, notification)
+
+        patient = notification.get('patient')
+        ts = self.timestamp_of(notification)
+        times = self._patient_times.setdefault(patient, [])
+        items = self._patient_items.setdefault(patient, [])
+        position = bisect.bisect_right(times, ts)
+        times.insert(position, ts)
+        items.insert(position, notification)
+
+        self.by_status.setdefault(notification.get('status'), set()).add(notification_id)
+
+    def remove(self, notification: Dict):
+        """Drop an evicted notification from every index"""
+        notification_id = notification.get('id')
+        if self.by_id.get(notification_id) is notification:
+            del self.by_id[notification_id]
+            self.by_status.get(notification.get('status'), set()).discard(notification_id)
+
+        patient = notification.get('patient')
+        times = self._patient_times.get(patient)
+        if not times:
+            return
+        items = self._patient_items[patient]
+        ts = self.timestamp_of(notification)
+        position = bisect.bisect_left(times, ts)
+        while position < len(items) and times[position] == ts:
+            if items[position] is notification:
+                del times[position]
+                del items[position]
+                break
+            position += 1
+        if not times:
+            del self._patient_times[patient]
+            del self._patient_items[patient]
+
+    def get(self, notification_id: str) -> Optional[Dict]:
+        """Look up a notification by id"""
+        return self.by_id.get(notification_id)
+
+    def set_status(self, notification: Dict, status: str):
+        """Change a notification's status and move it between status sets"""
+        notification_id = notification.get('id')
+        self.by_status.get(notification.get('status'), set()).discard(notification_id)
+        notification['status'] = status
+        self.by_status.setdefault(status, set()).add(notification_id)
+
+    def for_patient(self, patient: str, since: datetime = None) -> List[Dict]:
+        """
+        Notifications for a patient in timestamp order
+
+        Args:
+            patient: Patient email
+            since: Only return notifications strictly after this time (optional)
+        """
+        items = self._patient_items.get(patient, [])
+        if since is None:
+            return list(items)
+        start = bisect.bisect_right(self._patient_times[patient], since.timestamp()) if items else 0
+        return items[start:]
+
+    def patient_count(self, patient: str) -> int:
+        """Number of notifications stored for a patient"""
+        return len(self._patient_items.get(patient, ()))
+
+    def with_status(self, status: str) -> Set[str]:
+        """Ids of notifications currently in the given status"""
+        return self.by_status.get(status, set())
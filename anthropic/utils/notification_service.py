@@ -3,60 +3,286 @@ Notification Service Module
 Handles alert notifications to guardians and caregivers
 """
 
+import atexit
+import itertools
 import logging
-from datetime import datetime
-from typing import Dict, List
+import secrets
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
 import json
 import os
 
+from .notification_db import NotificationDB
+from .notification_dispatcher import NotificationDispatcher, Transport
+from .notification_index import NotificationIndex
+
 logger = logging.getLogger(__name__)
 
 
 class NotificationService:
     """
     Professional notification system for sending alerts to guardians
+
+    The send_* methods record the notification in memory and queue it on a
+    NotificationDispatcher; delivery and database writes happen on its
+    threads, so callers get the notification id back without waiting on
+    either. Every worker process shares one NotificationDB and keeps its
+    in-memory history current by applying the other processes' change
+    events before each read.
     """
     
-    def __init__(self, notification_log_file='notifications.json'):
-        """Initialize notification service"""
+    # Default number of notifications kept in memory
+    MAX_HISTORY = 1000
+    
+    def __init__(self, notification_log_file='notifications.json',
+                 max_history: int = MAX_HISTORY, transport: Optional[Transport] = None,
+                 workers: int = 4, db_path: str = None, **dispatch_options):
+        """
+        Initialize notification service
+        
+        Args:
+            notification_log_file: Legacy JSON history, imported once if present
+            max_history: Number of notifications kept in memory
+            transport: Delivers notifications to one guardian (default: log only)
+            workers: Delivery worker threads (plus one reserved for SOS by default)
+            db_path: Shared SQLite database (defaults to '<notification_log_file stem>.db')
+            **dispatch_options: Batching and retry settings for NotificationDispatcher
+        """
+        stem = os.path.splitext(notification_log_file)[0]
         self.log_file = notification_log_file
-        self.notification_history = self._load_history()
+        self.max_history = max_history
+        self.db = NotificationDB(db_path or stem + '.db')
+        # Tags this process's change events so it can skip them when syncing
+        self.origin = secrets.token_hex(8)
+        self.notification_history: Deque[Dict] = deque()
+        self.index = NotificationIndex()
+        self._event_seq = 0
+        self._id_counter = itertools.count(1)
+        self._unpersisted_repeats: Dict[str, int] = {}
+        # Guards history and indexes (request threads and dispatcher threads)
+        self._lock = threading.RLock()
+        self._load_history()
+        self.dispatcher = NotificationDispatcher(
+            transport or self._deliver, self._write_records, self._delivery_result,
+            workers=workers, **dispatch_options
+        )
+        atexit.register(self.close)
         logger.info("NotificationService initialized")
     
-    def _load_history(self) -> List[Dict]:
-        """Load notification history from file"""
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-    
-    def _save_history(self):
-        """Save notification history to file"""
+    def _load_history(self):
+        """Load the newest notifications from the database, importing legacy history first"""
+        if self.db.count() == 0:
+            self._import_legacy_history()
+        
+        with self._lock:
+            self.notification_history.clear()
+            self.index = NotificationIndex()
+            self._event_seq, notifications = self.db.snapshot(self.max_history)
+            for notification in notifications:
+                self._remember(notification)
+    
+    def _import_legacy_history(self):
+        """One-shot import of a legacy notifications.json"""
+        if not os.path.exists(self.log_file):
+            return
+        try:
+            with open(self.log_file, 'r') as f:
+                history = json.load(f)[-self.max_history:]
+        except Exception as e:
+            logger.error(f"Failed to import legacy notification history: {e}")
+            return
+        imported = self.db.import_notifications(history)
+        logger.info(f"Imported {imported} notifications from {self.log_file}")
+    
+    def _apply_record(self, record: Dict):
+        """Apply one change record to the in-memory history and indexes"""
+        op = record.get('op')
+        if op == 'add':
+            if record['notification'].get('id') not in self.index:
+                self._remember(record['notification'])
+        elif op == 'ack':
+            notification = self.index.get(record['id'])
+            if notification:
+                self._mark_acknowledged(notification, record['by'], record['at'])
+        elif op == 'repeat':
+            notification = self.index.get(record['id'])
+            if notification:
+                notification['occurrences'] = notification.get('occurrences', 1) + record['count']
+                notification['last_seen'] = record['at']
+        elif op == 'delivery':
+            notification = self.index.get(record['id'])
+            if notification:
+                self._mark_delivery(notification, record['state'], record['attempts'], record['at'])
+    
+    def _sync(self):
+        """Apply changes committed by other processes since the last sync"""
+        with self._lock:
+            while True:
+                try:
+                    events = self.db.events_since(self._event_seq)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to read notification changes: {e}")
+                    return
+                if not events:
+                    return
+                if events[0][0] > self._event_seq + 1:
+                    # Fell behind the retained change feed
+                    logger.warning("Notification change feed pruned past this process; reloading")
+                    self._load_history()
+                    return
+                for seq, origin, record in events:
+                    if origin != self.origin:
+                        self._apply_record(record)
+                    self._event_seq = seq
+    
+    def _remember(self, notification: Dict):
+        """Add a notification to history and indexes, evicting the oldest"""
+        self.notification_history.append(notification)
+        self.index.add(notification)
+        while len(self.notification_history) > self.max_history:
+            evicted = self.notification_history.popleft()
+            self.index.remove(evicted)
+            self._unpersisted_repeats.pop(evicted.get('id'), None)
+    
+    def _mark_acknowledged(self, notification: Dict, acknowledged_by: str, acknowledged_at: str):
+        self.index.set_status(notification, 'acknowledged')
+        notification['acknowledged_by'] = acknowledged_by
+        notification['acknowledged_at'] = acknowledged_at
+    
+    def _mark_delivery(self, notification: Dict, state: str, attempts: int, at: str):
+        notification['delivery'] = state
+        notification['delivery_attempts'] = attempts
+        notification['delivery_updated_at'] = at
+    
+    def _new_id(self, prefix: str, stamp: str) -> str:
+        """Build a notification id, unique across processes (origin prefix + per-process counter)"""
+        notification_id = f"{prefix}-{stamp}-{self.origin[:6]}{next(self._id_counter):x}"
+        while notification_id in self.index:
+            notification_id = f"{prefix}-{stamp}-{self.origin[:6]}{next(self._id_counter):x}"
+        return notification_id
+    
+    def _write_records(self, records: List[Dict]):
+        """Commit a batch of change records (dispatcher writer thread)"""
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(self.notification_history, f, indent=2)
+            self.db.write(records, self.origin)
         except Exception as e:
             logger.error(f"Failed to save notification history: {e}")
     
+    def _append_record(self, record: Dict):
+        """Queue one change record for the database writer"""
+        self.dispatcher.record(record)
+    
+    @staticmethod
+    def _lane(notification: Dict) -> str:
+        """Delivery lane: SOS ahead of RED thresholds ahead of other alerts ahead of summaries"""
+        kind = notification.get('type')
+        if kind == 'sos_emergency':
+            return 'sos'
+        if kind == 'daily_summary':
+            return 'summary'
+        return 'critical' if notification.get('alert_level') == 'RED' else 'standard'
+    
+    def _store(self, notification: Dict, prefix: str, stamp: str) -> str:
+        """
+        Assign an id, add the notification to history and queue it for the database and delivery
+        
+        Returns:
+            The notification id
+        """
+        notification['delivery'] = 'queued'
+        with self._lock:
+            notification['id'] = self._new_id(prefix, stamp)
+            self._remember(notification)
+            # A copy, since acknowledgement and delivery mutate the live dict
+            self._append_record({'op': 'add', 'notification': dict(notification)})
+        lane = self._lane(notification)
+        if not self.dispatcher.submit(notification, lane):
+            logger.warning(f"Notification lane '{lane}' full; delivering {notification['id']} inline")
+            self.dispatcher.deliver_now(notification, lane)
+        return notification['id']
+    
+    def _deliver(self, guardian: str, notifications: List[Dict]):
+        """Default transport"""
+        # In production, integrate with actual email/SMS/push services
+        logger.info(f"Delivered {len(notifications)} notification(s) to {guardian}")
+    
+    def _delivery_result(self, notification: Dict, state: str, attempts: int):
+        """Record the outcome reported by the dispatcher"""
+        at = datetime.now().isoformat()
+        with self._lock:
+            self._mark_delivery(notification, state, attempts, at)
+            self._append_record({'op': 'delivery', 'id': notification['id'],
+                                 'state': state, 'attempts': attempts, 'at': at})
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Wait for queued deliveries and database writes (False on timeout)"""
+        return self.dispatcher.flush(timeout)
+    
+    def close(self, timeout: float = 5.0):
+        """Drain the dispatcher and stop its threads"""
+        self.dispatcher.close(timeout)
+    
+    def delivery_latency(self) -> Dict[str, Dict]:
+        """Per-lane queue depth and end-to-end delivery latency (see NotificationDispatcher)"""
+        return self.dispatcher.latency_report()
+    
+    def get_notification(self, notification_id: str) -> Optional[Dict]:
+        """A notification by id, including its delivery state"""
+        self._sync()
+        with self._lock:
+            notification = self.index.get(notification_id)
+            if notification:
+                return dict(notification)
+        # Older than the in-memory history
+        return self.db.get(notification_id)
+    
+    def find_open_alert(self, patient_email: str, limb: str, alert_level: str,
+                        active_since: datetime) -> Optional[Dict]:
+        """
+        Newest unacknowledged threshold alert (not an escalation) for a patient's
+        limb and level that was raised or repeated at or after `active_since`
+        
+        Lets an AlertCoalescer in one process pick up an alert another process opened.
+        """
+        self._sync()
+        with self._lock:
+            for notification in reversed(self.index.for_patient(patient_email)):
+                last = notification.get('last_seen') or notification.get('timestamp')
+                try:
+                    if datetime.fromisoformat(last) < active_since:
+                        continue
+                except (TypeError, ValueError):
+                    continue
+                details = notification.get('details') or {}
+                if (notification.get('type') == 'threshold_alert'
+                        and notification.get('status') == 'sent'
+                        and details.get('limb') == limb
+                        and notification.get('alert_level') == alert_level
+                        and 'escalation' not in details):
+                    return dict(notification)
+        return None
+    
     def send_threshold_alert(self, patient_email: str, guardian_emails: List[str], 
-                            alert_data: Dict, method: str = 'all') -> Dict:
+                            alert_data: Dict, method: str = 'all',
+                            rate_limited: List[str] = None) -> Dict:
         """
-        Send threshold breach alert to guardians
+        Queue a threshold breach alert for guardians
         
         Args:
             patient_email: Patient's email
             guardian_emails: List of guardian email addresses
             alert_data: Alert details from ThresholdChecker
             method: Notification method ('email', 'sms', 'push', 'all')
+            rate_limited: Guardians held back by a rate limit (recorded, not notified)
             
         Returns:
-            Dict with delivery status
+            Dict with the notification id (delivery is reported on the notification)
         """
         notification = {
-            'id': f"ALERT-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'id': None,
             'type': 'threshold_alert',
             'patient': patient_email,
             'guardians': guardian_emails,
@@ -65,37 +291,27 @@ class NotificationService:
             'timestamp': datetime.now().isoformat(),
             'method': method,
             'status': 'sent',
-            'details': alert_data
+            'details': dict(alert_data)
         }
+        if rate_limited:
+            notification['rate_limited'] = rate_limited
         
-        # In production, integrate with actual email/SMS/push services
-        # For now, we'll log and store
-        logger.info(f"🚨 Alert sent to {len(guardian_emails)} guardian(s): {notification['message']}")
+        notification_id = self._store(notification, 'ALERT', datetime.now().strftime('%Y%m%d%H%M%S'))
+        logger.info(f"🚨 Alert queued for {len(guardian_emails)} guardian(s): {notification['message']}")
         
-        # Simulate delivery
-        delivery_status = {
+        return {
             'success': True,
-            'notification_id': notification['id'],
-            'delivered_to': guardian_emails,
+            'notification_id': notification_id,
+            'queued_for': guardian_emails,
             'delivery_method': method,
+            'delivery': 'queued',
             'timestamp': notification['timestamp']
         }
-        
-        # Store in history
-        self.notification_history.append(notification)
-        self._save_history()
-        
-        # Keep only last 1000 notifications
-        if len(self.notification_history) > 1000:
-            self.notification_history = self.notification_history[-1000:]
-            self._save_history()
-        
-        return delivery_status
     
     def send_sos_alert(self, patient_email: str, guardian_emails: List[str], 
                       location: Dict = None, vitals: Dict = None) -> Dict:
         """
-        Send emergency SOS alert
+        Queue an emergency SOS alert
         
         Args:
             patient_email: Patient's email
@@ -104,10 +320,10 @@ class NotificationService:
             vitals: Current vital signs (optional)
             
         Returns:
-            Dict with delivery status
+            Dict with the notification id (delivery is reported on the notification)
         """
         notification = {
-            'id': f"SOS-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'id': None,
             'type': 'sos_emergency',
             'patient': patient_email,
             'guardians': guardian_emails,
@@ -119,29 +335,65 @@ class NotificationService:
             'status': 'sent'
         }
         
-        logger.critical(f"🆘 SOS ALERT: {patient_email} - {len(guardian_emails)} guardians notified")
-        
-        # Store in history
-        self.notification_history.append(notification)
-        self._save_history()
+        notification_id = self._store(notification, 'SOS', datetime.now().strftime('%Y%m%d%H%M%S'))
+        logger.critical(f"🆘 SOS ALERT: {patient_email} - queued for {len(guardian_emails)} guardians")
         
         return {
             'success': True,
-            'notification_id': notification['id'],
-            'delivered_to': guardian_emails,
+            'notification_id': notification_id,
+            'queued_for': guardian_emails,
             'delivery_method': 'all',
+            'delivery': 'queued',
             'timestamp': notification['timestamp'],
-            'message': 'Emergency services and guardians notified'
+            'message': 'Emergency services and guardians are being notified'
         }
     
+    def record_repeat(self, notification_id: str, persist: bool = True) -> int:
+        """
+        Count another report of an open alert's condition (see AlertCoalescer)
+        
+        Args:
+            notification_id: The open notification
+            persist: Also write the reports counted since the last write
+            
+        Returns:
+            Reports so far including the first, or 0 if the notification is not in history
+        """
+        at = datetime.now().isoformat()
+        with self._lock:
+            notification = self.index.get(notification_id)
+            if notification is None:
+                return 0
+            notification['occurrences'] = notification.get('occurrences', 1) + 1
+            notification['last_seen'] = at
+            # Written as increments so reports counted in several processes add up
+            count = self._unpersisted_repeats.pop(notification_id, 0) + 1
+            if persist:
+                self._append_record({'op': 'repeat', 'id': notification_id, 'count': count, 'at': at})
+            else:
+                self._unpersisted_repeats[notification_id] = count
+            return notification['occurrences']
+    
     def get_unacknowledged_alerts(self, patient_email: str) -> List[Dict]:
         """Get all unacknowledged alerts for a patient"""
-        return [
-            n for n in self.notification_history
-            if n.get('patient') == patient_email 
-            and n.get('status') == 'sent'
-            and n.get('type') == 'threshold_alert'
-        ]
+        self._sync()
+        with self._lock:
+            pending_ids = self.index.with_status('sent')
+            
+            # Walk whichever index is smaller
+            if len(pending_ids) < self.index.patient_count(patient_email):
+                pending = [self.index.get(i) for i in pending_ids]
+                pending = [
+                    n for n in pending
+                    if n.get('patient') == patient_email and n.get('type') == 'threshold_alert'
+                ]
+                pending.sort(key=NotificationIndex.timestamp_of)
+                return pending
+            
+            return [
+                n for n in self.index.for_patient(patient_email)
+                if n.get('status') == 'sent' and n.get('type') == 'threshold_alert'
+            ]
     
     def acknowledge_alert(self, notification_id: str, acknowledged_by: str) -> bool:
         """
@@ -154,15 +406,21 @@ class NotificationService:
         Returns:
             Boolean success status
         """
-        for notification in self.notification_history:
-            if notification.get('id') == notification_id:
-                notification['status'] = 'acknowledged'
-                notification['acknowledged_by'] = acknowledged_by
-                notification['acknowledged_at'] = datetime.now().isoformat()
-                self._save_history()
-                logger.info(f"Alert {notification_id} acknowledged by {acknowledged_by}")
-                return True
-        return False
+        self._sync()
+        with self._lock:
+            notification = self.index.get(notification_id)
+            if notification is None:
+                return False
+            
+            self._mark_acknowledged(notification, acknowledged_by, datetime.now().isoformat())
+            self._append_record({
+                'op': 'ack',
+                'id': notification_id,
+                'by': acknowledged_by,
+                'at': notification['acknowledged_at']
+            })
+        logger.info(f"Alert {notification_id} acknowledged by {acknowledged_by}")
+        return True
     
     def get_alert_summary(self, patient_email: str, hours: int = 24) -> Dict:
         """
@@ -175,14 +433,11 @@ class NotificationService:
         Returns:
             Dict with alert statistics
         """
-        from datetime import timedelta
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
-        recent_alerts = [
-            n for n in self.notification_history
-            if n.get('patient') == patient_email
-            and datetime.fromisoformat(n.get('timestamp', '2000-01-01')) > cutoff_time
-        ]
+        self._sync()
+        with self._lock:
+            recent_alerts = self.index.for_patient(patient_email, since=cutoff_time)
         
         critical = len([a for a in recent_alerts if a.get('alert_level') == 'RED'])
         warnings = len([a for a in recent_alerts if a.get('alert_level') == 'ORANGE'])
@@ -214,7 +469,7 @@ class NotificationService:
         summary = self.get_alert_summary(patient_email, hours=24)
         
         notification = {
-            'id': f"SUMMARY-{datetime.now().strftime('%Y%m%d')}",
+            'id': None,
             'type': 'daily_summary',
             'patient': patient_email,
             'guardians': guardian_emails,
@@ -224,13 +479,11 @@ class NotificationService:
             'status': 'sent'
         }
         
-        logger.info(f"📊 Daily summary sent for {patient_email}")
-        
-        self.notification_history.append(notification)
-        self._save_history()
+        notification_id = self._store(notification, 'SUMMARY', datetime.now().strftime('%Y%m%d'))
+        logger.info(f"📊 Daily summary queued for {patient_email}")
         
         return {
             'success': True,
-            'notification_id': notification['id'],
+            'notification_id': notification_id,
             'summary': summary
         }
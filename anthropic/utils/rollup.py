@@ -0,0 +1,292 @@
+"""
+Rollup Module
+Incrementally maintained per-patient daily aggregates
+"""
+
+import threading
+from datetime import date
+from typing import Dict, Sequence
+
+import numpy as np
+
+from .history import HistoryColumns
+
+
+PERIODS = ('day', 'week', 'month')
+
+
+def _day(value) -> np.datetime64:
+    return np.datetime64(value, 'D')
+
+
+class DailyRollup:
+    """
+    Per-day count / sum / min / max for every metric of one patient
+
+    Each sample updates the row of its day in O(metrics); a new day appends
+    a row. Whole daily histories can be merged in bulk with load(). The trailing streak of days whose mean of `streak_metric` is
+    below `streak_below` is kept up to date as days close, so reading it is
+    O(1). Weekly and monthly rollups are derived from the daily rows.
+
+    The last row is the open day. A day without samples of the streak
+    metric breaks the streak once it is closed; while open it neither
+    extends nor breaks it.
+    """
+
+    def __init__(self, metrics: Sequence[str] = HistoryColumns.METRICS,
+                 streak_metric: str = 'fall_risk', streak_below: float = 30,
+                 initial_days: int = 64):
+        """
+        Initialize an empty rollup
+
+        Args:
+            metrics: Metric names (column order)
+            streak_metric: Metric whose daily mean drives the streak
+            streak_below: A day counts toward the streak if its mean is below this
+            initial_days: Starting row capacity
+        """
+        self.metrics = list(metrics)
+        self._column = {name: i for i, name in enumerate(self.metrics)}
+        self.streak_metric = streak_metric
+        self.streak_below = streak_below
+        size = len(self.metrics)
+        self._dates = np.empty(initial_days, dtype='datetime64[D]')
+        self._count = np.zeros((initial_days, size), dtype=np.int64)
+        self._total = np.zeros((initial_days, size))
+        self._low = np.full((initial_days, size), np.inf)
+        self._high = np.full((initial_days, size), -np.inf)
+        self._days = 0
+        self._closed_streak = 0     # streak over every row except the open one
+        self.loaded_from = None     # date range merged by load()
+        self.loaded_through = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._days
+
+    @property
+    def first_day(self):
+        return self._dates[0].astype(date) if self._days else None
+
+    @property
+    def last_day(self):
+        return self._dates[self._days - 1].astype(date) if self._days else None
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def _reserve(self, rows: int):
+        capacity = len(self._dates)
+        if self._days + rows <= capacity:
+            return
+        capacity = max(2 * capacity, self._days + rows)
+        size = len(self.metrics)
+        self._dates = np.resize(self._dates, capacity)
+        for name, fill, dtype in (('_count', 0, np.int64), ('_total', 0.0, np.float64),
+                                  ('_low', np.inf, np.float64), ('_high', -np.inf, np.float64)):
+            grown = np.full((capacity, size), fill, dtype=dtype)
+            grown[:self._days] = getattr(self, name)[:self._days]
+            setattr(self, name, grown)
+
+    def _counts_toward_streak(self, row: int) -> bool:
+        col = self._column[self.streak_metric]
+        count = self._count[row, col]
+        return bool(count) and self._total[row, col] / count < self.streak_below
+
+    def _open_days(self, day: np.datetime64):
+        """Append rows up to and including day, closing the current open row"""
+        if self._days:
+            first_new = self._dates[self._days - 1] + 1
+            if self._counts_toward_streak(self._days - 1):
+                self._closed_streak += 1
+            else:
+                self._closed_streak = 0
+        else:
+            first_new = day
+        rows = int((day - first_new).astype(np.int64)) + 1
+        self._reserve(rows)
+        self._dates[self._days:self._days + rows] = first_new + np.arange(rows)
+        self._days += rows
+        if rows > 1:
+            # Days without any sample break the streak
+            self._closed_streak = 0
+
+    def add(self, day, values: Dict[str, float]):
+        """
+        Add one sample
+
+        Args:
+            day: Date of the sample
+            values: Metric name -> value (metrics not in the rollup are ignored)
+        """
+        day = _day(day)
+        with self._lock:
+            if not self._days or day > self._dates[self._days - 1]:
+                self._open_days(day)
+                row = self._days - 1
+            elif day < self._dates[0]:
+                return
+            else:
+                row = int((day - self._dates[0]).astype(np.int64))
+            for name, value in values.items():
+                col = self._column.get(name)
+                if col is None:
+                    continue
+                self._count[row, col] += 1
+                self._total[row, col] += value
+                self._low[row, col] = min(self._low[row, col], value)
+                self._high[row, col] = max(self._high[row, col], value)
+            if row < self._days - 1 and self.streak_metric in values:
+                # Late sample for a closed day
+                self._recompute_streak()
+
+    def load(self, history: HistoryColumns):
+        """
+        Merge a daily history (one sample per day per metric)
+
+        Days older than the first row are backfilled, newer days are appended
+        and days already present are combined with the samples they hold.
+        Days covered by an earlier load are skipped, so the same or a longer
+        history can be passed on every request.
+        """
+        if not len(history):
+            return
+        with self._lock:
+            dates = history.dates
+            if self.loaded_from is not None:
+                if dates[0] >= self.loaded_from and dates[-1] <= self.loaded_through:
+                    return
+                fresh = np.flatnonzero((dates < self.loaded_from) | (dates > self.loaded_through))
+            else:
+                fresh = np.arange(len(dates))
+            dates = dates[fresh]
+            values = np.column_stack([np.asarray(history[name], dtype=np.float64)[fresh]
+                                      for name in self.metrics])
+
+            if not self._days:
+                self._open_days(dates[0])
+            if dates[0] < self._dates[0]:
+                self._shift(int((self._dates[0] - dates[0]).astype(np.int64)))
+            if dates[-1] > self._dates[self._days - 1]:
+                self._open_days(dates[-1])
+
+            rows = (dates - self._dates[0]).astype(np.int64)
+            self._count[rows] += 1
+            self._total[rows] += values
+            self._low[rows] = np.minimum(self._low[rows], values)
+            self._high[rows] = np.maximum(self._high[rows], values)
+            self._recompute_streak()
+
+            first, last = history.dates[0], history.dates[-1]
+            self.loaded_from = first if self.loaded_from is None else min(first, self.loaded_from)
+            self.loaded_through = last if self.loaded_through is None else max(last, self.loaded_through)
+
+    def _shift(self, rows: int):
+        """Insert `rows` empty days before the first row"""
+        self._reserve(rows)
+        for name in ('_dates', '_count', '_total', '_low', '_high'):
+            array = getattr(self, name)
+            array[rows:self._days + rows] = array[:self._days].copy()
+        self._dates[:rows] = self._dates[rows] - rows + np.arange(rows)
+        self._count[:rows] = 0
+        self._total[:rows] = 0
+        self._low[:rows] = np.inf
+        self._high[:rows] = -np.inf
+        self._days += rows
+
+    def _recompute_streak(self):
+        col = self._column[self.streak_metric]
+        closed = self._days - 1
+        count = self._count[:closed, col]
+        means = np.divide(self._total[:closed, col], count,
+                          out=np.full(closed, np.inf), where=count > 0)
+        breaks = np.flatnonzero(means >= self.streak_below)
+        self._closed_streak = closed if breaks.size == 0 else closed - 1 - int(breaks[-1])
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    @property
+    def streak(self) -> int:
+        """Consecutive most recent days with the streak metric below the limit"""
+        with self._lock:
+            if not self._days:
+                return 0
+            last = self._days - 1
+            if not self._count[last, self._column[self.streak_metric]]:
+                return self._closed_streak
+            return self._closed_streak + 1 if self._counts_toward_streak(last) else 0
+
+    def _rows(self, days: int = None, end=None) -> slice:
+        """Row range for the `days` days before `end` (exclusive)"""
+        stop = self._days
+        if end is not None and self._days:
+            stop = int(np.clip((_day(end) - self._dates[0]).astype(np.int64), 0, self._days))
+        start = 0 if days is None else max(0, stop - days)
+        return slice(start, stop)
+
+    def means(self, days: int = None, end=None) -> HistoryColumns:
+        """
+        Daily means as a HistoryColumns (NaN for days without samples)
+
+        Args:
+            days: Number of most recent days (default all)
+            end: Exclude this day and later, e.g. date.today() for closed days only
+        """
+        with self._lock:
+            rows = self._rows(days, end)
+            count = self._count[rows]
+            means = np.divide(self._total[rows], count,
+                              out=np.full(count.shape, np.nan), where=count > 0)
+            dates = self._dates[rows].copy()
+        return HistoryColumns(dates, {name: means[:, i] for i, name in enumerate(self.metrics)})
+
+    def summary(self, period: str = 'day', days: int = None, end=None) -> Dict:
+        """
+        Per-period mean / min / max / count of every metric
+
+        Args:
+            period: 'day', 'week' (Monday start) or 'month'
+            days: Number of most recent days to cover (default all)
+            end: Exclude this day and later
+
+        Returns:
+            Dict with 'period', 'start' (ISO dates) and one
+            {'mean','min','max','count'} dict of lists per metric
+        """
+        if period not in PERIODS:
+            raise ValueError(f'Unknown period: {period}')
+        with self._lock:
+            rows = self._rows(days, end)
+            dates = self._dates[rows]
+            count = self._count[rows]
+            total = self._total[rows]
+            low = self._low[rows]
+            high = self._high[rows]
+
+        if period == 'day' or not len(dates):
+            starts = dates
+        else:
+            if period == 'week':
+                # 1970-01-01 was a Thursday, so shift by 3 to make Monday 0
+                keys = dates - ((dates.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+            else:
+                keys = dates.astype('datetime64[M]')
+            edges = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            starts = keys[edges].astype('datetime64[D]')
+            count = np.add.reduceat(count, edges)
+            total = np.add.reduceat(total, edges)
+            low = np.minimum.reduceat(low, edges)
+            high = np.maximum.reduceat(high, edges)
+
+        def column(values, i):
+            return [None if not c else round(float(v), 2) for v, c in zip(values[:, i], count[:, i])]
+
+        means = np.divide(total, count, out=np.zeros(count.shape), where=count > 0)
+        result = {'period': period, 'start': np.datetime_as_string(starts, unit='D').tolist()}
+        for i, name in enumerate(self.metrics):
+            result[name] = {
+                'mean': column(means, i),
+                'min': column(low, i),
+                'max': column(high, i),
+                'count': count[:, i].tolist(),
+            }
+        return result
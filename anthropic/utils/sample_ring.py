@@ -0,0 +1,265 @@
+"""
+Sample Ring Module
+Fixed-size, memory-mapped ring buffers of high-frequency sensor samples
+"""
+
+import ast
+import hashlib
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b'FVRING1\x00'
+HEADER_SIZE = 4096          # keeps the records page-aligned
+
+# Header fields (little-endian uint64 slots)
+_HEAD = 1                   # samples published so far (monotonic)
+_RESERVED = 2               # head + samples being written right now
+_CAPACITY = 3
+_ITEMSIZE = 4
+_DESCR_LEN = 5
+_DESCR_OFFSET = 64          # dtype description (repr of the descr list)
+
+
+class SampleRing:
+    """
+    Single-writer, multi-reader ring buffer in a shared file
+
+    The writer first raises `reserved`, then copies the samples into their
+    slots, then raises `head`. A reader loads `head`, copies the samples it
+    wants and loads `reserved` afterwards; any copied sample whose slot may
+    have been reused meanwhile (index < reserved - capacity) is dropped. The
+    read path therefore takes no lock, and readers in other processes map the
+    same pages instead of receiving copies over a socket. This relies on
+    aligned 8-byte stores being atomic and stores becoming visible in
+    program order, as on x86-64.
+
+    Records must have a leading 'timestamp' field. since() binary-searches
+    it, so append() drops any sample older than one already published.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        """
+        Open an existing ring (use SampleRing.create to make one)
+
+        Args:
+            path: Ring file
+            writable: Open for the single writer
+        """
+        self.path = path
+        self.writable = writable
+        raw = np.memmap(path, dtype=np.uint8, mode='r+' if writable else 'r')
+        if bytes(raw[:8]) != MAGIC:
+            raise ValueError(f'Not a sample ring: {path}')
+        self._header = raw[:_DESCR_OFFSET].view('<u8')
+        self.capacity = int(self._header[_CAPACITY])
+        descr_len = int(self._header[_DESCR_LEN])
+        descr = ast.literal_eval(bytes(raw[_DESCR_OFFSET:_DESCR_OFFSET + descr_len]).decode())
+        self.dtype = np.lib.format.descr_to_dtype(descr)
+        if self.dtype.itemsize != int(self._header[_ITEMSIZE]):
+            raise ValueError(f'Corrupt ring header: {path}')
+        self._records = raw[HEADER_SIZE:HEADER_SIZE + self.capacity * self.dtype.itemsize].view(self.dtype)
+        self._raw = raw
+
+    @classmethod
+    def create(cls, path: str, capacity: int, dtype) -> 'SampleRing':
+        """
+        Create a ring file, or reopen it for writing if it already has the same layout
+
+        Args:
+            path: Ring file
+            capacity: Samples kept (the oldest are overwritten)
+            dtype: Record dtype (structured, 'timestamp' first)
+        """
+        dtype = np.dtype(dtype)
+        if dtype.names is None or dtype.names[0] != 'timestamp':
+            raise ValueError("Ring records need a leading 'timestamp' field")
+        if os.path.exists(path):
+            try:
+                ring = cls(path, writable=True)
+                if ring.capacity == capacity and ring.dtype == dtype:
+                    return ring
+            except ValueError:
+                pass
+            logger.warning(f"Recreating sample ring with a new layout: {path}")
+
+        descr = repr(np.lib.format.dtype_to_descr(dtype)).encode()
+        if _DESCR_OFFSET + len(descr) > HEADER_SIZE:
+            raise ValueError('Record dtype description too long')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.truncate(HEADER_SIZE + capacity * dtype.itemsize)
+            f.write(MAGIC)
+            header = np.zeros(_DESCR_OFFSET // 8 - 1, dtype='<u8')
+            header[_CAPACITY - 1] = capacity
+            header[_ITEMSIZE - 1] = dtype.itemsize
+            header[_DESCR_LEN - 1] = len(descr)
+            f.write(header.tobytes())
+            f.write(descr)
+        os.replace(tmp, path)
+        return cls(path, writable=True)
+
+    def __len__(self) -> int:
+        return min(int(self._header[_HEAD]), self.capacity)
+
+    @property
+    def head(self) -> int:
+        """Total samples ever published"""
+        return int(self._header[_HEAD])
+
+    # ── Writer ───────────────────────────────────────────────────────────────
+
+    def append(self, samples) -> int:
+        """
+        Publish samples (structured array in the ring dtype, time order)
+
+        Returns:
+            Samples dropped for going back in time (or a NaN timestamp)
+        """
+        if not self.writable:
+            raise PermissionError('Ring opened read-only')
+        samples = np.asarray(samples, dtype=self.dtype)
+        head = int(self._header[_HEAD])
+        newest = self._records['timestamp'][(head - 1) % self.capacity] if head else -np.inf
+        stamps = samples['timestamp']
+        # Newest timestamp published before each sample (fmax skips NaN)
+        floor = np.fmax.accumulate(np.concatenate(([newest], stamps)))[:-1]
+        in_order = stamps >= floor
+        dropped = len(samples) - int(np.count_nonzero(in_order))
+        if dropped:
+            samples = samples[in_order]
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+        if not n:
+            return dropped
+        self._header[_RESERVED] = head + n
+        start = head % self.capacity
+        first = min(n, self.capacity - start)
+        self._records[start:start + first] = samples[:first]
+        if first < n:
+            self._records[:n - first] = samples[first:]
+        self._header[_HEAD] = head + n
+        return dropped
+
+    def flush(self):
+        self._raw.flush()
+
+    # ── Readers (lock-free) ──────────────────────────────────────────────────
+
+    def _copy(self, lo: int, hi: int) -> np.ndarray:
+        """Samples with absolute indices lo..hi-1, minus any overwritten meanwhile"""
+        if hi <= lo:
+            return np.empty(0, dtype=self.dtype)
+        start, stop = lo % self.capacity, hi % self.capacity
+        if start < stop or stop == 0:
+            out = self._records[start:stop or self.capacity].copy()
+        else:
+            out = np.concatenate((self._records[start:], self._records[:stop]))
+        oldest_valid = int(self._header[_RESERVED]) - self.capacity
+        if oldest_valid > lo:
+            out = out[oldest_valid - lo:]
+        return out
+
+    def last(self, n: int) -> np.ndarray:
+        """The newest n samples (fewer if the ring holds fewer)"""
+        head = int(self._header[_HEAD])
+        return self._copy(max(head - n, head - self.capacity, 0), head)
+
+    def since(self, timestamp: float, limit: int = None) -> np.ndarray:
+        """
+        Samples with timestamp > `timestamp`, oldest first
+
+        Args:
+            timestamp: Exclusive lower bound (POSIX time)
+            limit: Keep only the newest `limit` of them
+        """
+        head = int(self._header[_HEAD])
+        lo, hi = max(head - self.capacity, 0), head
+        # Binary search over absolute indices; touches O(log capacity) slots
+        stamps = self._records['timestamp']
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if stamps[mid % self.capacity] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        if limit is not None:
+            lo = max(lo, head - limit)
+        return self._copy(lo, head)
+
+
+class SampleRings:
+    """
+    One SampleRing file per patient in a directory
+
+    The ingest process calls writer(); web workers call reader(), which
+    returns None until the patient's ring exists. Both keep at most
+    `max_open` rings mapped, least recently used first out; an evicted ring
+    is unmapped (and its file descriptor closed) once nothing references
+    it, and a writer reopened later carries on from the ring's head.
+    """
+
+    def __init__(self, directory: str = 'sample_rings', dtype=None,
+                 capacity: int = 16384, max_open: int = 256):
+        """
+        Initialize the directory
+
+        Args:
+            directory: Where ring files live (created if missing)
+            dtype: Record dtype (required for writers)
+            capacity: Samples per patient ring
+            max_open: Reader maps kept open, and separately writer maps (one
+                file descriptor each; with HistoryStore's default 512 this
+                leaves room under a 1024 fd limit)
+        """
+        self.directory = directory
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.capacity = capacity
+        self._writers = TTLCache(maxsize=max_open)
+        self._readers = TTLCache(maxsize=max_open)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, uid: str) -> str:
+        # Hash the id so any email is a safe file name
+        return os.path.join(self.directory, hashlib.sha256(uid.encode()).hexdigest()[:24] + '.ring')
+
+    def writer(self, uid: str) -> SampleRing:
+        """The patient's ring, opened (or created) for writing"""
+        ring = self._writers.get(uid)
+        if ring is None:
+            if self.dtype is None:
+                raise ValueError('SampleRings needs a dtype to create writers')
+            with self._lock:
+                ring = self._writers.get(uid)
+                if ring is None:
+                    ring = SampleRing.create(self.path(uid), self.capacity, self.dtype)
+                    self._writers.set(uid, ring)
+        return ring
+
+    def reader(self, uid: str) -> Optional[SampleRing]:
+        """The patient's ring opened read-only, or None if it has no ring"""
+        path = self.path(uid)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+        cached = self._readers.get(uid)
+        if cached is not None and cached[1] == inode:
+            return cached[0]
+        # New ring, or the writer recreated the file with another layout
+        try:
+            ring = SampleRing(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._readers.set(uid, (ring, inode))
+        return ring
@@ -0,0 +1,360 @@
+"""
+Sensor Gateway Module
+Asyncio TCP ingest for wearable limb-angle frames with micro-batched threshold checks
+"""
+
+import asyncio
+import logging
+import resource
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .sample_ring import SampleRings
+from .threshold_checker import ThresholdChecker
+
+logger = logging.getLogger(__name__)
+
+# Wire format: one handshake line, then fixed-size little-endian frames
+HANDSHAKE_PREFIX = b'FVS1 '
+LIMBS = ('right_arm', 'left_arm', 'right_leg', 'left_leg')
+FRAME_DTYPE = np.dtype([('timestamp', '<f8'), ('angles', '<f4', (len(LIMBS),))])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+
+
+def encode_frames(timestamps, angles) -> bytes:
+    """
+    Encode samples into wire frames
+
+    Args:
+        timestamps: Sequence of POSIX timestamps
+        angles: (samples, 4) angles in LIMBS order
+    """
+    frames = np.empty(len(timestamps), dtype=FRAME_DTYPE)
+    frames['timestamp'] = timestamps
+    frames['angles'] = angles
+    return frames.tobytes()
+
+
+class SensorGateway:
+    """
+    Accepts per-patient angle frames from many device connections
+
+    Frames are appended to a per-patient buffer as raw bytes. Every
+    batch_interval seconds all buffers are swapped out, decoded with NumPy
+    and evaluated in one ThresholdChecker.check_limbs_batch call. Limbs that
+    newly enter RED are forwarded to the NotificationService off the loop.
+    With `rings`, every evaluated frame is also published to the patient's
+    shared-memory sample ring for the web workers.
+    """
+
+    def __init__(self, checker: ThresholdChecker = None, notifier=None,
+                 guardians_for: Callable[[str], List[str]] = None,
+                 batch_interval: float = 0.25, max_buffer_frames: int = 1000,
+                 rings: SampleRings = None):
+        """
+        Initialize the gateway
+
+        Args:
+            checker: ThresholdChecker used for batch evaluation
+            notifier: NotificationService (or AlertCoalescer) receiving RED alerts (optional)
+            guardians_for: Maps a patient id to guardian emails
+            batch_interval: Seconds between micro-batch evaluations
+            max_buffer_frames: Frames kept per patient between batches
+            rings: Sample rings to publish frames to (optional)
+        """
+        self.checker = checker or ThresholdChecker()
+        self.notifier = notifier
+        self.guardians_for = guardians_for or (lambda patient: ['guardian@example.com'])
+        self.batch_interval = batch_interval
+        self.max_buffer_bytes = max_buffer_frames * FRAME_SIZE
+        self.rings = rings
+
+        self._buffers: Dict[str, bytearray] = {}
+        self._red_limbs: Dict[str, frozenset] = {}
+        self.latest: Dict[str, Dict] = {}
+        self.stats = {
+            'connections': 0,
+            'connections_total': 0,
+            'frames_received': 0,
+            'frames_dropped': 0,
+            'frames_evaluated': 0,
+            'frames_out_of_order': 0,
+            'batches': 0,
+            'alerts_forwarded': 0,
+            'last_batch_ms': 0.0,
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batch_task: Optional[asyncio.Task] = None
+
+    # ── Server lifecycle ──────────────────────────────────────────────────────
+
+    async def start(self, host: str = '0.0.0.0', port: int = 9100, backlog: int = 4096):
+        """Start listening and the micro-batch loop"""
+        self._server = await asyncio.start_server(self._handle_device, host, port, backlog=backlog)
+        self._batch_task = asyncio.create_task(self._batch_loop())
+        sockets = self._server.sockets or ()
+        logger.info(f"SensorGateway listening on {', '.join(str(s.getsockname()) for s in sockets)}")
+        return self._server
+
+    async def stop(self):
+        """Stop accepting connections and flush the remaining buffers"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batch_task:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+        self.process_batch()
+
+    # ── Ingest ────────────────────────────────────────────────────────────────
+
+    async def _handle_device(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        if not line.startswith(HANDSHAKE_PREFIX) or not line.strip()[len(HANDSHAKE_PREFIX):]:
+            logger.warning(f"Rejected device with bad handshake: {line[:40]!r}")
+            writer.close()
+            return
+        patient = line[len(HANDSHAKE_PREFIX):].strip().decode('utf-8', 'replace')
+
+        self.stats['connections'] += 1
+        self.stats['connections_total'] += 1
+        pending = b''
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if pending:
+                    data = pending + data
+                usable = len(data) - len(data) % FRAME_SIZE
+                pending = data[usable:]
+                if usable:
+                    self._buffer(patient, data[:usable] if pending else data)
+        except ConnectionError:
+            pass
+        finally:
+            self.stats['connections'] -= 1
+            writer.close()
+
+    def _buffer(self, patient: str, data: bytes):
+        buf = self._buffers.get(patient)
+        if buf is None:
+            buf = self._buffers[patient] = bytearray()
+        buf += data
+        self.stats['frames_received'] += len(data) // FRAME_SIZE
+        overflow = len(buf) - self.max_buffer_bytes
+        if overflow > 0:
+            # Keep the newest frames; drop whole frames from the front
+            overflow += -overflow % FRAME_SIZE
+            del buf[:overflow]
+            self.stats['frames_dropped'] += overflow // FRAME_SIZE
+
+    # ── Micro-batching ────────────────────────────────────────────────────────
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            try:
+                alerts = self.process_batch()
+            except Exception as e:
+                logger.error(f"SensorGateway batch failed: {e}")
+                continue
+            if alerts and self.notifier:
+                loop.run_in_executor(None, self._forward_alerts, alerts)
+
+    def process_batch(self) -> List[Dict]:
+        """
+        Evaluate every buffered frame in one vectorized pass
+
+        Returns:
+            Alert dicts for limbs that entered RED during this batch
+        """
+        buffers, self._buffers = self._buffers, {}
+        if not buffers:
+            return []
+        started = time.perf_counter()
+
+        patients = list(buffers)
+        frames = np.frombuffer(b''.join(buffers[p] for p in patients), dtype=FRAME_DTYPE)
+        counts = np.fromiter((len(buffers[p]) // FRAME_SIZE for p in patients),
+                             dtype=np.int64, count=len(patients))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        # Devices may deliver late frames; put each patient's frames in time order
+        stamps = frames['timestamp']
+        backwards = np.flatnonzero(stamps[1:] < stamps[:-1]) + 1
+        if np.any(~np.isin(backwards, offsets)):
+            owner = np.repeat(np.arange(len(patients)), counts)
+            frames = frames[np.lexsort((stamps, owner))]
+
+        # Every sample is evaluated as its own (1-sample) row
+        angles = frames['angles'].astype(np.float64)
+        report = self.checker.check_limbs_batch(
+            angles[:, np.newaxis, :], limbs=LIMBS, materialize_alerts=False
+        )
+        codes = report['alert_codes'][:, 0, :]
+        worst = np.maximum.reduceat(codes, offsets, axis=0)
+        last = offsets + counts - 1
+
+        red_code = ThresholdChecker.ALERT_CODES.index('RED')
+        alerts = []
+        for i, patient in enumerate(patients):
+            if self.rings is not None:
+                # Frames older than the ring's newest sample are dropped there
+                self.stats['frames_out_of_order'] += self.rings.writer(patient).append(
+                    frames[offsets[i]:offsets[i] + counts[i]])
+            self.latest[patient] = {
+                'timestamp': float(frames['timestamp'][last[i]]),
+                'angles': dict(zip(LIMBS, np.round(angles[last[i]], 1).tolist())),
+                'alert_levels': [ThresholdChecker.ALERT_CODES[c] for c in worst[i]],
+            }
+            red = frozenset(LIMBS[l] for l in np.flatnonzero(worst[i] == red_code))
+            entered = red - self._red_limbs.get(patient, frozenset())
+            if red:
+                self._red_limbs[patient] = red
+            else:
+                self._red_limbs.pop(patient, None)
+            if not entered:
+                continue
+
+            # Report the most extreme reading of each newly RED limb
+            rows = slice(offsets[i], offsets[i] + counts[i])
+            for limb in entered:
+                l = LIMBS.index(limb)
+                row = offsets[i] + int(np.argmax(report['deviation_from_range'][rows, 0, l]))
+                alert = self.checker.check_limb_angle(limb, round(float(angles[row, l]), 1))
+                alert['patient'] = patient
+                alerts.append(alert)
+
+        self.stats['batches'] += 1
+        self.stats['frames_evaluated'] += len(frames)
+        self.stats['last_batch_ms'] = (time.perf_counter() - started) * 1000
+        return alerts
+
+    def _forward_alerts(self, alerts: List[Dict]):
+        for alert in alerts:
+            try:
+                self.notifier.send_threshold_alert(alert['patient'], self.guardians_for(alert['patient']), alert)
+                self.stats['alerts_forwarded'] += 1
+            except Exception as e:
+                logger.error(f"Failed to forward alert for {alert['patient']}: {e}")
+
+
+async def simulate_device(host: str, port: int, patient: str, hz: float = 50,
+                          duration: float = 10, packet_interval: float = 0.2,
+                          baseline=(85, 82, 168, 165), noise: float = 12,
+                          seed: int = None) -> int:
+    """
+    Local simulated wearable that streams frames to a SensorGateway
+
+    Args:
+        host, port: Gateway address
+        patient: Patient id sent in the handshake
+        hz: Samples per second
+        duration: Seconds to stream for
+        packet_interval: Seconds between writes (samples are sent in bundles)
+        baseline: Mean angle per limb
+        noise: Uniform noise amplitude in degrees
+        seed: RNG seed for reproducible streams
+
+    Returns:
+        Number of frames sent
+    """
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(HANDSHAKE_PREFIX + patient.encode() + b'\n')
+    per_packet = max(1, int(round(hz * packet_interval)))
+    sent = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    next_send = loop.time()
+    try:
+        while loop.time() < deadline:
+            now = time.time()
+            timestamps = now - np.arange(per_packet)[::-1] / hz
+            angles = np.asarray(baseline) + rng.uniform(-noise, noise, (per_packet, len(LIMBS)))
+            writer.write(encode_frames(timestamps, angles))
+            await writer.drain()
+            sent += per_packet
+            next_send += packet_interval
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+    return sent
+
+
+def ring_budget(reserve: int = 256) -> int:
+    """
+    Ring writers the gateway can keep mapped
+
+    Raises the soft open-file limit to the hard limit, then splits what is
+    left after `reserve` (logs, databases) evenly between device sockets and
+    ring maps, since every connected device needs one of each.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    if soft == resource.RLIM_INFINITY:
+        soft = 65536
+    return max(64, (soft - reserve) // 2)
+
+
+def build_gateway(ring_dir: str = 'sample_rings', notification_file: str = 'notifications.json',
+                  **kwargs) -> SensorGateway:
+    """
+    The deployed gateway: RED alerts go through an AlertCoalescer, frames to sample rings
+
+    Args:
+        ring_dir: Sample ring directory shared with the web workers
+        notification_file: NotificationService history file (its database sits beside it)
+        **kwargs: SensorGateway options
+    """
+    from .alert_coalescer import AlertCoalescer
+    from .notification_service import NotificationService
+
+    max_rings = ring_budget()
+    logger.info(f"SensorGateway keeps up to {max_rings} sample rings mapped")
+    rings = SampleRings(ring_dir, FRAME_DTYPE, max_open=max_rings)
+    notifier = AlertCoalescer(NotificationService(notification_file))
+    return SensorGateway(notifier=notifier, rings=rings, **kwargs)
+
+
+async def run_gateway(host: str = '0.0.0.0', port: int = 9100,
+                      ring_dir: str = 'sample_rings', **kwargs):
+    """
+    Run a gateway until cancelled, forwarding RED alerts through an
+    AlertCoalescer and publishing frames to sample rings in ring_dir
+    """
+    gateway = build_gateway(ring_dir, **kwargs)
+    server = await gateway.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await gateway.stop()
+
+
+if __name__ == '__main__':
+    # python -m utils.sensor_gateway [port]
+    import sys
+    from .log_queue import configure_logging
+    logging.basicConfig(level=logging.INFO)
+    configure_logging(logging.INFO)
+    asyncio.run(run_gateway(port=int(sys.argv[1]) if len(sys.argv) > 1 else 9100))
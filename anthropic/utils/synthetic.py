@@ -0,0 +1,42 @@
+"""
+Synthetic Module
+Deterministic per-patient mock readings (KPIs, limb angles) shared by the app and worker processes
+"""
+
+import hashlib
+import random
+from typing import Dict, List
+
+# Baseline angle per limb, shared by every synthetic generator (live readings and history)
+LIMB_BASES = {'right_arm': 85, 'left_arm': 82, 'right_leg': 168, 'left_leg': 165}
+
+
+def stable_seed(uid: str) -> int:
+    """Seed derived from a stable hash of uid (independent of PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.sha256(uid.encode()).digest()[:8], 'big')
+
+
+def rng(uid: str) -> random.Random:
+    """Private random generator seeded from a stable hash of uid"""
+    return random.Random(stable_seed(uid))
+
+
+def gen_angle(rnd: random.Random, base: float, noise: float = 12) -> float:
+    return round(base + rnd.uniform(-noise, noise), 1)
+
+
+def synthetic_kpis(uid: str) -> Dict:
+    """Mobility, posture, fall risk and brain correlation for a patient"""
+    rnd = rng(uid)
+    mobility   = rnd.randint(62, 94)
+    posture    = rnd.randint(58, 97)
+    fall_risk  = rnd.randint(8, 45)
+    brain_corr = round(rnd.uniform(0.61, 0.96), 2)
+    return dict(mobility=mobility, posture=posture, fall_risk=fall_risk, brain_corr=brain_corr)
+
+
+def synthetic_limb_angles(uid: str, limb: str) -> List[float]:
+    """Eight recent angles for a limb, newest first"""
+    rnd = rng(uid + limb)
+    base = LIMB_BASES.get(limb, 90)
+    return [gen_angle(rnd, base) for _ in range(8)]
@@ -4,13 +4,186 @@ Monitors limb angles and brain-movement correlation for dangerous deviations
 """
 
 import logging
+import time
+from bisect import bisect_right
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .log_queue import SampledLog
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-check events: routine results sampled, RED/ORANGE always logged
+events = SampledLog(logger, per_second=1.0)
+
+
+def limb_message(limb: str, angle: float, alert_level: Optional[str],
+                 direction: str, deviation: float) -> str:
+    """Human-readable message for one limb check"""
+    limb_display = limb.replace('_', ' ').title()
+    
+    if alert_level == 'RED':
+        return (f"🚨 CRITICAL: {limb_display} angle ({angle}°) is FAR OUTSIDE safe range "
+               f"({deviation}° {direction} threshold). Immediate intervention required!")
+    elif alert_level == 'ORANGE':
+        return (f"⚠️ WARNING: {limb_display} angle ({angle}°) is approaching danger zone "
+               f"({deviation}° {direction} threshold). Monitor closely.")
+    elif alert_level == 'YELLOW':
+        return (f"⚡ CAUTION: {limb_display} angle ({angle}°) is slightly outside normal range "
+               f"({deviation}° {direction} threshold).")
+    else:
+        return f"✓ {limb_display} angle ({angle}°) is within safe range."
+
+
+class LimbCheckResult(Mapping):
+    """
+    Result of one limb check
+    
+    Only the numeric fields are stored. Rounded values, the message, the
+    ISO timestamp and the alert config are produced when read, so results
+    that are never displayed cost no string formatting. Reads work both as
+    a mapping (result['message'], result.get(...), dict(result)) and as
+    attributes (result.message, as used by templates); to_dict() gives the
+    plain dict used for JSON.
+    """
+    
+    __slots__ = ('limb', 'code', 'direction', 'checked_at', 'patient', 'sample',
+                 '_angle', '_deviation', '_deviation_from_range', '_thresholds')
+    
+    FIELDS = ('limb', 'angle', 'status', 'alert_level', 'deviation', 'deviation_from_range',
+              'direction', 'safe_range', 'optimal', 'timestamp', 'message')
+    
+    def __init__(self, limb: str, angle: float, code: int, deviation: float,
+                 deviation_from_range: float, direction: str, thresholds: Dict):
+        self.limb = limb
+        self.code = code
+        self.direction = direction
+        self.checked_at = time.time()
+        self.patient = None
+        self.sample = None
+        self._angle = angle
+        self._deviation = deviation
+        self._deviation_from_range = deviation_from_range
+        self._thresholds = thresholds
+    
+    @property
+    def angle(self) -> float:
+        return round(self._angle, 1)
+    
+    @property
+    def status(self) -> str:
+        return 'alert' if self.code else 'safe'
+    
+    @property
+    def alert_level(self) -> Optional[str]:
+        return ThresholdChecker.ALERT_CODES[self.code]
+    
+    @property
+    def deviation(self) -> float:
+        return round(self._deviation, 1)
+    
+    @property
+    def deviation_from_range(self) -> float:
+        return round(self._deviation_from_range, 1)
+    
+    @property
+    def safe_range(self) -> str:
+        return f"{self._thresholds['min']}-{self._thresholds['max']}°"
+    
+    @property
+    def optimal(self):
+        return self._thresholds['optimal']
+    
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.checked_at).isoformat()
+    
+    @property
+    def message(self) -> str:
+        return limb_message(self.limb, self._angle, self.alert_level, self.direction,
+                            self._deviation_from_range)
+    
+    @property
+    def alert_config(self) -> Optional[Dict]:
+        return ThresholdChecker.ALERT_LEVELS[self.alert_level] if self.code else None
+    
+    def _keys(self):
+        keys = list(self.FIELDS)
+        if self.code:
+            keys.append('alert_config')
+        if self.patient is not None:
+            keys.append('patient')
+        if self.sample is not None:
+            keys.append('sample')
+        return keys
+    
+    def __getitem__(self, key: str):
+        if key in _RESULT_FIELDS:
+            return getattr(self, key)
+        if key in _OPTIONAL_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value):
+        # Batch and gateway callers label results with their patient / sample
+        if key not in ('patient', 'sample'):
+            raise KeyError(f'{key} is read-only')
+        setattr(self, key, value)
+    
+    def __iter__(self):
+        return iter(self._keys())
+    
+    def __len__(self) -> int:
+        return len(self._keys())
+    
+    def keys(self):
+        return self._keys()
+    
+    def to_dict(self) -> Dict:
+        alert_level = ThresholdChecker.ALERT_CODES[self.code]
+        thresholds = self._thresholds
+        data = {
+            'limb': self.limb,
+            'angle': round(self._angle, 1),
+            'status': 'alert' if self.code else 'safe',
+            'alert_level': alert_level,
+            'deviation': round(self._deviation, 1),
+            'deviation_from_range': round(self._deviation_from_range, 1),
+            'direction': self.direction,
+            'safe_range': f"{thresholds['min']}-{thresholds['max']}°",
+            'optimal': thresholds['optimal'],
+            'timestamp': datetime.fromtimestamp(self.checked_at).isoformat(),
+            'message': limb_message(self.limb, self._angle, alert_level, self.direction,
+                                    self._deviation_from_range),
+        }
+        if self.code:
+            data['alert_config'] = ThresholdChecker.ALERT_LEVELS[alert_level]
+        if self.patient is not None:
+            data['patient'] = self.patient
+        if self.sample is not None:
+            data['sample'] = self.sample
+        return data
+    
+    def __repr__(self) -> str:
+        return (f"LimbCheckResult({self.limb!r}, angle={self.angle}, "
+                f"alert_level={self.alert_level!r})")
+
+
+_RESULT_FIELDS = frozenset(LimbCheckResult.FIELDS)
+_OPTIONAL_FIELDS = frozenset(('alert_config', 'patient', 'sample'))
+
+
+def json_default(obj):
+    """json.dumps default= hook for result objects exposing to_dict()"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
 
 class ThresholdChecker:
     """
@@ -57,6 +230,20 @@ class ThresholdChecker:
         }
     }
     
+    # Alert level codes used by the batch API (index = code, 0 = safe)
+    ALERT_CODES = (None, 'YELLOW', 'ORANGE', 'RED')
+    
+    # Deviation (degrees outside safe range) at which each code starts
+    ALERT_BOUNDARIES = (5, 10, 15)
+    
+    # Limb risk contribution per alert code, as used by calculate_risk_score
+    LIMB_RISK_WEIGHTS = (0, 5, 15, 30)
+    
+    # Total risk (%) at which Moderate and High start, with each level's label and color
+    RISK_BOUNDARIES = (20, 35)
+    RISK_LEVELS = ('Low', 'Moderate', 'High')
+    RISK_COLORS = ('#2D8C6E', '#D4A017', '#C0392B')
+    
     def __init__(self, user_baseline: Dict = None):
         """
         Initialize threshold checker with optional custom baseline
@@ -67,7 +254,7 @@ class ThresholdChecker:
         self.baseline = user_baseline if user_baseline else self.SAFE_RANGES
         logger.info("ThresholdChecker initialized")
     
-    def check_limb_angle(self, limb: str, angle: float) -> Dict:
+    def check_limb_angle(self, limb: str, angle: float) -> LimbCheckResult:
         """
         Check if a limb angle is within safe thresholds
         
@@ -76,7 +263,8 @@ class ThresholdChecker:
             angle: Current angle measurement in degrees
             
         Returns:
-            Dict containing status, alert_level, deviation, and message
+            LimbCheckResult with status, alert_level, deviation and message
+            (an error dict for an unknown limb)
         """
         if limb not in self.baseline:
             logger.error(f"Invalid limb identifier: {limb}")
@@ -105,64 +293,19 @@ class ThresholdChecker:
             direction = 'within'
         
         # Determine alert level
-        alert_level = self._determine_alert_level(deviation_from_range)
-        
-        # Build result
-        result = {
-            'limb': limb,
-            'angle': round(angle, 1),
-            'status': 'safe' if alert_level is None else 'alert',
-            'alert_level': alert_level,
-            'deviation': round(deviation, 1),
-            'deviation_from_range': round(deviation_from_range, 1),
-            'direction': direction,
-            'safe_range': f"{min_safe}-{max_safe}°",
-            'optimal': optimal,
-            'timestamp': datetime.now().isoformat(),
-            'message': self._generate_message(limb, angle, alert_level, direction, deviation_from_range)
-        }
+        code = bisect_right(self.ALERT_BOUNDARIES, deviation_from_range)
         
-        # Add alert configuration if alert exists
-        if alert_level:
-            result['alert_config'] = self.ALERT_LEVELS[alert_level]
+        result = LimbCheckResult(limb, angle, code, deviation, deviation_from_range,
+                                 direction, thresholds)
         
-        logger.info(f"Checked {limb}: {angle}° - Status: {result['status']}")
+        events.event('limb_check', code >= 2, limb=limb, angle=angle,
+                     alert_level=self.ALERT_CODES[code], deviation_from_range=deviation_from_range)
         return result
     
-    def _determine_alert_level(self, deviation_from_range: float) -> str:
-        """
-        Determine alert level based on deviation from safe range
-        
-        Args:
-            deviation_from_range: Degrees outside safe range (0 if within range)
-            
-        Returns:
-            Alert level string ('RED', 'ORANGE', 'YELLOW') or None if safe
-        """
-        if deviation_from_range >= 15:
-            return 'RED'
-        elif deviation_from_range >= 10:
-            return 'ORANGE'
-        elif deviation_from_range >= 5:
-            return 'YELLOW'
-        return None
-    
     def _generate_message(self, limb: str, angle: float, alert_level: str, 
                          direction: str, deviation: float) -> str:
         """Generate human-readable alert message"""
-        limb_display = limb.replace('_', ' ').title()
-        
-        if alert_level == 'RED':
-            return (f"🚨 CRITICAL: {limb_display} angle ({angle}°) is FAR OUTSIDE safe range "
-                   f"({deviation}° {direction} threshold). Immediate intervention required!")
-        elif alert_level == 'ORANGE':
-            return (f"⚠️ WARNING: {limb_display} angle ({angle}°) is approaching danger zone "
-                   f"({deviation}° {direction} threshold). Monitor closely.")
-        elif alert_level == 'YELLOW':
-            return (f"⚡ CAUTION: {limb_display} angle ({angle}°) is slightly outside normal range "
-                   f"({deviation}° {direction} threshold).")
-        else:
-            return f"✓ {limb_display} angle ({angle}°) is within safe range."
+        return limb_message(limb, angle, alert_level, direction, deviation)
     
     def check_brain_sync(self, correlation_value: float) -> Dict:
         """
@@ -205,7 +348,8 @@ class ThresholdChecker:
         if result['alert_level']:
             result['alert_config'] = self.ALERT_LEVELS[result['alert_level']]
         
-        logger.info(f"Brain sync check: {correlation_value:.2f} - Status: {result['status']}")
+        events.event('brain_sync_check', result['status'] in ('critical', 'warning'),
+                     value=correlation_value, status=result['status'])
         return result
     
     def check_all_limbs(self, angles: Dict[str, float]) -> List[Dict]:
@@ -231,15 +375,18 @@ class ThresholdChecker:
         # Sort alerts by priority
         alerts.sort(key=lambda x: self.ALERT_LEVELS[x['alert_level']]['priority'])
         
-        logger.info(f"Checked all limbs - {len(alerts)} alerts generated")
+        critical_count = len([a for a in alerts if a['alert_level'] == 'RED'])
+        warning_count = len([a for a in alerts if a['alert_level'] == 'ORANGE'])
+        events.event('limbs_check', critical_count + warning_count > 0,
+                     alerts=len(alerts), critical=critical_count, warning=warning_count)
         
         return {
             'results': results,
             'alerts': alerts,
             'alert_count': len(alerts),
-            'critical_count': len([a for a in alerts if a['alert_level'] == 'RED']),
-            'warning_count': len([a for a in alerts if a['alert_level'] == 'ORANGE']),
-            'caution_count': len([a for a in alerts if a['alert_level'] == 'YELLOW']),
+            'critical_count': critical_count,
+            'warning_count': warning_count,
+            'caution_count': len(alerts) - critical_count - warning_count,
             'timestamp': datetime.now().isoformat()
         }
     
@@ -290,20 +437,13 @@ class ThresholdChecker:
         total_risk = min(100, limb_risk + brain_risk + posture_risk)
         
         # Determine risk level
-        if total_risk < 20:
-            risk_level = 'Low'
-            risk_color = '#2D8C6E'
-        elif total_risk < 35:
-            risk_level = 'Moderate'
-            risk_color = '#D4A017'
-        else:
-            risk_level = 'High'
-            risk_color = '#C0392B'
+        level = bisect_right(self.RISK_BOUNDARIES, total_risk)
+        risk_level = self.RISK_LEVELS[level]
         
         return {
             'total_risk': round(total_risk, 1),
             'risk_level': risk_level,
-            'risk_color': risk_color,
+            'risk_color': self.RISK_COLORS[level],
             'breakdown': {
                 'limb_risk': round(limb_risk, 1),
                 'brain_risk': round(brain_risk, 1),
@@ -344,3 +484,125 @@ class ThresholdChecker:
             recommendations.insert(0, "🧠 Low brain-movement sync detected - rest recommended")
         
         return recommendations
+    
+    # ── Batch API ─────────────────────────────────────────────────────────────
+    
+    def check_limbs_batch(self, angles, limbs: Sequence[str] = None,
+                          brain_sync=None, posture_scores=None,
+                          patient_ids: Sequence[str] = None,
+                          materialize_alerts: bool = True) -> Dict:
+        """
+        Check many patients' limb readings in one vectorized pass
+        
+        Args:
+            angles: Array of shape (patients, samples, limbs) in degrees
+            limbs: Limb names for the last axis (defaults to baseline order)
+            brain_sync: Optional (patients, samples) brain-movement correlation,
+                        broadcastable; with posture_scores, enables the
+                        composite risk score
+            posture_scores: Optional (patients, samples) posture scores (0-100),
+                            broadcastable; needed with brain_sync
+            patient_ids: Optional labels for the patient axis, used in alerts
+            materialize_alerts: Build result dicts for breaching readings
+                                (set False when only the arrays are needed)
+            
+        Returns:
+            Dict of numeric arrays (alert codes, deviations, risk scores and
+            levels) plus result dicts for the readings that breach a threshold only
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+        if angles.ndim == 2:
+            angles = angles[np.newaxis]
+        limbs = list(limbs) if limbs is not None else list(self.baseline)
+        if angles.ndim != 3 or angles.shape[-1] != len(limbs):
+            raise ValueError(
+                f"Expected angles of shape (patients, samples, {len(limbs)}), got {angles.shape}"
+            )
+        unknown = [limb for limb in limbs if limb not in self.baseline]
+        if unknown:
+            raise ValueError(f"Invalid limb identifier(s): {', '.join(unknown)}")
+        
+        min_safe = np.array([self.baseline[l]['min'] for l in limbs], dtype=np.float64)
+        max_safe = np.array([self.baseline[l]['max'] for l in limbs], dtype=np.float64)
+        optimal = np.array([self.baseline[l]['optimal'] for l in limbs], dtype=np.float64)
+        
+        deviation = np.abs(angles - optimal)
+        below = np.maximum(min_safe - angles, 0.0)
+        above = np.maximum(angles - max_safe, 0.0)
+        # A NaN angle compares as within range in check_limb_angle; digitize would band it RED
+        deviation_from_range = np.where(np.isnan(angles), 0.0, below + above)
+        
+        alert_codes = np.digitize(deviation_from_range, self.ALERT_BOUNDARIES).astype(np.int8)
+        
+        limb_risk = np.minimum(
+            np.asarray(self.LIMB_RISK_WEIGHTS, dtype=np.float64)[alert_codes].sum(axis=-1), 40
+        )
+        
+        result = {
+            'limbs': limbs,
+            'alert_codes': alert_codes,
+            'deviation': deviation,
+            'deviation_from_range': deviation_from_range,
+            'limb_risk': limb_risk,
+            'risk_score': None,
+            'risk_level': None,
+        }
+        
+        if (brain_sync is None) != (posture_scores is None):
+            raise ValueError("The composite risk score needs both brain_sync and posture_scores")
+        if brain_sync is not None:
+            result['risk_score'] = self._batch_risk_score(limb_risk, brain_sync, posture_scores)
+            result['risk_level'] = self.risk_levels(result['risk_score'])
+        
+        # Materialize dicts only for readings outside the safe range
+        alerts = []
+        breach_idx = np.argwhere(alert_codes > 0) if materialize_alerts else ()
+        for p, s, l in breach_idx:
+            limb = limbs[l]
+            angle = float(angles[p, s, l])
+            direction = 'below' if below[p, s, l] > 0 else 'above'
+            alert = LimbCheckResult(
+                limb, angle, int(alert_codes[p, s, l]), float(deviation[p, s, l]),
+                float(deviation_from_range[p, s, l]), direction, self.baseline[limb]
+            )
+            alert['patient'] = patient_ids[p] if patient_ids is not None else int(p)
+            alert['sample'] = int(s)
+            alerts.append(alert)
+        alerts.sort(key=lambda x: self.ALERT_LEVELS[x['alert_level']]['priority'])
+        
+        counts = np.bincount(alert_codes.ravel(), minlength=len(self.ALERT_CODES))
+        result.update({
+            'alerts': alerts,
+            'alert_count': int(counts[1:].sum()),
+            'critical_count': int(counts[3]),
+            'warning_count': int(counts[2]),
+            'caution_count': int(counts[1]),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+        events.event('batch_check', bool(counts[2] or counts[3]),
+                     patients=angles.shape[0], samples=angles.shape[1],
+                     alerts=result['alert_count'], critical=int(counts[3]), warning=int(counts[2]))
+        return result
+    
+    def _batch_risk_score(self, limb_risk, brain_sync, posture_scores):
+        """Vectorized equivalent of the total_risk in calculate_risk_score"""
+        brain_sync = np.asarray(brain_sync, dtype=np.float64)
+        brain_risk = np.select(
+            [brain_sync < self.BRAIN_SYNC_THRESHOLDS['critical'],
+             brain_sync < self.BRAIN_SYNC_THRESHOLDS['warning'],
+             brain_sync < self.BRAIN_SYNC_THRESHOLDS['normal']],
+            [40.0, 25.0, 10.0],
+            default=0.0
+        )
+        
+        # fmax, like the scalar max(0, ...), scores a NaN posture as 0
+        posture_scores = np.asarray(posture_scores, dtype=np.float64)
+        posture_risk = np.fmax(0.0, 100 - posture_scores) * 0.2
+        
+        return np.minimum(100.0, limb_risk + brain_risk + posture_risk)
+    
+    @classmethod
+    def risk_levels(cls, risk_scores) -> np.ndarray:
+        """Map risk score arrays to RISK_LEVELS labels (the bands calculate_risk_score uses)"""
+        return np.array(cls.RISK_LEVELS)[np.digitize(risk_scores, cls.RISK_BOUNDARIES)]
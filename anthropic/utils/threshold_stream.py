@@ -0,0 +1,197 @@
+"""
+Threshold Stream Module
+Fans out live threshold reports to Server-Sent Events subscribers
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterator, Optional
+
+from .threshold_checker import json_default
+
+logger = logging.getLogger(__name__)
+
+
+class ThresholdStreamHub:
+    """
+    One producer thread per patient, shared by all of that patient's subscribers
+
+    The producer polls a snapshot function at a fixed interval and publishes
+    only when the snapshot's fingerprint (angles and alert levels) changes.
+    Producers start with the first subscriber and stop after the last leaves.
+
+    Every open stream pins a server thread for its whole lifetime, so the
+    hub admits at most `max_subscribers` at a time; callers turned away
+    should fall back to polling.
+    """
+
+    def __init__(self, snapshot_fn: Callable[[Hashable], Dict],
+                 fingerprint_fn: Callable[[Dict], Hashable],
+                 interval: float = 1.0, queue_size: int = 8, max_subscribers: int = 32):
+        """
+        Initialize the hub
+
+        Args:
+            snapshot_fn: Returns the current report for a patient key
+            fingerprint_fn: Reduces a report to the parts that count as a change
+            interval: Seconds between producer polls
+            queue_size: Pending events kept per subscriber before dropping the oldest
+            max_subscribers: Open streams allowed across all patients
+        """
+        self.snapshot_fn = snapshot_fn
+        self.fingerprint_fn = fingerprint_fn
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._total = 0
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Hashable, set] = {}
+        self._latest: Dict[Hashable, Dict] = {}
+        self._producers: Dict[Hashable, threading.Event] = {}
+
+    # ── Subscription management ───────────────────────────────────────────────
+
+    def subscribe(self, key: Hashable) -> Optional[queue.Queue]:
+        """Register a subscriber queue, starting the producer if needed (None when full)"""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self._total >= self.max_subscribers:
+                return None
+            self._total += 1
+            self._subscribers.setdefault(key, set()).add(q)
+            if key in self._latest:
+                q.put_nowait(self._latest[key])
+            if key not in self._producers:
+                stop = threading.Event()
+                self._producers[key] = stop
+                threading.Thread(target=self._produce, args=(key, stop),
+                                 name=f"threshold-stream-{key}", daemon=True).start()
+        return q
+
+    def unsubscribe(self, key: Hashable, q: queue.Queue):
+        """Remove a subscriber queue, stopping the producer after the last one"""
+        with self._lock:
+            subscribers = self._subscribers.get(key)
+            if subscribers is None or q not in subscribers:
+                return
+            subscribers.discard(q)
+            self._total -= 1
+            if not subscribers:
+                del self._subscribers[key]
+                self._latest.pop(key, None)
+                stop = self._producers.pop(key, None)
+                if stop:
+                    stop.set()
+
+    def subscriber_count(self, key: Hashable) -> int:
+        """Number of live subscribers for a patient key"""
+        with self._lock:
+            return len(self._subscribers.get(key, ()))
+
+    def total_subscribers(self) -> int:
+        """Number of open streams across all patients"""
+        with self._lock:
+            return self._total
+
+    # ── Producer ──────────────────────────────────────────────────────────────
+
+    def _produce(self, key: Hashable, stop: threading.Event):
+        last_fingerprint = None
+        while not stop.is_set():
+            try:
+                report = self.snapshot_fn(key)
+                fingerprint = self.fingerprint_fn(report)
+                if fingerprint != last_fingerprint:
+                    last_fingerprint = fingerprint
+                    self._publish(key, report)
+            except Exception as e:
+                logger.error(f"Threshold stream producer error for {key}: {e}")
+            stop.wait(self.interval)
+        logger.info(f"Threshold stream producer stopped for {key}")
+
+    def _publish(self, key: Hashable, report: Dict):
+        with self._lock:
+            self._latest[key] = report
+            subscribers = list(self._subscribers.get(key, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(report)
+            except queue.Full:
+                # Slow consumer: drop the oldest pending report
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(report)
+                except queue.Full:
+                    pass
+
+    # ── SSE formatting ────────────────────────────────────────────────────────
+
+    def stream(self, key: Hashable, heartbeat: float = 15.0,
+               event: str = 'threshold') -> Optional['EventStream']:
+        """
+        Open a Server-Sent Events stream for a patient
+
+        The slot is taken now rather than on first iteration, so the caller
+        can answer with a fallback while the hub is full.
+
+        Args:
+            key: Patient key to subscribe to
+            heartbeat: Seconds of silence before a keep-alive comment is sent
+            event: SSE event name for reports
+
+        Returns:
+            Iterable of SSE messages, or None if max_subscribers are already open
+        """
+        q = self.subscribe(key)
+        if q is None:
+            logger.warning(f"Threshold stream full ({self.max_subscribers}), refusing {key}")
+            return None
+        return EventStream(self, key, q, heartbeat, event)
+
+
+class EventStream:
+    """
+    One subscriber's SSE messages; close() releases its hub slot
+
+    The WSGI server calls close() when the response ends, including when
+    the client disconnects before the first message is sent.
+    """
+
+    def __init__(self, hub: ThresholdStreamHub, key: Hashable, q: queue.Queue,
+                 heartbeat: float, event: str):
+        self.hub = hub
+        self.key = key
+        self.queue = q
+        self.heartbeat = heartbeat
+        self.event = event
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            yield f"retry: {int(max(self.hub.interval, 1) * 1000)}\n\n"
+            while True:
+                try:
+                    report = self.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield f": heartbeat {int(time.time())}\n\n"
+                    continue
+                yield format_sse(report, self.event)
+        finally:
+            self.close()
+
+    def close(self):
+        """Unsubscribe (safe to call more than once)"""
+        self.hub.unsubscribe(self.key, self.queue)
+
+
+def format_sse(data: Dict, event: Optional[str] = None) -> str:
+    """Format a JSON payload as a single Server-Sent Event"""
+    message = f"data: {json.dumps(data, default=json_default)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
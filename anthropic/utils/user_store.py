@@ -0,0 +1,209 @@
+"""
+User Store Module
+SQLite-backed user repository with a small in-process read-through cache
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UserStore:
+    """
+    User accounts in a SQLite database (WAL mode, email primary key)
+
+    Safe to share between threads and between worker processes: every
+    thread gets its own connection, and uniqueness of the email is enforced
+    by the database so concurrent signups cannot overwrite each other.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            email      TEXT PRIMARY KEY,
+            name       TEXT NOT NULL,
+            role       TEXT NOT NULL DEFAULT 'Patient',
+            password   TEXT NOT NULL,
+            extra      TEXT NOT NULL DEFAULT '{}',
+            created_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """
+
+    CORE_FIELDS = ('name', 'email', 'role', 'password')
+
+    def __init__(self, db_path: str = 'users.db', cache_size: int = 1024,
+                 cache_ttl: float = 60.0):
+        """
+        Initialize the store, creating the schema if needed
+
+        Args:
+            db_path: SQLite database file
+            cache_size: Maximum users kept in the read-through cache
+            cache_ttl: Seconds a cached user stays valid
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._local = threading.local()
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(self.SCHEMA)
+        logger.info(f"UserStore initialized ({self.db_path})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    # ── Cache ─────────────────────────────────────────────────────────────────
+
+    def _cache_get(self, email: str) -> Optional[Dict]:
+        with self._cache_lock:
+            entry = self._cache.get(email)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._cache[email]
+                return None
+            self._cache.move_to_end(email)
+            return user
+
+    def _cache_put(self, email: str, user: Dict):
+        with self._cache_lock:
+            self._cache[email] = (user, time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(email)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _row_to_user(row) -> Dict:
+        email, name, role, password, extra = row
+        user = json.loads(extra) if extra and extra != '{}' else {}
+        user.update({'name': name, 'email': email, 'role': role, 'password': password})
+        return user
+
+    def get(self, email: str) -> Optional[Dict]:
+        """
+        Look up a user by email
+
+        Returns:
+            User dict (including the password hash) or None if not found
+        """
+        user = self._cache_get(email)
+        if user is not None:
+            return dict(user)
+
+        row = self._connect().execute(
+            'SELECT email, name, role, password, extra FROM users WHERE email = ?', (email,)
+        ).fetchone()
+        if row is None:
+            return None
+        user = self._row_to_user(row)
+        self._cache_put(email, user)
+        return dict(user)
+
+    def exists(self, email: str) -> bool:
+        """Whether an account exists for the email"""
+        return self.get(email) is not None
+
+    def create(self, email: str, name: str, password: str, role: str = 'Patient',
+               **extra) -> bool:
+        """
+        Create a user
+
+        Args:
+            email: Unique account email
+            name: Display name
+            password: Password hash
+            role: Account role
+            **extra: Additional profile fields stored as JSON
+
+        Returns:
+            False if the email is already taken, True otherwise
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT INTO users (email, name, role, password, extra, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (email, name, role, password, json.dumps(extra),
+                     time.strftime('%Y-%m-%dT%H:%M:%S'))
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def count(self) -> int:
+        """Number of stored users"""
+        return self._connect().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def emails(self, role: Optional[str] = None) -> List[str]:
+        """Emails of every user, or of the users with the given role, in email order"""
+        if role is None:
+            rows = self._connect().execute('SELECT email FROM users ORDER BY email')
+        else:
+            rows = self._connect().execute('SELECT email FROM users WHERE role = ? ORDER BY email',
+                                           (role,))
+        return [email for email, in rows]
+
+    # ── Migration ─────────────────────────────────────────────────────────────
+
+    def migrate_from_json(self, json_path: str = 'users.json') -> int:
+        """
+        One-shot import of a legacy users.json
+
+        Existing rows are kept. The JSON file is renamed to
+        '<json_path>.migrated' afterwards so the import runs only once.
+
+        Returns:
+            Number of users inserted
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path) as f:
+                users = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read {json_path} for migration: {e}")
+            return 0
+
+        rows = []
+        created_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        for email, record in users.items():
+            extra = {k: v for k, v in record.items() if k not in self.CORE_FIELDS}
+            rows.append((email, record.get('name', ''), record.get('role', 'Patient'),
+                         record.get('password', ''), json.dumps(extra), created_at))
+
+        conn = self._connect()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO users (email, name, role, password, extra, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+            inserted = conn.total_changes - before
+
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except OSError:
+            # Another worker finished the migration first
+            pass
+        logger.info(f"Migrated {inserted} users from {json_path}")
+        return inserted